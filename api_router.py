@@ -2,32 +2,56 @@
 """
 API Endpoints for CollegeBuddy Application
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, contains_eager
 from typing import List, Optional
-from database import get_db
-from models import Student, Course, Assignment, Grade, Note, Event, Enrollment
+from database import get_db, get_read_db, request_tenant
+from cache import course_catalog, course_roster, invalidate_courses, course_to_dict
+from bulk import stream_query, stream_json_list
+from archive import grade_history
+from transcripts import transcripts_for, RENDERERS
+from export import iter_export, RESOURCES as EXPORT_RESOURCES, MEDIA_TYPES as EXPORT_MEDIA_TYPES
+from calendar_feed import student_feed
+from pubsub import broker, publish, publish_stats, student_topic, course_topic, scoped
+from loaders import run_batch
+from regrade import regrade_course, scale_for, scale_to_dict
+from recommend import recommend
+from revisions import record_initial, edit_note, list_revisions, get_revision, revision_diff, StaleRevision
+from attachments import save_attachment, attachment_to_dict, blob_path, usage, BlobResponse, TooLarge, QUOTA_BYTES
+from risk import at_risk
+from audit import query_audit
+from scheduler import job_status, trigger, scheduler_stats
+from registration import enroll, drop, set_capacity, waitlist_position, WAITLISTED
+from models import Student, Course, Assignment, Grade, Note, Event, Enrollment, Attachment
 from datetime import datetime
 
 router = APIRouter(prefix="/api", tags=["API"])
 
+# Calendar apps may reuse a feed this long before revalidating it
+CALENDAR_MAX_AGE = 300
+
+# Live update connections
+KEEPALIVE_SECONDS = 15
+MAX_TOPICS_PER_CLIENT = 50
+
+MAX_BATCH_QUERIES = 50
+
 # Student endpoints
 @router.get("/students", response_model=List[dict])
 def get_students(db: Session = Depends(get_db)):
     """Get all students"""
-    students = db.query(Student).all()
-    return [
-        {
-            "id": s.id,
-            "student_id": s.student_id,
-            "name": s.name,
-            "email": s.email,
-            "major": s.major,
-            "year": s.year,
-            "gpa": s.gpa
-        }
-        for s in students
-    ]
+    return stream_json_list(stream_query(db.query(Student)), lambda s: {
+        "id": s.id,
+        "student_id": s.student_id,
+        "name": s.name,
+        "email": s.email,
+        "major": s.major,
+        "year": s.year,
+        "gpa": s.gpa
+    })
 
 @router.get("/students/{student_id}")
 def get_student(student_id: str, db: Session = Depends(get_db)):
@@ -47,26 +71,23 @@ def get_student(student_id: str, db: Session = Depends(get_db)):
         "created_at": student.created_at
     }
 
+@router.get("/students/{student_id}/recommendations")
+def get_recommendations(
+    student_id: str,
+    limit: int = 10,
+    semester: Optional[str] = None,
+    year: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Suggest courses taken by students with similar histories"""
+    student = _student_or_404(db, student_id)
+    return recommend(db, student.id, limit=max(1, min(limit, 50)), semester=semester, year=year)
+
 # Course endpoints
 @router.get("/courses", response_model=List[dict])
 def get_courses(db: Session = Depends(get_db)):
     """Get all courses"""
-    courses = db.query(Course).all()
-    return [
-        {
-            "id": c.id,
-            "course_code": c.course_code,
-            "name": c.name,
-            "description": c.description,
-            "credits": c.credits,
-            "professor": c.professor,
-            "semester": c.semester,
-            "year": c.year,
-            "schedule": c.schedule,
-            "location": c.location
-        }
-        for c in courses
-    ]
+    return course_catalog(db)
 
 @router.get("/courses/{course_code}")
 def get_course(course_code: str, db: Session = Depends(get_db)):
@@ -85,41 +106,174 @@ def get_course(course_code: str, db: Session = Depends(get_db)):
         "semester": course.semester,
         "year": course.year,
         "schedule": course.schedule,
-        "location": course.location
+        "location": course.location,
+        "capacity": course.capacity,
+        "enrolled_count": course.enrolled_count
     }
 
 @router.post("/courses")
 def create_course(course_data: dict, db: Session = Depends(get_db)):
     """Create a new course"""
+    course_data.pop("enrolled_count", None)
     course = Course(**course_data)
     db.add(course)
     db.commit()
     db.refresh(course)
+    invalidate_courses(db)
+    tenant = db.info.get("tenant")
+    publish(course_topic(course.course_code), "created", "course", course_to_dict(course), tenant)
+    publish_stats(tenant, total_courses=1)
     return {"message": "Course created successfully", "course_id": course.id}
 
+@router.get("/courses/{course_code}/roster")
+def get_course_roster(course_code: str, db: Session = Depends(get_db)):
+    """Get students actively enrolled in a course"""
+    if not any(c["course_code"] == course_code for c in course_catalog(db)):
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    return course_roster(db, course_code)
+
+def _course_or_404(db: Session, course_code: str):
+    course = db.query(Course).filter(Course.course_code == course_code).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return course
+
+@router.get("/courses/{course_code}/grading-scale")
+def get_grading_scale(course_code: str, db: Session = Depends(get_db)):
+    """Get a course's letter cutoffs and curve"""
+    course = _course_or_404(db, course_code)
+    return scale_to_dict(course, *scale_for(db, course.id))
+
+@router.put("/courses/{course_code}/grading-scale")
+def set_grading_scale(course_code: str, scale_data: dict, dry_run: bool = False, db: Session = Depends(get_db)):
+    """Change a course's scale or curve and regrade it in one transaction.
+    
+    Body: {"cutoffs": [[93, "A"], ..., [0, "F"]], "curve": 2.5, "max_percentage": 100},
+    every field optional. With ?dry_run=true only the diff is returned.
+    """
+    course = _course_or_404(db, course_code)
+    try:
+        return regrade_course(
+            db, course,
+            scale=scale_data.get("cutoffs"),
+            curve=scale_data.get("curve"),
+            max_percentage=scale_data.get("max_percentage"),
+            dry_run=dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Registration endpoints
+def _student_or_404(db: Session, student_id: str):
+    student = db.query(Student).filter(Student.student_id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return student
+
+def _registration_changed(db: Session, course: Course, op: str, student_ids):
+    invalidate_courses(db)
+    tenant = db.info.get("tenant")
+    for student_id in student_ids:
+        publish(course_topic(course.course_code), op, "enrollment", {"student_id": student_id}, tenant)
+        publish(student_topic(student_id), op, "enrollment", {"course_code": course.course_code}, tenant)
+
+@router.post("/courses/{course_code}/enroll")
+def enroll_student(course_code: str, body: dict, db: Session = Depends(get_db)):
+    """Enroll a student, or add them to the waitlist when the course is full.
+    
+    Body: {"student_id": "STU001"}
+    """
+    course = _course_or_404(db, course_code)
+    student = _student_or_404(db, body.get("student_id"))
+    enrollment = enroll(db, student.id, course.id)
+    _registration_changed(db, course, "enrolled" if enrollment.status != WAITLISTED else "waitlisted",
+                          [student.student_id])
+    return {
+        "student_id": student.student_id,
+        "course_code": course_code,
+        "status": enrollment.status,
+        "waitlist_position": waitlist_position(db, enrollment)
+    }
+
+@router.post("/courses/{course_code}/drop")
+def drop_student(course_code: str, body: dict, db: Session = Depends(get_db)):
+    """Drop a student's enrollment or waitlist place, promoting the next in line"""
+    course = _course_or_404(db, course_code)
+    student = _student_or_404(db, body.get("student_id"))
+    enrollment = db.query(Enrollment).filter(
+        Enrollment.student_id == student.id, Enrollment.course_id == course.id
+    ).first()
+    promoted = drop(db, enrollment) if enrollment else None
+    if promoted is None:
+        raise HTTPException(status_code=404, detail="Student is not enrolled or waitlisted")
+    
+    promoted_codes = [
+        code for (code,) in db.query(Student.student_id)
+        .join(Enrollment, Enrollment.student_id == Student.id)
+        .filter(Enrollment.id.in_(promoted))
+    ] if promoted else []
+    _registration_changed(db, course, "dropped", [student.student_id])
+    _registration_changed(db, course, "enrolled", promoted_codes)
+    return {"student_id": student.student_id, "course_code": course_code, "status": "Dropped",
+            "promoted": promoted_codes}
+
+@router.put("/courses/{course_code}/capacity")
+def update_capacity(course_code: str, body: dict, db: Session = Depends(get_db)):
+    """Set a course's capacity ({"capacity": 30}, or null for unlimited)"""
+    course = _course_or_404(db, course_code)
+    capacity = body.get("capacity")
+    if capacity is not None and not isinstance(capacity, int):
+        raise HTTPException(status_code=400, detail="Capacity must be an integer or null")
+    try:
+        promoted = set_capacity(db, course, capacity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    invalidate_courses(db)
+    return {"course_code": course_code, "capacity": course.capacity,
+            "enrolled_count": course.enrolled_count, "promoted": len(promoted)}
+
+@router.get("/courses/{course_code}/waitlist")
+def get_waitlist(course_code: str, db: Session = Depends(get_db)):
+    """Get a course's waitlist in promotion order"""
+    course = _course_or_404(db, course_code)
+    rows = (
+        db.query(Student, Enrollment.enrolled_at)
+        .join(Enrollment, Enrollment.student_id == Student.id)
+        .filter(Enrollment.course_id == course.id, Enrollment.status == WAITLISTED)
+        .order_by(Enrollment.enrolled_at, Enrollment.id)
+        .all()
+    )
+    return [
+        {"position": i, "student_id": s.student_id, "name": s.name, "waitlisted_at": at}
+        for i, (s, at) in enumerate(rows, start=1)
+    ]
+
+@router.post("/courses/{course_code}/regrade")
+def regrade(course_code: str, dry_run: bool = False, db: Session = Depends(get_db)):
+    """Recompute a course's percentages and letters under its current scale"""
+    return regrade_course(db, _course_or_404(db, course_code), dry_run=dry_run)
+
 # Assignment endpoints
 @router.get("/assignments")
 def get_assignments(course_code: Optional[str] = None, db: Session = Depends(get_db)):
     """Get assignments, optionally filtered by course"""
-    query = db.query(Assignment).join(Course)
+    query = db.query(Assignment).join(Course).options(contains_eager(Assignment.course))
     
     if course_code:
         query = query.filter(Course.course_code == course_code)
     
-    assignments = query.all()
-    return [
-        {
-            "id": a.id,
-            "title": a.title,
-            "description": a.description,
-            "type": a.type,
-            "due_date": a.due_date,
-            "max_points": a.max_points,
-            "course_code": a.course.course_code,
-            "course_name": a.course.name
-        }
-        for a in assignments
-    ]
+    return stream_json_list(stream_query(query), lambda a: {
+        "id": a.id,
+        "title": a.title,
+        "description": a.description,
+        "type": a.type,
+        "due_date": a.due_date,
+        "max_points": a.max_points,
+        "course_code": a.course.course_code,
+        "course_name": a.course.name
+    })
 
 # Grade endpoints
 @router.get("/grades/{student_id}")
@@ -129,21 +283,118 @@ def get_student_grades(student_id: str, db: Session = Depends(get_db)):
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    grades = db.query(Grade).filter(Grade.student_id == student.id).all()
+    history = grade_history([student.id])
+    grades = db.execute(select(history).order_by(history.c.graded_at)).all()
     return [
         {
-            "id": g.id,
-            "assignment_title": g.assignment.title,
-            "course_code": g.assignment.course.course_code,
+            "id": g.grade_id,
+            "assignment_title": g.assignment_title,
+            "course_code": g.course_code,
             "points_earned": g.points_earned,
             "points_possible": g.points_possible,
             "percentage": g.percentage,
             "letter_grade": g.letter_grade,
-            "graded_at": g.graded_at
+            "graded_at": g.graded_at,
+            "archived": bool(g.archived)
         }
         for g in grades
     ]
 
+# Advising endpoints
+@router.get("/advising/at-risk")
+def get_at_risk_students(
+    limit: int = 50,
+    min_score: float = 1.0,
+    major: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Students ranked by early-warning score, from the last `manage.py risk` run"""
+    return at_risk(db, limit=max(1, min(limit, 500)), min_score=min_score, major=major)
+
+# Background job endpoints
+@router.get("/jobs")
+def get_jobs(db: Session = Depends(get_db)):
+    """Schedule and last outcome of each shared job, with this worker's metrics"""
+    return {"jobs": job_status(db), "worker": scheduler_stats()}
+
+@router.post("/jobs/{name}/run")
+def run_job_now(name: str, db: Session = Depends(get_db)):
+    """Make a job due now; the scheduler picks it up at its next poll"""
+    try:
+        trigger(db, name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {"name": name, "queued": True}
+
+# Audit log endpoints
+@router.get("/audit")
+def get_audit_log(
+    table: Optional[str] = None,
+    row_id: Optional[str] = None,
+    actor: Optional[str] = None,
+    op: Optional[str] = None,
+    txn: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Recorded writes, newest first; pass next_cursor back as cursor for older ones"""
+    try:
+        entries, next_cursor = query_audit(
+            db.info.get("tenant"), table=table, row_id=row_id, actor=actor, op=op, txn=txn,
+            since=since, until=until, limit=max(1, min(limit, 1000)), cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"entries": entries, "next_cursor": next_cursor}
+
+# Transcript endpoints
+@router.get("/transcripts/{student_id}")
+def get_student_transcript(student_id: str, format: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get a student's transcript as JSON, or as a CSV/PDF download"""
+    student = db.query(Student).filter(Student.student_id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    
+    transcript = transcripts_for(db, [student])[0]
+    if format is None:
+        return transcript
+    if format not in RENDERERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    
+    media_types = {"csv": "text/csv", "pdf": "application/pdf"}
+    return Response(
+        content=RENDERERS[format](transcript),
+        media_type=media_types[format],
+        headers={"Content-Disposition": f'attachment; filename="{student_id}.{format}"'}
+    )
+
+# Export endpoints
+@router.get("/export/{resource}")
+def export_resource(
+    resource: str,
+    format: str = "csv",
+    semester: Optional[str] = None,
+    year: Optional[int] = None,
+    course_code: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Stream a full resource as CSV, NDJSON or Parquet"""
+    if resource not in EXPORT_RESOURCES:
+        raise HTTPException(status_code=404, detail="Unknown export resource")
+    try:
+        chunks = iter_export(db, resource, format, semester, year, course_code)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{resource}.{format}"'}
+    )
+
 # Schedule endpoints
 @router.get("/schedule/{student_id}")
 def get_student_schedule(student_id: str, db: Session = Depends(get_db)):
@@ -171,6 +422,20 @@ def get_student_schedule(student_id: str, db: Session = Depends(get_db)):
     
     return schedule
 
+# Calendar feed endpoints
+@router.get("/calendar/{student_id}.ics")
+def get_student_calendar(student_id: str, request: Request, db: Session = Depends(get_db)):
+    """Get a student's classes and events as an iCalendar feed"""
+    student = db.query(Student).filter(Student.student_id == student_id).first()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    
+    etag, body = student_feed(db, student.id, request.headers.get("if-none-match"))
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={CALENDAR_MAX_AGE}"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/calendar", headers=headers)
+
 # Events endpoints
 @router.get("/events")
 def get_events(
@@ -184,20 +449,16 @@ def get_events(
     if event_type:
         query = query.filter(Event.event_type == event_type)
     
-    events = query.order_by(Event.start_time).all()
-    return [
-        {
-            "id": e.id,
-            "title": e.title,
-            "description": e.description,
-            "event_type": e.event_type,
-            "start_time": e.start_time,
-            "end_time": e.end_time,
-            "location": e.location,
-            "course_code": e.course_code
-        }
-        for e in events
-    ]
+    return stream_json_list(stream_query(query.order_by(Event.start_time)), lambda e: {
+        "id": e.id,
+        "title": e.title,
+        "description": e.description,
+        "event_type": e.event_type,
+        "start_time": e.start_time,
+        "end_time": e.end_time,
+        "location": e.location,
+        "course_code": e.course_code
+    })
 
 # Notes endpoints
 @router.get("/notes/{student_id}")
@@ -215,6 +476,7 @@ def get_student_notes(student_id: str, db: Session = Depends(get_db)):
             "content": n.content,
             "course_code": n.course_code,
             "tags": n.tags.split(",") if n.tags else [],
+            "revision": n.revision or 0,
             "created_at": n.created_at,
             "updated_at": n.updated_at
         }
@@ -226,10 +488,217 @@ def create_note(note_data: dict, db: Session = Depends(get_db)):
     """Create a new note"""
     note = Note(**note_data)
     db.add(note)
+    db.flush()
+    record_initial(db, note)
     db.commit()
     db.refresh(note)
+    owner = db.query(Student.student_id).filter(Student.id == note.student_id).scalar()
+    if owner:
+        publish(student_topic(owner), "created", "note", {
+            "id": note.id,
+            "title": note.title,
+            "content": note.content,
+            "course_code": note.course_code,
+            "tags": note.tags.split(",") if note.tags else [],
+            "created_at": note.created_at
+        }, db.info.get("tenant"))
     return {"message": "Note created successfully", "note_id": note.id}
 
+def _note_dict(note):
+    return {
+        "id": note.id,
+        "title": note.title,
+        "content": note.content,
+        "course_code": note.course_code,
+        "tags": note.tags.split(",") if note.tags else [],
+        "revision": note.revision or 0,
+        "created_at": note.created_at,
+        "updated_at": note.updated_at
+    }
+
+@router.put("/notes/{note_id}")
+def update_note(note_id: int, note_data: dict, db: Session = Depends(get_db)):
+    """Edit a note, keeping the previous text as a revision.
+    
+    Body: any of title, content, course_code, tags, plus optional
+    base_revision; a 409 means the note was edited since that revision.
+    """
+    note = _note_or_404(db, note_id)
+    if isinstance(note_data.get("tags"), list):
+        note_data["tags"] = ",".join(note_data["tags"])
+    try:
+        edit_note(db, note, note_data, note_data.get("base_revision"))
+    except StaleRevision:
+        raise HTTPException(status_code=409, detail="Note was changed since that revision")
+    
+    result = _note_dict(note)
+    owner = db.query(Student.student_id).filter(Student.id == note.student_id).scalar()
+    if owner:
+        publish(student_topic(owner), "updated", "note", result, db.info.get("tenant"))
+    return result
+
+@router.get("/notes/{note_id}/revisions")
+def get_note_revisions(note_id: int, db: Session = Depends(get_db)):
+    """List a note's revisions, newest first"""
+    _note_or_404(db, note_id)
+    return list_revisions(db, note_id)
+
+@router.get("/notes/{note_id}/revisions/{revision}")
+def get_note_revision(note_id: int, revision: int, diff: bool = False, db: Session = Depends(get_db)):
+    """A note as it was at one revision, or ?diff=true for the change it made"""
+    _note_or_404(db, note_id)
+    if diff:
+        patch = revision_diff(db, note_id, revision)
+        if patch is None:
+            raise HTTPException(status_code=404, detail="Revision not found")
+        return Response(content=patch, media_type="text/plain")
+    found = get_revision(db, note_id, revision)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    row, content = found
+    return {
+        "note_id": note_id,
+        "revision": row.revision,
+        "title": row.title,
+        "content": content,
+        "tags": row.tags.split(",") if row.tags else [],
+        "created_at": row.created_at
+    }
+
+# Attachment endpoints
+def _note_or_404(db: Session, note_id: int):
+    note = db.query(Note).filter(Note.id == note_id).first()
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return note
+
+@router.post("/notes/{note_id}/attachments")
+def upload_attachment(note_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Attach a file to a note (multipart field "file")"""
+    note = _note_or_404(db, note_id)
+    try:
+        attachment = save_attachment(db, note, file.file, file.filename, file.content_type)
+    except TooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        file.file.close()
+    
+    result = attachment_to_dict(attachment)
+    owner = db.query(Student.student_id).filter(Student.id == note.student_id).scalar()
+    if owner:
+        publish(student_topic(owner), "created", "attachment", result, db.info.get("tenant"))
+    return dict(result, usage={"used": usage(db, note.student_id), "quota": QUOTA_BYTES})
+
+@router.get("/notes/{note_id}/attachments")
+def get_note_attachments(note_id: int, db: Session = Depends(get_db)):
+    """List a note's attachments"""
+    _note_or_404(db, note_id)
+    attachments = db.query(Attachment).filter(Attachment.note_id == note_id).order_by(Attachment.id).all()
+    return [attachment_to_dict(a) for a in attachments]
+
+@router.get("/attachments/{attachment_id}")
+def download_attachment(attachment_id: int, request: Request, db: Session = Depends(get_db)):
+    """Download an attachment; supports Range and If-None-Match"""
+    attachment = db.query(Attachment).filter(Attachment.id == attachment_id).first()
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return BlobResponse(
+        blob_path(db, attachment.sha256), attachment,
+        range_header=request.headers.get("range"),
+        if_range=request.headers.get("if-range"),
+        if_none_match=request.headers.get("if-none-match")
+    )
+
+@router.delete("/attachments/{attachment_id}")
+def delete_attachment(attachment_id: int, db: Session = Depends(get_db)):
+    """Remove an attachment; its file is reclaimed by the attachment_gc job"""
+    deleted = db.query(Attachment).filter(Attachment.id == attachment_id).delete()
+    db.commit()
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return {"message": "Attachment deleted", "id": attachment_id}
+
+# Live update endpoints
+def _parse_topics(topics: Optional[str], tenant: Optional[str]):
+    parsed = [scoped(tenant, t.strip()) for t in (topics or "").split(",") if t.strip()]
+    return parsed[:MAX_TOPICS_PER_CLIENT]
+
+@router.get("/stream")
+async def stream_changes(request: Request, topics: str):
+    """Server-sent events for a comma-separated list of topics"""
+    subscription = broker.subscribe(_parse_topics(topics, request_tenant(request)))
+    
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def websocket_changes(websocket: WebSocket, topics: Optional[str] = None):
+    """WebSocket change feed; send {"subscribe": [...]} or {"unsubscribe": [...]}"""
+    try:
+        tenant = request_tenant(websocket)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    subscription = broker.subscribe(_parse_topics(topics, tenant))
+    
+    async def pump():
+        while True:
+            await websocket.send_text(await subscription.get())
+    
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            command = await websocket.receive_json()
+            if not isinstance(command, dict):
+                continue
+            subscribe, unsubscribe = command.get("subscribe", []), command.get("unsubscribe", [])
+            if not all(isinstance(t, list) and all(isinstance(x, str) for x in t) for t in (subscribe, unsubscribe)):
+                await websocket.send_json({"error": "subscribe and unsubscribe must be lists of topic strings"})
+                continue
+            room = MAX_TOPICS_PER_CLIENT - len(subscription.topics)
+            broker.add_topics(subscription, [scoped(tenant, t) for t in subscribe[:max(room, 0)]])
+            broker.remove_topics(subscription, [scoped(tenant, t) for t in unsubscribe])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        subscription.close()
+
+# Batched query endpoint
+@router.post("/batch")
+def batch_query(body: dict, db: Session = Depends(get_read_db)):
+    """Resolve several student resources in one round trip.
+    
+    Body: {"queries": {"alias": {"resource": "grades", "student_id": "STU001"}, ...}}
+    with resource one of student, stats, schedule, grades, notes.
+    """
+    queries = body.get("queries")
+    if not isinstance(queries, dict):
+        raise HTTPException(status_code=400, detail="Expected an object of named queries")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    
+    return run_batch(db, queries)
+
 # Statistics endpoints
 @router.get("/stats/{student_id}")
 def get_student_stats(student_id: str, db: Session = Depends(get_db)):
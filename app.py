@@ -2,16 +2,23 @@
 CollegeBuddy - Your Ultimate College Assistant
 A comprehensive college management application built with FastAPI
 """
-import uvicorn
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from database import init_db, get_db
+from database import get_db, tenant_stats, session_factories, SessionLocal
+from serve import worker_startup
+from scheduler import SCHEDULER_ENABLED, start_scheduler, stop_scheduler, scheduler_stats
+from cache import quick_stats
+from audit import audit_stats, close_audit
+from ratelimit import RateLimitMiddleware
+from compression import CompressionMiddleware
 from api_router import router as api_router
-from models import Student, Course, Assignment, Event
-import os
+from models import Student, Course
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -22,14 +29,24 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Compression and ETags, wrapped by per-client rate limits and bounded concurrency
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
 # Include API router
 app.include_router(api_router)
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    init_db()
-    print("🎓 CollegeBuddy database initialized!")
+    worker_startup(app, IMPORT_SECONDS)
+    if SCHEDULER_ENABLED:
+        start_scheduler(SessionLocal, session_factories)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_scheduler()
+    close_audit()
 
 # Main dashboard route
 @app.get("/", response_class=HTMLResponse)
@@ -37,10 +54,11 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
     """Main dashboard page"""
     
     # Get quick stats
-    total_students = db.query(Student).count()
-    total_courses = db.query(Course).count()
-    total_assignments = db.query(Assignment).count()
-    upcoming_events = db.query(Event).count()
+    stats = quick_stats(db)
+    total_students = stats["total_students"]
+    total_courses = stats["total_courses"]
+    total_assignments = stats["total_assignments"]
+    upcoming_events = stats["total_events"]
     
     # Recent students
     recent_students = db.query(Student).limit(5).all()
@@ -342,19 +360,18 @@ async def health_check():
             "Notes & Resources",
             "Progress Tracking",
             "Campus Information"
-        ]
+        ],
+        "startup": getattr(app.state, "startup_timing", None),
+        "tenants": tenant_stats(),
+        "jobs": scheduler_stats(),
+        "audit": audit_stats()
     }
 
 # Quick stats endpoint
 @app.get("/stats")
 async def get_quick_stats(db: Session = Depends(get_db)):
     """Get quick statistics"""
-    return {
-        "total_students": db.query(Student).count(),
-        "total_courses": db.query(Course).count(),
-        "total_assignments": db.query(Assignment).count(),
-        "total_events": db.query(Event).count()
-    }
+    return quick_stats(db)
 
 if __name__ == "__main__":
     print("🎓 Starting CollegeBuddy Application...")
@@ -363,6 +380,7 @@ if __name__ == "__main__":
     print("🔧 Health Check: http://localhost:8000/health")
     print("=" * 50)
     
+    import uvicorn
     uvicorn.run(
         "app:app",
         host="0.0.0.0",
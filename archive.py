@@ -0,0 +1,210 @@
+"""
+Term Archival for CollegeBuddy Application
+
+Moves a finished term's enrollments, assignments and grades out of the hot
+tables into the archived_* tables so current-term queries and indexes stay
+small. grade_history() gives one read path over both.
+
+A term can only be archived once its last day of classes (calendar_feed's
+TERM_DATES) has passed. Archiving closes the term first: Active enrollments
+become Completed and anyone still Waitlisted is Dropped.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import func, select, insert, delete, update, literal, union_all, true, false
+from sqlalchemy.orm import Session
+
+from calendar_feed import term_dates
+from models import (
+    Course, Enrollment, Assignment, Grade,
+    ArchivedEnrollment, ArchivedAssignment, ArchivedGrade
+)
+from registration import ACTIVE, WAITLISTED, COMPLETED, DROPPED
+
+# Order of terms within a calendar year
+TERM_ORDER = {"Spring": 0, "Summer": 1, "Fall": 2}
+
+# How closing a term settles the enrollments still open in it
+CLOSED_STATUS = {ACTIVE: COMPLETED, WAITLISTED: DROPPED}
+
+
+class TermNotFinished(ValueError):
+    pass
+
+
+def term_key(semester, year):
+    """Sortable key for a (semester, year) term"""
+    return (year or 0, TERM_ORDER.get(semester, -1))
+
+
+def _copy_rows(db: Session, target, rows, archived_at):
+    """INSERT ... SELECT rows into an archive table.
+
+    rows selects the target's columns except id and archived_at, in
+    declaration order, starting with the source row's id.
+    """
+    columns = [c.name for c in target.__table__.columns if c.name not in ("id", "archived_at")]
+    db.execute(
+        insert(target.__table__).from_select(
+            columns + ["archived_at"], rows.add_columns(literal(archived_at))
+        )
+    )
+
+
+def _delete_moved(db: Session, source, target, archived_at):
+    """Delete the hot rows copied into target by this archive run"""
+    moved_ids = select(target.source_id).where(target.archived_at == archived_at)
+    return db.execute(
+        delete(source.__table__)
+        .where(source.id.in_(moved_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def term_has_ended(semester, year, today=None):
+    """True once a term's last day of classes is before today; False for unknown terms"""
+    dates = term_dates(semester, year)
+    return dates is not None and dates[1] < (today or date.today())
+
+
+def close_term(db: Session, semester, year):
+    """Mark an ended term's Active enrollments Completed and drop its waitlist.
+
+    Does not commit; returns the number of enrollments closed.
+    """
+    course_ids = select(Course.id).where(Course.semester == semester, Course.year == year)
+    closed = 0
+    for old, new in CLOSED_STATUS.items():
+        closed += db.execute(
+            update(Enrollment)
+            .where(Enrollment.course_id.in_(course_ids), Enrollment.status == old)
+            .values(status=new)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return closed
+
+
+def archive_term(db: Session, semester: str, year: int, today=None):
+    """Close one term and move its rows into the archive tables in a single transaction.
+
+    Raises TermNotFinished if the term has not ended. Returns the number of
+    rows moved per table.
+    """
+    if not term_has_ended(semester, year, today):
+        raise TermNotFinished(f"{semester} {year} has not ended")
+
+    course_ids = select(Course.id).where(Course.semester == semester, Course.year == year)
+    archived_at = datetime.utcnow()
+
+    assignments = select(
+        Assignment.id, Assignment.course_id, Assignment.title, Assignment.description,
+        Assignment.type, Assignment.due_date, Assignment.max_points, Assignment.created_at
+    ).where(Assignment.course_id.in_(course_ids))
+
+    # Grades are re-pointed at the archived copy of their assignment
+    grades = select(
+        Grade.id, Grade.student_id, ArchivedAssignment.id, Grade.points_earned,
+        Grade.points_possible, Grade.percentage, Grade.letter_grade,
+        Grade.submitted_at, Grade.graded_at
+    ).join(
+        ArchivedAssignment,
+        (ArchivedAssignment.source_id == Grade.assignment_id)
+        & (ArchivedAssignment.archived_at == archived_at)
+    )
+
+    enrollments = select(
+        Enrollment.id, Enrollment.student_id, Enrollment.course_id,
+        Enrollment.enrolled_at, Enrollment.status
+    ).where(Enrollment.course_id.in_(course_ids))
+
+    try:
+        close_term(db, semester, year)
+        # Assignments are copied first so grades can find their new ids
+        _copy_rows(db, ArchivedAssignment, assignments, archived_at)
+        _copy_rows(db, ArchivedGrade, grades, archived_at)
+        _copy_rows(db, ArchivedEnrollment, enrollments, archived_at)
+        moved = {
+            "grades": _delete_moved(db, Grade, ArchivedGrade, archived_at),
+            "enrollments": _delete_moved(db, Enrollment, ArchivedEnrollment, archived_at),
+            "assignments": _delete_moved(db, Assignment, ArchivedAssignment, archived_at)
+        }
+        # Seat counters must match the enrollments left behind, or
+        # registration would see the archived students as still holding seats
+        active = (
+            select(func.count(Enrollment.id))
+            .where(Enrollment.course_id == Course.id, Enrollment.status == ACTIVE)
+            .scalar_subquery()
+        )
+        db.execute(
+            update(Course)
+            .where(Course.semester == semester, Course.year == year)
+            .values(enrolled_count=active)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return moved
+
+
+def completed_terms(db: Session, today=None):
+    """Terms that still have hot rows and whose last day of classes has passed"""
+    hot_course_ids = select(Enrollment.course_id).union(select(Assignment.course_id))
+    hot_terms = (
+        db.query(Course.semester, Course.year)
+        .filter(Course.id.in_(hot_course_ids))
+        .distinct()
+        .all()
+    )
+    return sorted(
+        (tuple(t) for t in hot_terms if term_has_ended(*t, today)),
+        key=lambda t: term_key(*t)
+    )
+
+
+def archive_completed_terms(db: Session, today=None):
+    """Archive every completed term; returns {(semester, year): moved}"""
+    results = {}
+    for term in completed_terms(db, today):
+        results[term] = archive_term(db, *term, today=today)
+    return results
+
+
+def grade_history(student_ids=None):
+    """Select every grade, hot and archived, with its course details.
+
+    Columns: student_id, grade_id, assignment_title, course_id, course_code,
+    course_name, semester, year, credits, points_earned, points_possible,
+    percentage, letter_grade, graded_at, archived.
+    """
+    def part(grade, assignment, archived):
+        query = (
+            select(
+                grade.student_id.label("student_id"),
+                (grade.source_id if archived else grade.id).label("grade_id"),
+                assignment.title.label("assignment_title"),
+                Course.id.label("course_id"),
+                Course.course_code.label("course_code"),
+                Course.name.label("course_name"),
+                Course.semester.label("semester"),
+                Course.year.label("year"),
+                Course.credits.label("credits"),
+                grade.points_earned.label("points_earned"),
+                grade.points_possible.label("points_possible"),
+                grade.percentage.label("percentage"),
+                grade.letter_grade.label("letter_grade"),
+                grade.graded_at.label("graded_at"),
+                (true() if archived else false()).label("archived")
+            )
+            .join(assignment, assignment.id == grade.assignment_id)
+            .join(Course, Course.id == assignment.course_id)
+        )
+        if student_ids is not None:
+            query = query.where(grade.student_id.in_(student_ids))
+        return query
+
+    return union_all(
+        part(Grade, Assignment, False),
+        part(ArchivedGrade, ArchivedAssignment, True)
+    ).subquery("grade_history")
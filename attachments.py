@@ -0,0 +1,252 @@
+"""
+Note Attachments for CollegeBuddy Application
+
+Files attached to notes are kept out of the database. Each upload is
+streamed in chunks to a temporary file while it is hashed, then moved to
+a path named by its SHA-256, so a file attached many times is stored once:
+
+    COLLEGEBUDDY_ATTACHMENT_DIR/<tenant>/ab/cd/abcd...
+
+The attachments table only holds metadata. Deleting an attachment removes
+its row; blobs nothing refers to any more are removed later by the
+attachment_gc job, after a grace period that covers uploads in flight.
+
+Downloads honour single byte ranges and If-None-Match, and use the ASGI
+zero-copy send extension (sendfile) when the server offers it.
+
+Quotas count every attachment a student owns at its full size, even when
+its blob is shared.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from urllib.parse import quote
+
+import anyio
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from models import Attachment
+
+ATTACHMENT_DIR = os.getenv("COLLEGEBUDDY_ATTACHMENT_DIR", "./attachments")
+MAX_ATTACHMENT_BYTES = int(float(os.getenv("COLLEGEBUDDY_ATTACHMENT_MAX_MB", "50")) * 1024 * 1024)
+QUOTA_BYTES = int(float(os.getenv("COLLEGEBUDDY_ATTACHMENT_QUOTA_MB", "200")) * 1024 * 1024)
+
+CHUNK_SIZE = 1024 * 1024
+
+# Unreferenced blobs younger than this are left alone by the gc job
+GC_GRACE_SECONDS = 3600
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class TooLarge(ValueError):
+    pass
+
+
+def store_root(db: Session):
+    return os.path.join(ATTACHMENT_DIR, db.info.get("tenant") or "_default")
+
+
+def blob_path(db: Session, sha256):
+    return os.path.join(store_root(db), sha256[:2], sha256[2:4], sha256)
+
+
+def usage(db: Session, student_pk):
+    return db.query(func.coalesce(func.sum(Attachment.size), 0)).filter(Attachment.student_id == student_pk).scalar()
+
+
+def clean_filename(filename):
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = "".join(ch for ch in name if ch.isprintable()).strip()
+    return name[:255] or "attachment"
+
+
+def save_attachment(db: Session, note, stream, filename, content_type=None):
+    """Store a file-like object's contents as an attachment of note.
+
+    Raises TooLarge once the stream passes MAX_ATTACHMENT_BYTES or the
+    owner's remaining quota; nothing is kept in that case.
+    """
+    limit = min(MAX_ATTACHMENT_BYTES, QUOTA_BYTES - usage(db, note.student_id))
+    if limit <= 0:
+        raise TooLarge("Attachment quota used up")
+
+    tmp_dir = os.path.join(store_root(db), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    if limit < MAX_ATTACHMENT_BYTES:
+                        raise TooLarge(f"Attachment quota of {QUOTA_BYTES // (1024 * 1024)} MB exceeded")
+                    raise TooLarge(f"Attachments are limited to {MAX_ATTACHMENT_BYTES // (1024 * 1024)} MB")
+                digest.update(chunk)
+                out.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = blob_path(db, sha256)
+        if os.path.exists(path):
+            # Already stored; touch it so gc sees it as recently used
+            os.utime(path)
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    # A blob left behind by a failed commit is removed by gc
+    filename = clean_filename(filename)
+    attachment = Attachment(
+        note_id=note.id,
+        student_id=note.student_id,
+        filename=filename,
+        content_type=content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        size=size,
+        sha256=sha256
+    )
+    try:
+        db.add(attachment)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(attachment)
+    return attachment
+
+
+def attachment_to_dict(a):
+    return {
+        "id": a.id,
+        "note_id": a.note_id,
+        "filename": a.filename,
+        "content_type": a.content_type,
+        "size": a.size,
+        "sha256": a.sha256,
+        "created_at": a.created_at,
+        "url": f"/api/attachments/{a.id}"
+    }
+
+
+def collect_garbage(db: Session, grace_seconds=GC_GRACE_SECONDS):
+    """Remove blobs and stale temporary files nothing refers to; returns the count"""
+    root = store_root(db)
+    if not os.path.isdir(root):
+        return 0
+    referenced = {row[0] for row in db.query(Attachment.sha256).distinct()}
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for directory, _, files in os.walk(root):
+        in_tmp = os.path.basename(directory) == "tmp"
+        for name in files:
+            path = os.path.join(directory, name)
+            if (in_tmp or name not in referenced) and os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+    return removed
+
+
+# Downloads
+def parse_range(header, size):
+    """(start, end) inclusive for a single-range Range header.
+
+    Returns None to send the whole file (no header, or several ranges) and
+    raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip().replace(" ", ""))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class BlobResponse(Response):
+    """Response for an attachment, with ranges, 304s and zero-copy sends"""
+
+    def __init__(self, path, attachment, range_header=None, if_range=None, if_none_match=None):
+        self.background = None
+        self.path = path
+        self.attachment = attachment
+        self.range_header = range_header
+        self.if_range = if_range
+        self.if_none_match = if_none_match
+
+    async def __call__(self, scope, receive, send):
+        a = self.attachment
+        etag = f'"{a.sha256}"'
+        headers = [
+            (b"etag", etag.encode()),
+            (b"accept-ranges", b"bytes"),
+            (b"cache-control", b"private, max-age=86400"),
+            (b"x-content-type-options", b"nosniff"),
+            (b"content-disposition", f"attachment; filename*=UTF-8''{quote(a.filename)}".encode())
+        ]
+        if self.if_none_match and etag in [t.strip() for t in self.if_none_match.split(",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        size = a.size
+        try:
+            byte_range = parse_range(self.range_header, size) if self.if_range in (None, etag) else None
+        except ValueError:
+            await send({"type": "http.response.start", "status": 416,
+                        "headers": headers + [(b"content-range", f"bytes */{size}".encode())]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status = 200
+        start, end = 0, size - 1
+        if byte_range is not None:
+            status = 206
+            start, end = byte_range
+            headers.append((b"content-range", f"bytes {start}-{end}/{size}".encode()))
+        length = max(end - start + 1, 0)
+        headers += [
+            (b"content-type", a.content_type.encode()),
+            (b"content-length", str(length).encode())
+        ]
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": f.wrapped.fileno(),
+                            "offset": start, "count": length, "more_body": False})
+                return
+            await f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0 or length == 0:
+                await send({"type": "http.response.body", "body": b""})
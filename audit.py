@@ -0,0 +1,464 @@
+"""
+Audit Log for CollegeBuddy Application
+
+Records who changed what. Session events capture every committed write:
+
+- objects inserted, updated or deleted through a flush, with the changed
+  columns (old and new values for updates)
+- UPDATE, DELETE and INSERT statements run through Session.execute, such
+  as the seat counters in registration.py, as SQL with parameters and a
+  row count
+
+Capturing only copies values into the session's pending list; at commit
+the list is handed to a bounded in-memory queue, and a background thread
+appends it in batches to an append-only SQLite file per month:
+
+    COLLEGEBUDDY_AUDIT_DIR/<tenant>/audit-2026-10.db
+
+Triggers refuse UPDATE and DELETE on those files, and old months can be
+archived by moving their files. Writes that roll back are never logged.
+Entries reach disk within AUDIT_FLUSH_SECONDS; ones still queued when a
+process is killed are lost.
+
+Derived tables rebuilt by jobs (UNAUDITED_TABLES) are skipped, and so is
+anything written with bulk_insert_mappings or COPY, which bypass session
+events; nothing outside those tables uses them.
+"""
+import atexit
+import glob
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BindParameter, BooleanClauseList
+from sqlalchemy.orm import Session
+
+from ratelimit import client_key
+
+AUDIT_ENABLED = os.getenv("COLLEGEBUDDY_AUDIT", "1") != "0"
+AUDIT_DIR = os.getenv("COLLEGEBUDDY_AUDIT_DIR", "./audit")
+AUDIT_FLUSH_SECONDS = float(os.getenv("COLLEGEBUDDY_AUDIT_FLUSH_SECONDS", "0.5"))
+
+# Actor for writes made outside a request or job, e.g. "cli:regrade"
+DEFAULT_ACTOR = os.getenv("COLLEGEBUDDY_AUDIT_ACTOR", "system")
+
+# Entries written together in one transaction
+BATCH_SIZE = 2000
+
+# Commits waiting for the writer; beyond this, committing blocks until it catches up
+MAX_PENDING_COMMITS = 10000
+
+# Longer strings are cut down to this many characters
+MAX_VALUE_CHARS = 512
+
+UNAUDITED_TABLES = {
+    "course_neighbors", "student_risk", "job_state", "scheduled_jobs", "reminders_sent", "note_revisions"
+}
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+_PENDING = "audit_pending"
+
+Entry = namedtuple("Entry", "at tenant actor request table row_id op changes")
+Statement = namedtuple("Statement", "statement dialect parameters rows")
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS audit_log ("
+    " id INTEGER PRIMARY KEY,"
+    " at TEXT NOT NULL,"
+    " actor TEXT,"
+    " request TEXT,"
+    " table_name TEXT NOT NULL,"
+    " row_id TEXT,"
+    " op TEXT NOT NULL,"
+    " changes TEXT,"
+    " txn TEXT)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_row ON audit_log (table_name, row_id)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_actor ON audit_log (actor)",
+    "CREATE INDEX IF NOT EXISTS ix_audit_at ON audit_log (at)",
+    "CREATE TRIGGER IF NOT EXISTS audit_log_no_update BEFORE UPDATE ON audit_log "
+    "BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS audit_log_no_delete BEFORE DELETE ON audit_log "
+    "BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END"
+]
+
+
+def request_actor(request):
+    """(actor, request) for an HTTP request.
+
+    The actor is a hash of the API key when it is one of ratelimit's
+    API_KEYS, otherwise the client's IP address; unknown keys are ignored
+    so callers cannot choose the name the log records.
+    """
+    actor = client_key(request.scope)
+    if actor.startswith("key:"):
+        actor = "key:" + hashlib.sha256(actor[4:].encode()).hexdigest()[:12]
+    return actor, f"{request.method} {request.url.path}"
+
+
+# Capture
+_mapper_info = {}
+
+
+def _columns(mapper):
+    """(table name, primary key attribute names, column attribute names) for a mapper, cached"""
+    info = _mapper_info.get(mapper)
+    if info is None:
+        info = _mapper_info[mapper] = (
+            mapper.local_table.name,
+            [mapper.get_property_by_column(c).key for c in mapper.primary_key],
+            [attr.key for attr in mapper.column_attrs]
+        )
+    return info
+
+
+def _capture(op, obj):
+    state = inspect(obj)
+    table, pk_keys, keys = _columns(state.mapper)
+    if table in UNAUDITED_TABLES:
+        return None
+    values = state.dict
+    if op == UPDATE:
+        changes = {}
+        for key in keys:
+            history = state.attrs[key].history
+            if history.added or history.deleted:
+                old = history.deleted[0] if history.deleted else None
+                new = history.added[0] if history.added else None
+                if old != new:
+                    changes[key] = [old, new]
+        if not changes:
+            return None
+    else:
+        changes = {key: values[key] for key in keys if key in values}
+    row_id = ",".join(str(values.get(key)) for key in pk_keys)
+    return table, row_id, changes
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING, [])
+
+
+def _context(session):
+    return (session.info.get("tenant"), session.info.get("actor") or DEFAULT_ACTOR, session.info.get("request"))
+
+
+def _after_flush(session, flush_context):
+    now = time.time()
+    tenant, actor, request = _context(session)
+    pending = _pending(session)
+    for op, objects in ((INSERT, session.new), (UPDATE, session.dirty), (DELETE, session.deleted)):
+        for obj in objects:
+            captured = _capture(op, obj)
+            if captured is not None:
+                pending.append(Entry(now, tenant, actor, request, *captured[:2], op, captured[2]))
+
+
+def _on_execute(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return None
+    statement = orm_execute_state.statement
+    table = statement.table.name
+    if table in UNAUDITED_TABLES:
+        return None
+    session = orm_execute_state.session
+    result = orm_execute_state.invoke_statement()
+    parameters = orm_execute_state.parameters
+    if isinstance(parameters, list):
+        # executemany: keep the count, not every row's parameters
+        rows, parameters = len(parameters), None
+    else:
+        rows = result.rowcount
+    op = UPDATE if orm_execute_state.is_update else DELETE if orm_execute_state.is_delete else INSERT
+    tenant, actor, request = _context(session)
+    dialect = session.get_bind(**orm_execute_state.bind_arguments).dialect
+    _pending(session).append(
+        Entry(time.time(), tenant, actor, request, table, None, op, Statement(statement, dialect, parameters, rows))
+    )
+    return result
+
+
+def _after_commit(session):
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        writer.submit(pending)
+
+
+def _after_transaction_end(session, transaction):
+    # Rolled back or closed without committing: drop what it captured
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+if AUDIT_ENABLED:
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "do_orm_execute", _on_execute)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_transaction_end", _after_transaction_end)
+
+
+# Writing
+def _value(value):
+    if isinstance(value, str):
+        return value if len(value) <= MAX_VALUE_CHARS else f"{value[:MAX_VALUE_CHARS]}… ({len(value)} chars)"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_value(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _statement_row_id(s):
+    """Primary key a statement targets through `WHERE id = :value [AND ...]`, or None"""
+    where = getattr(s.statement, "whereclause", None)
+    clauses = where.clauses if isinstance(where, BooleanClauseList) and where.operator is operators.and_ else [where]
+    for clause in clauses:
+        left, right = getattr(clause, "left", None), getattr(clause, "right", None)
+        if (getattr(clause, "operator", None) is operators.eq and getattr(left, "primary_key", False)
+                and isinstance(right, BindParameter)):
+            value = (s.parameters or {}).get(right.key, right.value)
+            return None if value is None else str(value)
+    return None
+
+
+def _encode_changes(changes):
+    if isinstance(changes, Statement):
+        compiled = changes.statement.compile(dialect=changes.dialect)
+        params = dict(compiled.params)
+        if changes.parameters:
+            params.update(changes.parameters)
+        changes = {
+            "sql": " ".join(str(compiled).split()),
+            "params": {k: _value(v) for k, v in params.items()},
+            "rows": changes.rows
+        }
+    else:
+        changes = {k: _value(v) for k, v in changes.items()}
+    return json.dumps(changes, separators=(",", ":"), ensure_ascii=False)
+
+
+def log_path(tenant, month):
+    return os.path.join(AUDIT_DIR, tenant or "_default", f"audit-{month}.db")
+
+
+def _connect(path, read_only=False):
+    if read_only:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+    return conn
+
+
+class AuditWriter:
+    """Appends committed entries to the log files from one background thread per process"""
+
+    _STOP = object()
+
+    def __init__(self, flush_seconds=AUDIT_FLUSH_SECONDS, batch_size=BATCH_SIZE, max_pending=MAX_PENDING_COMMITS):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._connections = {}
+        self.stats = {"entries": 0, "batches": 0, "failed_batches": 0, "lost": 0, "last_batch_seconds": None}
+
+    def _ensure_thread(self):
+        # Started on first use, and again in a forked worker
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self.queue = queue.Queue(maxsize=self.queue.maxsize)
+                    self._connections = {}
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name="collegebuddy-audit", daemon=True)
+                self._thread.start()
+
+    def submit(self, entries):
+        """Queue one commit's entries; blocks only while the queue is full"""
+        self._ensure_thread()
+        txn = os.urandom(8).hex()
+        self.queue.put((txn, entries))
+
+    def flush(self, timeout=10):
+        """Wait until everything queued so far is on disk"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=10):
+        if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+            return
+        self.queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    txn, entries = item
+                    batch.extend((txn, entry) for entry in entries)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for done in waiters:
+                done.set()
+            if stop:
+                break
+        for conn in self._connections.values():
+            conn.close()
+        self._connections = {}
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        files = defaultdict(list)
+        for txn, e in batch:
+            at = datetime.utcfromtimestamp(e.at)
+            row_id = _statement_row_id(e.changes) if isinstance(e.changes, Statement) else e.row_id
+            files[e.tenant, at.strftime("%Y-%m")].append((
+                at.isoformat(timespec="microseconds"), e.actor, e.request, e.table, row_id, e.op,
+                _encode_changes(e.changes), txn
+            ))
+        for (tenant, month), rows in files.items():
+            path = log_path(tenant, month)
+            for attempt in range(3):
+                try:
+                    conn = self._connections.get(path)
+                    if conn is None:
+                        conn = self._connections[path] = _connect(path)
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO audit_log (at, actor, request, table_name, row_id, op, changes, txn) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            rows
+                        )
+                    break
+                except sqlite3.Error as e:
+                    self._connections.pop(path, None)
+                    self.stats["failed_batches"] += 1
+                    if attempt == 2:
+                        self.stats["lost"] += len(rows)
+                        print(f"⚠️ Audit log {path} lost {len(rows)} entries: {e}")
+                    else:
+                        time.sleep(0.5 * (attempt + 1))
+        self.stats["entries"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["last_batch_seconds"] = round(time.perf_counter() - started, 4)
+
+
+writer = AuditWriter()
+atexit.register(writer.close)
+
+
+def flush_audit():
+    writer.flush()
+
+
+def close_audit():
+    writer.close()
+
+
+def audit_stats():
+    if not AUDIT_ENABLED:
+        return None
+    return dict(writer.stats, queued_commits=writer.queue.qsize())
+
+
+# Reading
+def query_audit(tenant=None, table=None, row_id=None, actor=None, op=None, txn=None,
+                since=None, until=None, limit=100, cursor=None):
+    """Log entries matching every given filter, newest first.
+
+    since and until are datetimes. Returns the entries and a cursor for the
+    next page, or None when there are no more.
+    """
+    files = sorted(glob.glob(os.path.join(AUDIT_DIR, tenant or "_default", "audit-*.db")), reverse=True)
+    since = since.isoformat() if since else None
+    until = until.isoformat() if until else None
+    cursor_month, cursor_id = None, None
+    if cursor:
+        cursor_month, _, cursor_id = cursor.partition(":")
+        cursor_id = int(cursor_id)
+
+    conditions, params = [], []
+    for column, value in (("table_name", table), ("row_id", row_id), ("actor", actor), ("op", op), ("txn", txn)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(str(value))
+    if since:
+        conditions.append("at >= ?")
+        params.append(since)
+    if until:
+        conditions.append("at < ?")
+        params.append(until)
+
+    entries, next_cursor = [], None
+    for path in files:
+        month = os.path.basename(path)[len("audit-"):-len(".db")]
+        if (since and month < since[:7]) or (until and month > until[:7]) or (cursor_month and month > cursor_month):
+            continue
+        where, args = list(conditions), list(params)
+        if month == cursor_month:
+            where.append("id < ?")
+            args.append(cursor_id)
+        sql = "SELECT id, at, actor, request, table_name, row_id, op, changes, txn FROM audit_log"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        conn = _connect(path, read_only=True)
+        try:
+            rows = conn.execute(sql, args + [limit - len(entries)]).fetchall()
+        finally:
+            conn.close()
+        for entry_id, at, entry_actor, request, table_name, entry_row_id, entry_op, changes, entry_txn in rows:
+            entries.append({
+                "at": at,
+                "actor": entry_actor,
+                "request": request,
+                "table": table_name,
+                "row_id": entry_row_id,
+                "op": entry_op,
+                "changes": json.loads(changes) if changes else None,
+                "txn": entry_txn
+            })
+            next_cursor = f"{month}:{entry_id}"
+        if len(entries) >= limit:
+            return entries, next_cursor
+    return entries, None
@@ -0,0 +1,214 @@
+"""
+Benchmarks for CollegeBuddy Application
+
+    python benchmark.py backends --url sqlite:///./bench.db \
+        --url postgresql+psycopg2://localhost/collegebuddy_bench
+    python benchmark.py registration --url sqlite:///./bench.db --students 500 --capacity 40
+
+WARNING: every benchmark drops and recreates all tables in the databases
+it is pointed at. Never run it against a database you care about.
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from bulk import bulk_insert, stream_query
+from database import engine_options
+from models import Base, Student, Course, Enrollment, Assignment, Grade
+from registration import enroll, drop, ACTIVE, WAITLISTED
+from synthetic import build_dataset
+
+
+def _timed(label, results, fn):
+    started = time.perf_counter()
+    value = fn()
+    results[label] = time.perf_counter() - started
+    return value
+
+
+def bench_backend(url, dataset, lookups, seed=42):
+    """Run every benchmark step against one database URL"""
+    engine = create_engine(url, **engine_options(url))
+    Session = sessionmaker(bind=engine)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    results = {}
+
+    def load():
+        db = Session()
+        try:
+            for model, rows in dataset:
+                bulk_insert(db, model, rows)
+            db.commit()
+        finally:
+            db.close()
+
+    def point_lookups():
+        rng = random.Random(seed)
+        student_count = len(dataset[0][1])
+        db = Session()
+        try:
+            for _ in range(lookups):
+                code = f"STU{rng.randint(1, student_count):06d}"
+                db.query(Student).filter(Student.student_id == code).first()
+        finally:
+            db.close()
+
+    def stream_scan():
+        db = Session()
+        try:
+            return sum(1 for _ in stream_query(db.query(Grade)))
+        finally:
+            db.close()
+
+    def course_averages():
+        db = Session()
+        try:
+            return (
+                db.query(Assignment.course_id, func.avg(Grade.percentage))
+                .join(Grade, Grade.assignment_id == Assignment.id)
+                .group_by(Assignment.course_id)
+                .all()
+            )
+        finally:
+            db.close()
+
+    _timed("bulk load", results, load)
+    _timed(f"{lookups} point lookups", results, point_lookups)
+    _timed("stream grades", results, stream_scan)
+    _timed("course averages", results, course_averages)
+    engine.dispose()
+    return results
+
+
+def cmd_backends(args):
+    dataset = build_dataset(
+        args.students, args.courses, args.courses_per_student, args.assignments_per_course,
+        seed=args.seed, as_of=datetime(2025, 12, 1)
+    )
+    total_rows = sum(len(rows) for _, rows in dataset)
+    print(f"Dataset: {total_rows} rows")
+
+    all_results = {}
+    for url in args.url:
+        print(f"Benchmarking {url} ...")
+        all_results[url] = bench_backend(url, dataset, args.lookups)
+
+    labels = list(next(iter(all_results.values())).keys())
+    print()
+    print(f"{'step':<24}" + "".join(f"{url.split(':')[0]:>16}" for url in all_results))
+    for label in labels:
+        print(f"{label:<24}" + "".join(f"{r[label]:>15.3f}s" for r in all_results.values()))
+
+
+def cmd_registration(args):
+    """Hammer one course with concurrent enrolls and drops, then check invariants"""
+    engine = create_engine(args.url, **engine_options(args.url))
+    Session = sessionmaker(bind=engine)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    db = Session()
+    dataset = build_dataset(args.students, 1, courses_per_student=0, assignments_per_course=0,
+                            notes_per_student=0, seed=args.seed)
+    bulk_insert(db, Student, dict(dataset)[Student])
+    course = Course(course_code="RACE101", name="Registration Race", capacity=args.capacity, enrolled_count=0)
+    db.add(course)
+    db.commit()
+    course_id = course.id
+    student_ids = [pk for (pk,) in db.query(Student.id)]
+    db.close()
+
+    def register(student_id):
+        """True if done, False if the database stayed locked (SQLite under heavy load)"""
+        rng = random.Random(student_id)
+        session = Session()
+        try:
+            enrollment = enroll(session, student_id, course_id)
+            if rng.random() < args.drop_rate:
+                drop(session, enrollment)
+            return True
+        except OperationalError:
+            session.rollback()
+            return False
+        finally:
+            session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        busy = sum(1 for done in pool.map(register, student_ids) if not done)
+    elapsed = time.perf_counter() - started
+
+    db = Session()
+    try:
+        counts = dict(
+            db.query(Enrollment.status, func.count(Enrollment.id))
+            .filter(Enrollment.course_id == course_id)
+            .group_by(Enrollment.status)
+        )
+        enrolled_count = db.query(Course.enrolled_count).filter(Course.id == course_id).scalar()
+    finally:
+        db.close()
+    engine.dispose()
+
+    active, waitlisted = counts.get(ACTIVE, 0), counts.get(WAITLISTED, 0)
+    print(f"{len(student_ids)} registrations with {args.threads} threads in {elapsed:.2f}s "
+          f"({len(student_ids) / elapsed:,.0f}/s)")
+    print(f"Statuses: {counts}, enrolled_count {enrolled_count}, capacity {args.capacity}")
+    if busy:
+        print(f"⚠️ {busy} registrations gave up waiting for the database lock")
+    problems = []
+    if active > args.capacity:
+        problems.append(f"over-enrolled: {active} active for {args.capacity} seats")
+    if enrolled_count != active:
+        problems.append(f"enrolled_count {enrolled_count} does not match {active} active rows")
+    if waitlisted and active < args.capacity:
+        problems.append(f"{waitlisted} waitlisted while {args.capacity - active} seats are free")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ No over-enrollment, counter consistent, waitlist only when full")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="CollegeBuddy benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backends = commands.add_parser("backends", help="Compare database backends on one dataset")
+    backends.add_argument("--url", action="append", required=True, help="Database URL (repeatable)")
+    backends.add_argument("--students", type=int, default=10000)
+    backends.add_argument("--courses", type=int, default=200)
+    backends.add_argument("--courses-per-student", type=int, default=5)
+    backends.add_argument("--assignments-per-course", type=int, default=8)
+    backends.add_argument("--lookups", type=int, default=2000)
+    backends.add_argument("--seed", type=int, default=42)
+    backends.set_defaults(func=cmd_backends)
+
+    registration = commands.add_parser("registration", help="Concurrent enroll/drop stress test")
+    registration.add_argument("--url", required=True, help="Database URL")
+    registration.add_argument("--students", type=int, default=500)
+    registration.add_argument("--capacity", type=int, default=40)
+    registration.add_argument("--threads", type=int, default=64)
+    registration.add_argument("--drop-rate", type=float, default=0.2,
+                              help="Share of students who drop right after registering")
+    registration.add_argument("--seed", type=int, default=42)
+    registration.set_defaults(func=cmd_registration)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
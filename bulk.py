@@ -0,0 +1,113 @@
+"""
+Bulk Data Paths for CollegeBuddy Application
+
+Backend-specific fast paths: PostgreSQL loads rows with COPY and streams
+large results through server-side cursors; other backends fall back to
+executemany inserts and buffered cursors. COPY goes through psycopg2's
+copy_expert, so other PostgreSQL drivers (psycopg 3, asyncpg, pg8000) use
+executemany too.
+"""
+import csv
+import io
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from database import is_postgres
+
+INSERT_CHUNK_SIZE = 5000
+STREAM_CHUNK_SIZE = 1000
+COPY_NULL = "\\N"
+
+# DBAPI drivers whose cursors have copy_expert
+COPY_DRIVERS = {"psycopg2"}
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def can_copy(bind):
+    """True if bulk_insert can use COPY on this engine or connection"""
+    return is_postgres(bind) and bind.dialect.driver in COPY_DRIVERS
+
+
+def bulk_insert(db: Session, model, rows, chunk_size: int = INSERT_CHUNK_SIZE):
+    """Insert a list of column dicts into a model's table.
+
+    Every dict must have the same keys. Does not commit.
+    """
+    if not rows:
+        return 0
+
+    table = model.__table__
+    if can_copy(db.get_bind()):
+        _copy_insert(db, table, rows)
+    else:
+        for chunk in _chunks(rows, chunk_size):
+            db.execute(table.insert(), chunk)
+    return len(rows)
+
+
+def _copy_insert(db: Session, table, rows):
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([COPY_NULL if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+
+    column_list = ", ".join(columns)
+    raw = db.connection().connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table.name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer
+        )
+        # COPY bypasses the id sequence when ids are supplied explicitly
+        if "id" in columns:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+            )
+
+
+def streaming_session(db: Session):
+    """A session of its own on db's database, for a response body that is
+    read after the request's session has been closed. Close it when done.
+    """
+    return Session(bind=db.get_bind(), info=dict(db.info))
+
+
+def stream_query(query, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Iterate a query's results without loading them all at once.
+
+    On PostgreSQL this opens a server-side cursor.
+    """
+    return query.execution_options(stream_results=True).yield_per(chunk_size)
+
+
+def stream_json_list(rows, to_dict):
+    """Stream a query's results as a JSON array, encoding one item at a time.
+
+    The query runs on its own session, opened and closed by the response,
+    since the request's session may already be closed when the body is sent.
+    """
+    def generate():
+        session = streaming_session(rows.session)
+        try:
+            yield "["
+            first = True
+            for row in rows.with_session(session):
+                if not first:
+                    yield ","
+                first = False
+                yield json.dumps(jsonable_encoder(to_dict(row)))
+            yield "]"
+        finally:
+            session.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
@@ -0,0 +1,179 @@
+"""
+Read Caches for CollegeBuddy Application
+
+Every worker process keeps its own copy of these caches. Nothing is shared
+between processes, so entries expire after CACHE_TTL_SECONDS to bound how
+long a write made through another worker can stay invisible here.
+
+Keys start with the session's tenant (None in single-tenant mode), so
+colleges served by the same process never see each other's entries.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy.orm import Session
+from models import Student, Course, Enrollment, Assignment, Event
+
+CACHE_TTL_SECONDS = float(os.getenv("COLLEGEBUDDY_CACHE_TTL", "30"))
+
+
+class ReadCache:
+    """Small thread-safe key/value cache with a fixed time-to-live"""
+
+    def __init__(self, ttl: float = CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        """Drop every tuple key starting with prefix"""
+        with self._lock:
+            for key in [k for k in self._entries if isinstance(k, tuple) and k[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+
+def tenant_key(db: Session, *parts):
+    """Cache key scoped to the session's tenant"""
+    return (db.info.get("tenant"),) + parts
+
+
+course_cache = ReadCache()
+stats_cache = ReadCache()
+
+
+def course_to_dict(c):
+    return {
+        "id": c.id,
+        "course_code": c.course_code,
+        "name": c.name,
+        "description": c.description,
+        "credits": c.credits,
+        "professor": c.professor,
+        "semester": c.semester,
+        "year": c.year,
+        "schedule": c.schedule,
+        "location": c.location,
+        "capacity": c.capacity,
+        "enrolled_count": c.enrolled_count
+    }
+
+
+def _roster_entry(s):
+    return {
+        "student_id": s.student_id,
+        "name": s.name,
+        "email": s.email,
+        "major": s.major,
+        "year": s.year
+    }
+
+
+def _load_catalog(db: Session):
+    return [course_to_dict(c) for c in db.query(Course).all()]
+
+
+def _load_roster(db: Session, course_code: str):
+    students = (
+        db.query(Student)
+        .join(Enrollment, Enrollment.student_id == Student.id)
+        .join(Course, Course.id == Enrollment.course_id)
+        .filter(Course.course_code == course_code, Enrollment.status == "Active")
+        .all()
+    )
+    return [_roster_entry(s) for s in students]
+
+
+def course_catalog(db: Session):
+    """Get the full course catalog"""
+    return course_cache.get_or_load(tenant_key(db, "catalog"), lambda: _load_catalog(db))
+
+
+def course_roster(db: Session, course_code: str):
+    """Get the active roster for a course"""
+    return course_cache.get_or_load(
+        tenant_key(db, "roster", course_code), lambda: _load_roster(db, course_code)
+    )
+
+
+def invalidate_courses(db: Session):
+    """Forget cached catalog and rosters after a course write"""
+    course_cache.invalidate_prefix(tenant_key(db))
+
+
+def refresh_catalog(db: Session):
+    """Reload the course catalog into the cache"""
+    catalog = _load_catalog(db)
+    course_cache.set(tenant_key(db, "catalog"), catalog)
+    return catalog
+
+
+def prewarm(db: Session):
+    """Load the catalog and every roster using two queries"""
+    catalog = refresh_catalog(db)
+
+    rosters = defaultdict(list)
+    rows = (
+        db.query(Course.course_code, Student)
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .join(Student, Student.id == Enrollment.student_id)
+        .filter(Enrollment.status == "Active")
+        .all()
+    )
+    for course_code, student in rows:
+        rosters[course_code].append(_roster_entry(student))
+
+    for course in catalog:
+        code = course["course_code"]
+        course_cache.set(tenant_key(db, "roster", code), rosters.get(code, []))
+
+
+def _load_stats(db: Session):
+    return {
+        "total_students": db.query(Student).count(),
+        "total_courses": db.query(Course).count(),
+        "total_assignments": db.query(Assignment).count(),
+        "total_events": db.query(Event).count()
+    }
+
+
+def quick_stats(db: Session):
+    """Dashboard counts; kept fresh by the stats_rollup job"""
+    return stats_cache.get_or_load(tenant_key(db, "stats"), lambda: _load_stats(db))
+
+
+def refresh_stats(db: Session):
+    stats = _load_stats(db)
+    stats_cache.set(tenant_key(db, "stats"), stats)
+    return stats
@@ -0,0 +1,238 @@
+"""
+iCalendar Feeds for CollegeBuddy Application
+
+Builds a per-student .ics feed: each enrolled course becomes a weekly
+recurring event for its term, plus the student's course and campus events.
+Feeds are cached per worker under an ETag derived from a cheap fingerprint
+of the rows they depend on, so polling calendar apps usually get a 304.
+"""
+import hashlib
+import re
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from cache import ReadCache, tenant_key
+from models import Course, Enrollment, Event
+
+# First and last day of classes per semester, as (month, day)
+TERM_DATES = {
+    "Spring": ((1, 13), (5, 2)),
+    "Summer": ((5, 27), (8, 8)),
+    "Fall": ((8, 25), (12, 12))
+}
+
+# Campus events older than this are left out of feeds
+EVENT_LOOKBACK = timedelta(days=30)
+
+DAY_CODES = [("Th", "TH"), ("Sa", "SA"), ("Su", "SU"), ("M", "MO"), ("T", "TU"),
+             ("W", "WE"), ("R", "TH"), ("F", "FR")]
+WEEKDAY_INDEX = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+_SCHEDULE_RE = re.compile(
+    r"^\s*(?P<days>[A-Za-z]+)\s+(?P<start>\d{1,2}:\d{2})\s*(?P<start_ampm>[AaPp][Mm])?"
+    r"\s*-\s*(?P<end>\d{1,2}:\d{2})\s*(?P<end_ampm>[AaPp][Mm])?\s*$"
+)
+
+feed_cache = ReadCache(ttl=24 * 3600)
+
+
+def _parse_days(text):
+    days = []
+    while text:
+        for token, code in DAY_CODES:
+            if text.startswith(token):
+                days.append(code)
+                text = text[len(token):]
+                break
+        else:
+            return None
+    return days
+
+
+def _parse_time(text, ampm):
+    hour, minute = (int(part) for part in text.split(":"))
+    if ampm:
+        hour = hour % 12 + (12 if ampm.lower() == "pm" else 0)
+    elif hour < 7:
+        # Class times without AM/PM before 7 are afternoon, e.g. "2:00-3:30"
+        hour += 12
+    return time(hour, minute)
+
+
+def parse_schedule(schedule):
+    """Parse "MWF 10:00-11:00" into (["MO", "WE", "FR"], start, end), or None"""
+    match = _SCHEDULE_RE.match(schedule or "")
+    if not match:
+        return None
+    days = _parse_days(match.group("days"))
+    if not days:
+        return None
+    start = _parse_time(match.group("start"), match.group("start_ampm"))
+    end = _parse_time(match.group("end"), match.group("end_ampm") or match.group("start_ampm"))
+    return days, start, end
+
+
+def term_dates(semester, year):
+    """First and last day of classes for a term, or None if unknown"""
+    if semester not in TERM_DATES or not year:
+        return None
+    (start_month, start_day), (end_month, end_day) = TERM_DATES[semester]
+    return date(year, start_month, start_day), date(year, end_month, end_day)
+
+
+def _escape(text):
+    return (
+        str(text).replace("\\", "\\\\").replace(";", "\\;")
+        .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Fold a content line at 75 octets as RFC 5545 requires"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Never split a multi-byte character
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+def _stamp(value):
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _course_event(course, dtstamp):
+    parsed = parse_schedule(course.schedule)
+    dates = term_dates(course.semester, course.year)
+    if not parsed or not dates:
+        return []
+    days, start, end = parsed
+    first_day, last_day = dates
+
+    # First class meeting on or after the start of term
+    offset = min((WEEKDAY_INDEX[d] - first_day.weekday()) % 7 for d in days)
+    first_meeting = first_day + timedelta(days=offset)
+
+    return [
+        "BEGIN:VEVENT",
+        f"UID:course-{course.id}@collegebuddy",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{_stamp(datetime.combine(first_meeting, start))}",
+        f"DTEND:{_stamp(datetime.combine(first_meeting, end))}",
+        f"RRULE:FREQ=WEEKLY;BYDAY={','.join(days)};UNTIL={_stamp(datetime.combine(last_day, time(23, 59, 59)))}",
+        f"SUMMARY:{_escape(f'{course.course_code} - {course.name}')}",
+        f"LOCATION:{_escape(course.location or '')}",
+        f"DESCRIPTION:{_escape(course.professor or '')}",
+        "END:VEVENT"
+    ]
+
+
+def _event(event, dtstamp):
+    if event.start_time is None:
+        return []
+    end_time = event.end_time or event.start_time + timedelta(hours=1)
+    return [
+        "BEGIN:VEVENT",
+        f"UID:event-{event.id}@collegebuddy",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{_stamp(event.start_time)}",
+        f"DTEND:{_stamp(end_time)}",
+        f"SUMMARY:{_escape(event.title or '')}",
+        f"LOCATION:{_escape(event.location or '')}",
+        f"DESCRIPTION:{_escape(event.description or '')}",
+        f"CATEGORIES:{_escape(event.event_type or 'Other')}",
+        "END:VEVENT"
+    ]
+
+
+def _enrolled_courses(db: Session, student_pk):
+    return (
+        db.query(Course)
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .filter(Enrollment.student_id == student_pk, Enrollment.status == "Active")
+        .order_by(Course.id)
+        .all()
+    )
+
+
+def _events_filter(course_codes):
+    return [
+        or_(Event.course_code.in_(course_codes), Event.course_code.is_(None)),
+        Event.start_time >= datetime.now() - EVENT_LOOKBACK
+    ]
+
+
+def feed_fingerprint(db: Session, student_pk):
+    """ETag for a student's feed, computed without building it.
+
+    Hashes every column the feed renders, for the enrolled courses and the
+    relevant events, so an event edited in place changes the tag too.
+    """
+    courses = _enrolled_courses(db, student_pk)
+    events = (
+        db.query(Event.id, Event.title, Event.description, Event.event_type,
+                 Event.start_time, Event.end_time, Event.location)
+        .filter(*_events_filter([c.course_code for c in courses]))
+        .order_by(Event.id)
+    )
+    digest = hashlib.sha1()
+    for c in courses:
+        digest.update(
+            f"{c.id}|{c.course_code}|{c.name}|{c.professor}|{c.schedule}|{c.location}|{c.semester}|{c.year}\n"
+            .encode("utf-8")
+        )
+    for event in events:
+        digest.update(("event|" + "|".join(str(value) for value in event) + "\n").encode("utf-8"))
+    return f'"{digest.hexdigest()}"', courses
+
+
+def build_feed(db: Session, courses):
+    """Render the VCALENDAR text for a list of enrolled courses"""
+    dtstamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//CollegeBuddy//Student Calendar//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:CollegeBuddy"
+    ]
+    for course in courses:
+        lines += _course_event(course, dtstamp)
+
+    events = (
+        db.query(Event)
+        .filter(*_events_filter([c.course_code for c in courses]))
+        .order_by(Event.start_time)
+        .all()
+    )
+    for event in events:
+        lines += _event(event, dtstamp)
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+def student_feed(db: Session, student_pk, if_none_match=None):
+    """Return (etag, body) for a student, regenerating only on change.
+
+    body is None when if_none_match already names the current ETag.
+    """
+    etag, courses = feed_fingerprint(db, student_pk)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return etag, None
+
+    key = tenant_key(db, student_pk)
+    cached = feed_cache.get(key)
+    if cached is not None and cached[0] == etag:
+        return cached
+    entry = (etag, build_feed(db, courses))
+    feed_cache.set(key, entry)
+    return entry
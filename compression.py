@@ -0,0 +1,248 @@
+"""
+Response Compression and Conditional GET for CollegeBuddy Application
+
+For GET responses with a known length, the body gets a weak ETag so
+clients can revalidate with If-None-Match and receive a 304, and large
+bodies are compressed with the best encoding both sides support (zstd,
+then brotli, then gzip). Compressed bodies are cached by ETag, so an
+unchanged payload is only compressed once per worker. Streamed responses
+are compressed chunk by chunk without buffering.
+
+brotli and zstd are used only when the brotli / zstandard packages are
+installed.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Bodies smaller than this are sent as-is
+MIN_COMPRESS_SIZE = int(os.getenv("COLLEGEBUDDY_COMPRESS_MIN_SIZE", "1024"))
+
+# Memory budget for cached compressed bodies, per worker
+CACHE_BYTES = int(os.getenv("COLLEGEBUDDY_COMPRESS_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/calendar",
+    "text/plain"
+)
+
+# Preferred first when the client weighs them equally
+ENCODINGS = [name for name, available in (
+    ("zstd", zstandard is not None),
+    ("br", brotli is not None),
+    ("gzip", True)
+) if available]
+
+
+def choose_encoding(accept_encoding):
+    """Best supported encoding for an Accept-Encoding header, or None"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    candidates = [
+        (weights.get(name, weights.get("*", 0.0)), -rank, name)
+        for rank, name in enumerate(ENCODINGS)
+    ]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def compress(encoding, body):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class _StreamCompressor:
+    """Incremental compressor that flushes after every chunk"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=3).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=5)
+        else:
+            self._obj = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == "zstd":
+            return self._obj.compress(chunk) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if self.encoding == "br":
+            return self._obj.process(chunk) + self._obj.flush()
+        return self._obj.compress(chunk) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "zstd":
+            return self._obj.flush()
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by (etag, encoding), bounded in bytes"""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _without(headers, *names):
+    return [(k, v) for k, v in headers if k.lower() not in names]
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag.replace("W/", "") in tags
+
+
+class CompressionMiddleware:
+    """ASGI middleware adding ETags, 304s and negotiated compression"""
+
+    def __init__(self, app, min_size=MIN_COMPRESS_SIZE, cache=None):
+        self.app = app
+        self.min_size = min_size
+        self.cache = cache or CompressedCache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope.get("headers", [])
+        encoding = choose_encoding(_header(request_headers, b"accept-encoding") or "")
+        if_none_match = _header(request_headers, b"if-none-match")
+
+        state = {"start": None, "mode": None, "chunks": [], "stream": None}
+
+        async def wrapped_send(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (_header(headers, b"content-type") or "").split(";")[0].strip()
+                # Byte ranges refer to the uncompressed file, so leave those alone
+                compressible = (
+                    content_type in COMPRESSIBLE_TYPES
+                    and _header(headers, b"content-encoding") is None
+                    and _header(headers, b"accept-ranges") is None
+                )
+                if message["status"] != 200 or not compressible:
+                    state["mode"] = "passthrough"
+                    await send(message)
+                elif _header(headers, b"content-length") is not None:
+                    state["mode"] = "buffer"
+                    state["start"] = message
+                else:
+                    state["mode"] = "stream" if encoding else "passthrough"
+                    if encoding:
+                        state["stream"] = _StreamCompressor(encoding)
+                        headers = _without(headers, b"content-length") + [
+                            (b"content-encoding", encoding.encode()),
+                            (b"vary", b"Accept-Encoding")
+                        ]
+                        message = dict(message, headers=headers)
+                    await send(message)
+                return
+
+            if state["mode"] == "passthrough":
+                await send(message)
+            elif state["mode"] == "stream":
+                more = message.get("more_body", False)
+                body = state["stream"].compress(message.get("body", b""))
+                if not more:
+                    body += state["stream"].finish()
+                await send({"type": "http.response.body", "body": body, "more_body": more})
+            else:
+                state["chunks"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._send_buffered(send, state["start"], b"".join(state["chunks"]),
+                                              encoding, if_none_match)
+
+        await self.app(scope, receive, wrapped_send)
+
+    async def _send_buffered(self, send, start, body, encoding, if_none_match):
+        headers = list(start.get("headers", []))
+        etag = _header(headers, b"etag")
+        if etag is None:
+            etag = 'W/"' + hashlib.sha1(body).hexdigest() + '"'
+            headers.append((b"etag", etag.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+
+        if _etag_matches(if_none_match, etag):
+            headers = _without(headers, b"content-length", b"content-type")
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if encoding and len(body) >= self.min_size:
+            key = (etag, encoding)
+            compressed = self.cache.get(key)
+            if compressed is None:
+                compressed = compress(encoding, body)
+                self.cache.set(key, compressed)
+            body = compressed
+            headers = _without(headers, b"content-length") + [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode())
+            ]
+
+        await send({"type": "http.response.start", "status": start["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,48 +1,211 @@
 """
 Database Configuration for CollegeBuddy Application
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 from models import Base
+from audit import request_actor
+from migrations import migrate, get_schema_version, head_version
+from tenancy import TENANT_URL_TEMPLATE, TenantRegistry, UnknownTenant, tenant_from_scope
 
-# SQLite database configuration
-DATABASE_URL = "sqlite:///./collegebuddy.db"
+# Database configuration; any SQLAlchemy URL works, SQLite is the default
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./collegebuddy.db")
+
+# Connection pool sizing for client/server backends such as PostgreSQL
+POOL_SIZE = int(os.getenv("COLLEGEBUDDY_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("COLLEGEBUDDY_MAX_OVERFLOW", "20"))
+POOL_RECYCLE_SECONDS = int(os.getenv("COLLEGEBUDDY_POOL_RECYCLE", "1800"))
+
+def engine_options(url):
+    """Backend-specific create_engine arguments"""
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_recycle": POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True
+    }
+
+def is_postgres(bind):
+    """True if the engine or connection talks to PostgreSQL"""
+    return bind.dialect.name == "postgresql"
 
 # Create database engine
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+
+@event.listens_for(Engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers keep going while a writer (or index build) runs"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replicas: comma-separated URLs, e.g. copies of the SQLite file or a
+# Postgres standby. GET requests are spread over them round-robin.
+READ_REPLICA_URLS = [
+    url.strip() for url in os.getenv("COLLEGEBUDDY_READ_REPLICAS", "").split(",") if url.strip()
+]
+
+# After a client writes, its reads stay on the primary for this long so it
+# sees its own changes despite replica lag
+STICKY_SECONDS = float(os.getenv("COLLEGEBUDDY_STICKY_SECONDS", "5"))
+LAST_WRITE_COOKIE = "cb_last_write"
+READ_METHODS = ("GET", "HEAD")
+
+replica_engines = [create_engine(url, **engine_options(url)) for url in READ_REPLICA_URLS]
+ReplicaSessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=e, info={"read_only": True})
+    for e in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessions) if ReplicaSessions else None
+_replica_lock = threading.Lock()
+
+@event.listens_for(Session, "before_flush")
+def _reject_replica_writes(session, flush_context, instances):
+    if session.info.get("read_only"):
+        raise RuntimeError("Attempted to write through a read-replica session")
+
+# Multi-tenant mode: when COLLEGEBUDDY_TENANT_URL is set, every request is
+# routed to its tenant's database and the primary/replicas above go unused
+tenants = TenantRegistry(TENANT_URL_TEMPLATE, engine_options) if TENANT_URL_TEMPLATE else None
+
+def request_tenant(connection):
+    """Tenant for a request or websocket; None in single-tenant mode"""
+    if tenants is None:
+        return None
+    tenant = tenant_from_scope(connection.scope)
+    if not tenants.known(tenant):
+        raise HTTPException(status_code=404, detail="Unknown tenant")
+    return tenant
+
+def session_factories():
+    """Session factories for work outside a request: the primary, or every known tenant"""
+    if tenants is None:
+        return [SessionLocal]
+    return [partial(tenants.session, tenant) for tenant in tenants.all_known()]
+
+def init_tenants():
+    """Open and migrate every known tenant's database; returns their names"""
+    names = tenants.all_known() if tenants is not None else []
+    for tenant in names:
+        tenants.get(tenant)
+    return names
+
+def tenant_stats():
+    """Per-tenant engine and usage counters, or None in single-tenant mode"""
+    return tenants.stats() if tenants is not None else None
+
+def dispose_engines():
+    """Close pooled connections on the primary, every replica and every tenant"""
+    engine.dispose()
+    for replica in replica_engines:
+        replica.dispose()
+    if tenants is not None:
+        tenants.dispose_all()
+
+def _next_replica_session():
+    with _replica_lock:
+        factory = next(_replica_cycle)
+    return factory()
+
+def _wrote_recently(request: Request):
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() - last_write < STICKY_SECONDS
+
+# Latest version known to migrations.py
+SCHEMA_VERSION = head_version()
+
 # Create all tables
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
 
+def _open_session(request: Request, response: Response, read_only: bool):
+    db = _route_session(request, response, read_only)
+    db.info["actor"], db.info["request"] = request_actor(request)
+    return db
+
+def _route_session(request: Request, response: Response, read_only: bool):
+    if tenants is not None:
+        try:
+            return tenants.session(request_tenant(request))
+        except UnknownTenant:
+            raise HTTPException(status_code=404, detail="Unknown tenant")
+    
+    if read_only:
+        use_replica = _replica_cycle is not None and not _wrote_recently(request)
+        return _next_replica_session() if use_replica else SessionLocal()
+    
+    if _replica_cycle is not None:
+        response.set_cookie(
+            LAST_WRITE_COOKIE, f"{time.time():.3f}",
+            max_age=int(STICKY_SECONDS) + 1, httponly=True
+        )
+    return SessionLocal()
+
 # Database dependency
-def get_db():
-    """Get database session"""
-    db = SessionLocal()
+def get_db(request: Request, response: Response):
+    """Get database session.
+    
+    Reads go to a replica when any are configured, unless this client wrote
+    within STICKY_SECONDS. Everything else goes to the primary, and writes
+    mark the client with a cookie so its next reads stay on the primary.
+    """
+    db = _open_session(request, response, request.method in READ_METHODS)
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request, response: Response):
+    """Get database session for a read-only endpoint of any HTTP method"""
+    db = _open_session(request, response, True)
     try:
         yield db
     finally:
         db.close()
 
 # Initialize database
-def init_db():
-    """Initialize database with sample data"""
-    create_tables()
+def init_db(bind=None):
+    """Migrate the schema unless the version marker says it is current.
     
+    Returns True if any schema work had to run. Sample data is never added
+    here; use `python manage.py seed` for that.
+    """
+    bind = bind or engine
+    if get_schema_version(bind) == SCHEMA_VERSION:
+        return False
+    
+    migrate(bind, log=print)
+    return True
+
+def seed_db():
+    """Add sample data if the database is empty"""
     db = SessionLocal()
     try:
         # Check if data already exists
-        from models import Student, Course
-        if db.query(Student).first() is None:
-            # Add sample data
-            add_sample_data(db)
+        from models import Student
+        if db.query(Student).first() is not None:
+            return False
+        add_sample_data(db)
+        return True
     finally:
         db.close()
 
@@ -0,0 +1,252 @@
+"""
+Bulk Export for CollegeBuddy Application
+
+Streams a whole table out of a database cursor in chunks and encodes each
+chunk as CSV, NDJSON or Parquet as it arrives, so memory use stays flat no
+matter how large the table is. Parquet needs the optional pyarrow package.
+
+Enrollments, assignments and grades include archived terms: their rows
+follow the hot ones, with their original ids and archived set to true.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select, exists, false, null, or_, true, Integer, Float, Boolean, DateTime
+from sqlalchemy.orm import Session
+
+from bulk import streaming_session
+from models import (
+    Student, Course, Enrollment, Assignment, Grade,
+    ArchivedEnrollment, ArchivedAssignment, ArchivedGrade
+)
+
+EXPORT_CHUNK_SIZE = 5000
+
+RESOURCES = {
+    "students": Student,
+    "courses": Course,
+    "enrollments": Enrollment,
+    "assignments": Assignment,
+    "grades": Grade
+}
+
+# Archive table holding each resource's finished terms
+ARCHIVES = {
+    Enrollment: ArchivedEnrollment,
+    Assignment: ArchivedAssignment,
+    Grade: ArchivedGrade
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _course_filter(semester=None, year=None, course_code=None):
+    conditions = []
+    if semester:
+        conditions.append(Course.semester == semester)
+    if year:
+        conditions.append(Course.year == year)
+    if course_code:
+        conditions.append(Course.course_code == course_code)
+    return conditions
+
+
+def _archived_query(model, conditions):
+    """SELECT of a resource's archived rows in the hot table's columns, source ids restored"""
+    archive = ARCHIVES[model]
+    archived_columns = archive.__table__.c
+    columns = []
+    for column in model.__table__.columns:
+        if column.name == "id":
+            columns.append(archive.source_id.label("id"))
+        elif model is Grade and column.name == "assignment_id":
+            columns.append(ArchivedAssignment.source_id.label("assignment_id"))
+        elif column.name in archived_columns:
+            columns.append(archived_columns[column.name])
+        else:
+            columns.append(null().label(column.name))
+    query = select(*columns, true().label("archived")).order_by(archive.id)
+    if model is Grade:
+        query = query.join(ArchivedAssignment, ArchivedAssignment.id == ArchivedGrade.assignment_id)
+        if conditions:
+            query = query.join(Course, Course.id == ArchivedAssignment.course_id)
+    elif conditions:
+        query = query.join(Course, Course.id == archive.course_id)
+    return query.where(*conditions)
+
+
+def export_queries(resource, semester=None, year=None, course_code=None):
+    """SELECTs whose rows together make up a resource's export, hot rows first"""
+    model = RESOURCES[resource]
+    conditions = _course_filter(semester, year, course_code)
+    queries = [export_query(resource, semester, year, course_code)]
+    if model in ARCHIVES:
+        queries[0] = queries[0].add_columns(false().label("archived"))
+        queries.append(_archived_query(model, conditions))
+    return queries
+
+
+def export_columns(resource):
+    model = RESOURCES[resource]
+    return [c.name for c in model.__table__.columns] + (["archived"] if model in ARCHIVES else [])
+
+
+def export_query(resource, semester=None, year=None, course_code=None):
+    """SELECT of a resource's hot rows, optionally limited to a term or course"""
+    model = RESOURCES[resource]
+    query = select(model.__table__).order_by(model.id)
+    conditions = _course_filter(semester, year, course_code)
+    if not conditions:
+        return query
+
+    if model is Course:
+        return query.where(*conditions)
+    if model in (Enrollment, Assignment):
+        return query.join(Course, Course.id == model.course_id).where(*conditions)
+    if model is Grade:
+        return (
+            query.join(Assignment, Assignment.id == Grade.assignment_id)
+            .join(Course, Course.id == Assignment.course_id)
+            .where(*conditions)
+        )
+    # Students enrolled in any matching course, in a current or archived term
+    return query.where(or_(*(
+        exists(
+            select(enrollment.id)
+            .join(Course, Course.id == enrollment.course_id)
+            .where(enrollment.student_id == Student.id, *conditions)
+        )
+        for enrollment in (Enrollment, ArchivedEnrollment)
+    )))
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def _encode_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(columns, chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_schema(table, archived=False):
+    import pyarrow as pa
+
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    if archived:
+        fields.append(pa.field("archived", pa.bool_()))
+    return pa.schema(fields)
+
+
+def _encode_parquet(table, columns, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(table, archived="archived" in columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        # One row group per chunk
+        for rows in chunks:
+            data = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+            writer.write_table(pa.Table.from_pydict(data, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_export(db: Session, resource, fmt="csv", semester=None, year=None,
+                course_code=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encoded export of a resource as an iterator of byte chunks.
+
+    Raises ValueError up front for an unknown resource or format.
+    """
+    if resource not in RESOURCES:
+        raise ValueError(f"Unknown resource: {resource}")
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet export requires the pyarrow package")
+
+    table = RESOURCES[resource].__table__
+    columns = export_columns(resource)
+    queries = export_queries(resource, semester, year, course_code)
+
+    def chunks():
+        # Read after the request's session may have closed, so on a session of its own
+        session = streaming_session(db)
+        try:
+            for query in queries:
+                result = session.execute(query, execution_options={"stream_results": True})
+                yield from result.partitions(chunk_size)
+        finally:
+            session.close()
+
+    if fmt == "csv":
+        return _encode_csv(columns, chunks())
+    if fmt == "ndjson":
+        return _encode_ndjson(columns, chunks())
+    return _encode_parquet(table, columns, chunks())
@@ -0,0 +1,87 @@
+"""
+Grading Rules for CollegeBuddy Application
+
+A scale is a list of (minimum percentage, letter) pairs, highest first,
+ending at 0. Courses may store their own scale and a curve in the
+grading_scales table; see regrade.py.
+"""
+
+# Default letter scale: (minimum percentage, letter), highest first
+DEFAULT_SCALE = [
+    (93.0, "A"),
+    (90.0, "A-"),
+    (87.0, "B+"),
+    (83.0, "B"),
+    (80.0, "B-"),
+    (77.0, "C+"),
+    (73.0, "C"),
+    (70.0, "C-"),
+    (67.0, "D+"),
+    (60.0, "D"),
+    (0.0, "F")
+]
+
+# Grade points per letter on a 4.0 scale
+GRADE_POINTS = {
+    "A": 4.0, "A-": 3.7,
+    "B+": 3.3, "B": 3.0, "B-": 2.7,
+    "C+": 2.3, "C": 2.0, "C-": 1.7,
+    "D+": 1.3, "D": 1.0,
+    "F": 0.0
+}
+
+
+def letter_for(percentage, scale=DEFAULT_SCALE):
+    """Letter grade for a percentage, or None if there is no percentage"""
+    if percentage is None:
+        return None
+    for minimum, letter in scale:
+        if percentage >= minimum:
+            return letter
+    return scale[-1][1]
+
+
+def percentage_of(points_earned, points_possible):
+    """Percentage score, or None when nothing was possible"""
+    if points_earned is None or not points_possible:
+        return None
+    return round(points_earned / points_possible * 100, 2)
+
+
+def parse_scale(text):
+    """Parse "93:A,90:A-,...,0:F" into a scale"""
+    scale = []
+    for part in (text or "").split(","):
+        minimum, _, letter = part.partition(":")
+        scale.append((float(minimum), letter.strip()))
+    return validate_scale(scale)
+
+
+def format_scale(scale):
+    return ",".join(f"{minimum:g}:{letter}" for minimum, letter in scale)
+
+
+def validate_scale(scale):
+    """Sort a scale highest first, raising ValueError if it is unusable"""
+    try:
+        scale = sorted(((float(m), str(l).strip()) for m, l in scale), reverse=True)
+    except (TypeError, ValueError):
+        raise ValueError("Scale entries must be [minimum percentage, letter] pairs")
+    if not scale or any(not letter or ":" in letter or "," in letter for _, letter in scale):
+        raise ValueError("Every cutoff needs a letter without ':' or ','")
+    if scale[-1][0] != 0:
+        raise ValueError("The lowest cutoff must be 0")
+    if len({minimum for minimum, _ in scale}) != len(scale):
+        raise ValueError("Cutoffs must be distinct")
+    return scale
+
+
+def curved(percentage, curve=0.0, max_percentage=100.0):
+    """Percentage after adding a curve.
+
+    The curve never lifts a grade above max_percentage, but grades already
+    above it through extra credit keep their score.
+    """
+    if percentage is None:
+        return None
+    return round(min(max(percentage, max_percentage), percentage + curve), 2)
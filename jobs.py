@@ -0,0 +1,104 @@
+"""
+Scheduled Jobs for CollegeBuddy Application
+
+The recurring work run by scheduler.py. Each job takes a session and does
+its own commits; modules are imported inside the job so loading this file
+stays cheap.
+"""
+import os
+
+from sqlalchemy import text
+
+from cache import CACHE_TTL_SECONDS
+from scheduler import job
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Archiving moves and deletes rows, so it only runs on a schedule when asked
+# for; otherwise it is left to `manage.py archive`
+ARCHIVE_JOB_ENABLED = os.getenv("COLLEGEBUDDY_ARCHIVE_JOB", "0") == "1"
+
+
+# Per-process jobs: every worker has its own caches
+@job("warm_caches", every=max(CACHE_TTL_SECONDS * 0.8, 5), per_process=True)
+def warm_caches(db):
+    """Reload the catalog before it expires.
+
+    Rosters are left to load lazily: refreshing them all would scan every
+    active enrollment in every worker on each run.
+    """
+    from cache import refresh_catalog
+
+    refresh_catalog(db)
+
+
+@job("stats_rollup", every=max(CACHE_TTL_SECONDS * 0.8, 5), per_process=True)
+def stats_rollup(db):
+    """Recount the dashboard totals off the request path"""
+    from cache import refresh_stats
+
+    return refresh_stats(db)
+
+
+# Shared jobs: one worker runs each
+@job("analyze", every=DAY)
+def analyze(db):
+    """Refresh the planner's statistics"""
+    engine = db.get_bind()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("PRAGMA optimize"))
+
+
+@job("vacuum", every=7 * DAY, max_attempts=1, first_delay=DAY)
+def vacuum(db):
+    """Reclaim space left by archiving and deletes"""
+    engine = db.get_bind()
+    statement = "VACUUM" if engine.dialect.name == "sqlite" else "VACUUM (ANALYZE)"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(statement))
+
+
+def archive_terms(db):
+    """Move terms that have finished into the archive tables"""
+    from archive import archive_completed_terms
+
+    return archive_completed_terms(db)
+
+
+if ARCHIVE_JOB_ENABLED:
+    job("archive_terms", every=DAY)(archive_terms)
+
+
+@job("at_risk", every=HOUR)
+def at_risk(db):
+    """Rescore students whose grades or deadlines changed"""
+    from risk import score_students
+
+    return score_students(db)
+
+
+@job("recommendations", every=DAY)
+def recommendations(db):
+    """Rebuild the course similarity index"""
+    from recommend import build_neighbors
+
+    return build_neighbors(db)
+
+
+@job("reminders", every=15 * 60)
+def reminders(db):
+    """Email students about deadlines in the next REMINDER_HOURS"""
+    from reminders import send_reminders
+
+    return send_reminders(db)
+
+
+@job("attachment_gc", every=DAY)
+def attachment_gc(db):
+    """Remove attachment files no note refers to any more"""
+    from attachments import collect_garbage
+
+    return collect_garbage(db)
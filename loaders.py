@@ -0,0 +1,211 @@
+"""
+Batched Loading for CollegeBuddy Application
+
+DataLoader-style batching for the /api/batch endpoint. A request first
+collects every key it needs, then each loader fetches all of its keys with
+one query and remembers the results, so a student looked up by five
+queries costs one SELECT.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from archive import grade_history
+from models import Student, Course, Enrollment, Assignment, Note
+
+RESOURCES = ("student", "stats", "schedule", "grades", "notes")
+
+
+class DataLoader:
+    """Per-request cache in front of a batch function.
+
+    batch_fn receives a list of unique keys and returns {key: value};
+    keys it leaves out load as the loader's default.
+    """
+
+    def __init__(self, batch_fn, default=None):
+        self.batch_fn = batch_fn
+        self.default = default
+        self._cache = {}
+        self.batches = 0
+
+    def load_many(self, keys):
+        missing = [k for k in dict.fromkeys(keys) if k not in self._cache]
+        if missing:
+            self.batches += 1
+            found = self.batch_fn(missing)
+            for key in missing:
+                self._cache[key] = found.get(key, self.default)
+        return [self._cache[k] for k in keys]
+
+    def load(self, key):
+        return self.load_many([key])[0]
+
+
+class Loaders:
+    """All loaders for one request, sharing its session"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.students = DataLoader(self._students)
+        self.stats = DataLoader(self._stats)
+        self.schedules = DataLoader(self._schedules, default=[])
+        self.grades = DataLoader(self._grades, default=[])
+        self.notes = DataLoader(self._notes, default=[])
+
+    def _students(self, codes):
+        rows = self.db.query(Student).filter(Student.student_id.in_(codes)).all()
+        return {s.student_id: s for s in rows}
+
+    def _stats(self, pks):
+        def counts(query):
+            return dict(self.db.execute(query).all())
+
+        enrolled = counts(
+            select(Enrollment.student_id, func.count(Enrollment.id))
+            .where(Enrollment.student_id.in_(pks), Enrollment.status == "Active")
+            .group_by(Enrollment.student_id)
+        )
+        upcoming = counts(
+            select(Enrollment.student_id, func.count(Assignment.id))
+            .join(Assignment, Assignment.course_id == Enrollment.course_id)
+            .where(Enrollment.student_id.in_(pks), Assignment.due_date > datetime.now())
+            .group_by(Enrollment.student_id)
+        )
+        notes = counts(
+            select(Note.student_id, func.count(Note.id))
+            .where(Note.student_id.in_(pks))
+            .group_by(Note.student_id)
+        )
+        return {
+            pk: {
+                "enrolled_courses": enrolled.get(pk, 0),
+                "upcoming_assignments": upcoming.get(pk, 0),
+                "total_notes": notes.get(pk, 0)
+            }
+            for pk in pks
+        }
+
+    def _schedules(self, pks):
+        rows = (
+            self.db.query(Enrollment.student_id, Course)
+            .join(Course, Course.id == Enrollment.course_id)
+            .filter(Enrollment.student_id.in_(pks), Enrollment.status == "Active")
+            .all()
+        )
+        schedules = defaultdict(list)
+        for student_pk, course in rows:
+            schedules[student_pk].append({
+                "course_code": course.course_code,
+                "course_name": course.name,
+                "professor": course.professor,
+                "schedule": course.schedule,
+                "location": course.location,
+                "credits": course.credits
+            })
+        return schedules
+
+    def _grades(self, pks):
+        history = grade_history(pks)
+        grades = defaultdict(list)
+        for g in self.db.execute(select(history).order_by(history.c.graded_at)).all():
+            grades[g.student_id].append({
+                "id": g.grade_id,
+                "assignment_title": g.assignment_title,
+                "course_code": g.course_code,
+                "points_earned": g.points_earned,
+                "points_possible": g.points_possible,
+                "percentage": g.percentage,
+                "letter_grade": g.letter_grade,
+                "graded_at": g.graded_at,
+                "archived": bool(g.archived)
+            })
+        return grades
+
+    def _notes(self, pks):
+        notes = defaultdict(list)
+        for n in self.db.query(Note).filter(Note.student_id.in_(pks)).all():
+            notes[n.student_id].append({
+                "id": n.id,
+                "title": n.title,
+                "content": n.content,
+                "course_code": n.course_code,
+                "tags": n.tags.split(",") if n.tags else [],
+                "revision": n.revision or 0,
+                "created_at": n.created_at,
+                "updated_at": n.updated_at
+            })
+        return notes
+
+
+def _student_dict(student):
+    return {
+        "id": student.id,
+        "student_id": student.student_id,
+        "name": student.name,
+        "email": student.email,
+        "major": student.major,
+        "year": student.year,
+        "gpa": student.gpa,
+        "created_at": student.created_at
+    }
+
+
+def run_batch(db: Session, queries):
+    """Resolve {alias: {"resource": ..., "student_id": ...}} in bulk.
+
+    Each alias maps to {"data": ...} or {"error": ...}, mirroring what the
+    matching single-resource endpoint would return.
+    """
+    loaders = Loaders(db)
+    valid = {
+        alias: q for alias, q in queries.items()
+        if isinstance(q, dict) and q.get("resource") in RESOURCES
+        and isinstance(q.get("student_id"), str) and q["student_id"]
+    }
+
+    # Phase 1: resolve every student code with one query
+    codes = [q["student_id"] for q in valid.values()]
+    students = dict(zip(codes, loaders.students.load_many(codes)))
+
+    # Phase 2: batch each resource over the students that exist
+    per_resource = defaultdict(list)
+    for q in valid.values():
+        student = students[q["student_id"]]
+        if student is not None:
+            per_resource[q["resource"]].append(student.id)
+    resource_loaders = {
+        "stats": loaders.stats,
+        "schedule": loaders.schedules,
+        "grades": loaders.grades,
+        "notes": loaders.notes
+    }
+    for resource, pks in per_resource.items():
+        if resource in resource_loaders:
+            resource_loaders[resource].load_many(pks)
+
+    results = {}
+    for alias, q in queries.items():
+        if alias not in valid:
+            results[alias] = {"error": f"Expected a resource in {list(RESOURCES)} and a student_id string"}
+            continue
+        student = students[q["student_id"]]
+        if student is None:
+            results[alias] = {"error": "Student not found"}
+        elif q["resource"] == "student":
+            results[alias] = {"data": _student_dict(student)}
+        elif q["resource"] == "stats":
+            stats = loaders.stats.load(student.id)
+            results[alias] = {"data": {
+                "student_name": student.name,
+                "gpa": student.gpa,
+                "enrolled_courses": stats["enrolled_courses"],
+                "upcoming_assignments": stats["upcoming_assignments"],
+                "total_notes": stats["total_notes"],
+                "academic_year": student.year
+            }}
+        else:
+            results[alias] = {"data": resource_loaders[q["resource"]].load(student.id)}
+    return results
@@ -0,0 +1,453 @@
+"""
+Management Commands for CollegeBuddy Application
+
+    python manage.py initdb
+    python manage.py migrate [--status] [--tenant mit --tenant stanford]
+    python manage.py seed
+    python manage.py generate --students 20000 --courses 400 [--seed 7 --as-of 2026-10-01]
+    python manage.py regrade CS101 --curve 3 --dry-run
+    python manage.py timetable --semester Fall --year 2026 [--derive-rooms] [--dry-run]
+    python manage.py recommend [--top-k 20]
+    python manage.py risk [--full]
+    python manage.py reminders [--hours 24] [--dry-run]
+    python manage.py jobs [--run at_risk] [--enable NAME | --disable NAME]
+    python manage.py scheduler
+    python manage.py audit [--table grades --row-id 42] [--actor job:at_risk] [--since 2026-10-01]
+    python manage.py archive [--semester Fall --year 2024]
+    python manage.py transcripts --format pdf --out transcripts/
+    python manage.py export grades --format parquet --out grades.parquet
+"""
+import argparse
+import json
+import os
+from datetime import date, datetime
+
+
+def cmd_initdb(args):
+    from database import init_db, SCHEMA_VERSION
+
+    if init_db():
+        print(f"✅ Schema migrated to version {SCHEMA_VERSION}")
+    else:
+        print(f"✅ Schema already at version {SCHEMA_VERSION}")
+
+
+def cmd_migrate(args):
+    from database import engine, init_db, tenants, SCHEMA_VERSION
+    from migrations import get_schema_version, pending_migrations
+
+    if args.tenant:
+        if tenants is None:
+            raise SystemExit("❌ Set COLLEGEBUDDY_TENANT_URL to manage tenant databases")
+        for name in args.tenant:
+            tenants.get(name.lower(), create=True)
+            print(f"✅ Tenant {name} at schema version {SCHEMA_VERSION}")
+        return
+
+    if args.status:
+        print(f"Schema version: {get_schema_version(engine)} (head {SCHEMA_VERSION})")
+        for m in pending_migrations(engine):
+            print(f"  pending {m.version}: {m.description}")
+        return
+
+    if not init_db():
+        print(f"✅ Schema already at version {SCHEMA_VERSION}")
+    else:
+        print(f"✅ Schema migrated to version {SCHEMA_VERSION}")
+
+
+def cmd_seed(args):
+    from database import init_db, seed_db
+
+    init_db()
+    if not seed_db():
+        print("ℹ️ Database already has data, nothing seeded")
+
+
+def cmd_generate(args):
+    import time
+    from database import init_db, SessionLocal
+    from synthetic import generate
+
+    def progress(table, rows, elapsed):
+        print(f"  {table:<12} {rows:>10,} rows in {elapsed:.2f}s")
+
+    # The dataset depends on the date as well as the seed
+    if args.seed is not None and args.as_of is None:
+        raise SystemExit("❌ Pass --as-of with --seed so the dataset can be reproduced")
+    as_of = datetime.combine(args.as_of, datetime.min.time()) if args.as_of else None
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        counts = generate(
+            db, args.students, args.courses, progress=progress,
+            courses_per_student=args.courses_per_student,
+            assignments_per_course=args.assignments_per_course,
+            graded_fraction=args.graded_fraction,
+            notes_per_student=args.notes_per_student,
+            terms=args.terms, seed=42 if args.seed is None else args.seed, as_of=as_of
+        )
+    finally:
+        db.close()
+    print(f"✅ Generated {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+
+
+def cmd_regrade(args):
+    from database import init_db, SessionLocal
+    from grading import parse_scale
+    from models import Course
+    from regrade import regrade_course
+
+    init_db()
+    db = SessionLocal()
+    try:
+        course = db.query(Course).filter(Course.course_code == args.course_code).first()
+        if course is None:
+            raise SystemExit(f"❌ No course {args.course_code}")
+        report = regrade_course(
+            db, course,
+            scale=parse_scale(args.cutoffs) if args.cutoffs else None,
+            curve=args.curve, max_percentage=args.max_percentage, dry_run=args.dry_run
+        )
+    finally:
+        db.close()
+
+    for change in report["changes"]:
+        (old_pct, new_pct), (old_letter, new_letter) = change["percentage"], change["letter_grade"]
+        print(f"  {change['student_id']:<10} {change['assignment_title']:<30} "
+              f"{old_pct} {old_letter} -> {new_pct} {new_letter}")
+    print(f"Letters before: {report['letters_before']}")
+    print(f"Letters after:  {report['letters_after']}")
+    verb = "would change" if args.dry_run else "changed"
+    print(f"✅ {args.course_code}: {verb} {report['changed']} grades")
+
+
+def cmd_timetable(args):
+    from database import init_db, SessionLocal
+    from timetable import derive_rooms, timetable_term
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.derive_rooms:
+            print(f"🏫 Added {derive_rooms(db)} rooms from course locations")
+        try:
+            report = timetable_term(
+                db, args.semester, args.year, restarts=args.restarts, workers=args.workers,
+                iterations=args.iterations, seed=args.seed, dry_run=args.dry_run
+            )
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+    finally:
+        db.close()
+
+    for key, value in report.items():
+        print(f"  {key:<20} {value}")
+    verb = "Planned" if args.dry_run else "Wrote"
+    print(f"✅ {verb} {report['sections']} sections for {args.semester} {args.year}")
+
+
+def cmd_recommend(args):
+    import time
+    from database import init_db, SessionLocal
+    from recommend import build_neighbors
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        counts = build_neighbors(db, top_k=args.top_k, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"✅ Stored {counts['neighbors']:,} neighbours for {counts['with_neighbors']:,} "
+          f"of {counts['courses']:,} courses in {time.perf_counter() - started:.1f}s")
+
+
+def cmd_risk(args):
+    import time
+    from database import init_db, SessionLocal
+    from risk import score_students
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        counts = score_students(db, full=args.full)
+    finally:
+        db.close()
+    kind = "all" if counts["full"] else "changed"
+    print(f"✅ Rescored {counts['rescored']:,} {kind} students ({counts['with_risk']:,} with risk) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+def cmd_reminders(args):
+    import time
+    from database import init_db, SessionLocal
+    from reminders import send_reminders, sender_from_url
+
+    init_db()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        sender = sender_from_url(args.sender) if args.sender else None
+        counts = send_reminders(db, sender=sender, hours=args.hours, dry_run=args.dry_run)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    finally:
+        db.close()
+    if args.dry_run:
+        print(f"✅ {counts['due']:,} reminders due in the next {args.hours:g} hours")
+    else:
+        print(f"✅ Sent {counts['sent']:,} of {counts['due']:,} reminders ({counts['failed']:,} failed) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+
+def cmd_jobs(args):
+    from database import init_db, SessionLocal
+    from models import ScheduledJob
+    from scheduler import job_status, run_job, JOBS
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.run:
+            try:
+                result = run_job(db, args.run)
+            except KeyError:
+                raise SystemExit(f"❌ No job {args.run}; known: {', '.join(sorted(JOBS))}")
+            print(f"✅ {args.run}: {result}")
+            return
+        for name, enabled in ((args.enable, 1), (args.disable, 0)):
+            if name:
+                updated = db.query(ScheduledJob).filter(ScheduledJob.name == name).update({"enabled": enabled})
+                db.commit()
+                if not updated:
+                    raise SystemExit(f"❌ No scheduled job {name}; start the scheduler once to register it")
+                print(f"✅ {name} {'enabled' if enabled else 'disabled'}")
+                return
+        for status in job_status(db):
+            state = status["last_status"] or "never run"
+            if not status["enabled"]:
+                state += ", disabled"
+            print(f"  {status['name']:<16} every {status['interval_seconds']:>8.0f}s  next {status['next_run_at']:%Y-%m-%d %H:%M}  "
+                  f"{status['runs']} runs, {status['failures']} failures  ({state})")
+    finally:
+        db.close()
+
+
+def cmd_scheduler(args):
+    import signal
+    import threading
+    from database import init_db, SessionLocal
+    from scheduler import start_scheduler, stop_scheduler
+
+    init_db()
+    scheduler = start_scheduler(SessionLocal)
+    print(f"⏰ Scheduler {scheduler.owner} running {len(scheduler.jobs)} jobs; Ctrl+C to stop")
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    try:
+        while not stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    stop_scheduler()
+
+
+def cmd_audit(args):
+    from audit import query_audit
+
+    since = datetime.fromisoformat(args.since) if args.since else None
+    entries, _ = query_audit(args.tenant, table=args.table, row_id=args.row_id, actor=args.actor,
+                             op=args.op, since=since, limit=args.limit)
+    for e in reversed(entries):
+        target = f"{e['table']} {e['row_id']}" if e["row_id"] else e["table"]
+        print(f"{e['at'][:19]}  {e['actor']:<20} {e['op']:<6} {target:<24} {json.dumps(e['changes'])}")
+    print(f"📜 {len(entries)} entries")
+
+
+def cmd_archive(args):
+    from database import init_db, SessionLocal
+    from archive import archive_term, archive_completed_terms, TermNotFinished
+
+    if bool(args.semester) != bool(args.year):
+        raise SystemExit("❌ Pass both --semester and --year, or neither")
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.semester and args.year:
+            try:
+                results = {(args.semester, args.year): archive_term(db, args.semester, args.year)}
+            except TermNotFinished as e:
+                raise SystemExit(f"❌ Not archiving {e}")
+        else:
+            results = archive_completed_terms(db)
+    finally:
+        db.close()
+
+    if not results:
+        print("ℹ️ No completed terms to archive")
+    for (semester, year), moved in results.items():
+        summary = ", ".join(f"{count} {table}" for table, count in moved.items())
+        print(f"📦 Archived {semester} {year}: {summary}")
+
+
+def cmd_transcripts(args):
+    from database import init_db, SessionLocal
+    from transcripts import export_transcripts
+
+    def progress(done, total, elapsed):
+        rate = done / elapsed * 60 if elapsed else 0
+        print(f"\r📄 {done}/{total} transcripts ({rate:,.0f}/min)", end="", flush=True)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        written = export_transcripts(
+            db, args.out, fmt=args.format, workers=args.workers,
+            batch_size=args.batch_size, progress=progress
+        )
+    finally:
+        db.close()
+    print(f"\n✅ Wrote {written} {args.format.upper()} transcripts to {args.out}")
+
+
+def cmd_export(args):
+    import sys
+    from database import init_db, SessionLocal
+    from export import iter_export
+
+    init_db()
+    db = SessionLocal()
+    try:
+        chunks = iter_export(
+            db, args.resource, args.format,
+            semester=args.semester, year=args.year, course_code=args.course_code
+        )
+        out = open(args.out, "wb") if args.out != "-" else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    finally:
+        db.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="CollegeBuddy management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    initdb = commands.add_parser("initdb", help="Create or migrate the database schema")
+    initdb.set_defaults(func=cmd_initdb)
+
+    migrate = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate.add_argument("--status", action="store_true", help="Show the current version and pending migrations")
+    migrate.add_argument("--tenant", action="append", help="Create or migrate this tenant's database (repeatable)")
+    migrate.set_defaults(func=cmd_migrate)
+
+    seed = commands.add_parser("seed", help="Add sample data to an empty database")
+    seed.set_defaults(func=cmd_seed)
+
+    generate = commands.add_parser("generate", help="Add a large synthetic dataset for performance work")
+    generate.add_argument("--students", type=int, default=10000)
+    generate.add_argument("--courses", type=int, default=200)
+    generate.add_argument("--courses-per-student", type=float, default=5, help="Average enrollments per student")
+    generate.add_argument("--assignments-per-course", type=int, default=8)
+    generate.add_argument("--graded-fraction", type=float, default=0.9,
+                          help="Share of past-due assignments each enrolled student has a grade for")
+    generate.add_argument("--notes-per-student", type=int, default=3, help="Average notes per student")
+    generate.add_argument("--terms", type=int, default=2, help="Recent terms to spread courses over")
+    generate.add_argument("--seed", type=int, help="Random seed (default 42); requires --as-of")
+    generate.add_argument("--as-of", type=date.fromisoformat, help="Date the dataset is generated as of (default today)")
+    generate.set_defaults(func=cmd_generate)
+
+    regrade = commands.add_parser("regrade", help="Recompute a course's grades, optionally with a new scale or curve")
+    regrade.add_argument("course_code")
+    regrade.add_argument("--cutoffs", help='Letter scale, e.g. "90:A,80:B,70:C,60:D,0:F"')
+    regrade.add_argument("--curve", type=float, help="Percentage points added to every grade")
+    regrade.add_argument("--max-percentage", type=float, help="Cap for curved grades")
+    regrade.add_argument("--dry-run", action="store_true", help="Show the diff without writing")
+    regrade.set_defaults(func=cmd_regrade)
+
+    timetable = commands.add_parser("timetable", help="Assign time slots and rooms to a term's courses")
+    timetable.add_argument("--semester", required=True)
+    timetable.add_argument("--year", type=int, required=True)
+    timetable.add_argument("--workers", type=int, help="Solver processes (default: CPU count)")
+    timetable.add_argument("--restarts", type=int, help="Independent solver runs (default: one per worker)")
+    timetable.add_argument("--iterations", type=int, help="Local search moves per run (default: 100 per section)")
+    timetable.add_argument("--seed", type=int, default=0)
+    timetable.add_argument("--derive-rooms", action="store_true", help="First create rooms from existing course locations")
+    timetable.add_argument("--dry-run", action="store_true", help="Report the result without writing it")
+    timetable.set_defaults(func=cmd_timetable)
+
+    recommend = commands.add_parser("recommend", help="Rebuild the course similarity index for recommendations")
+    recommend.add_argument("--top-k", type=int, default=20, help="Neighbours kept per course")
+    recommend.add_argument("--batch-size", type=int, default=200, help="Courses compared per query")
+    recommend.set_defaults(func=cmd_recommend)
+
+    risk = commands.add_parser("risk", help="Update at-risk scores for students whose grades or deadlines changed")
+    risk.add_argument("--full", action="store_true", help="Rescore every student")
+    risk.set_defaults(func=cmd_risk)
+
+    reminders = commands.add_parser("reminders", help="Email students about upcoming deadlines")
+    reminders.add_argument("--hours", type=float, default=24, help="How far ahead to remind")
+    reminders.add_argument("--sender", help="Override COLLEGEBUDDY_REMINDER_SENDER, e.g. file:outbox.ndjson")
+    reminders.add_argument("--dry-run", action="store_true", help="Only count what is due")
+    reminders.set_defaults(func=cmd_reminders)
+
+    jobs = commands.add_parser("jobs", help="List background jobs, or run or toggle one")
+    jobs.add_argument("--run", metavar="NAME", help="Run a job now in this process")
+    jobs.add_argument("--enable", metavar="NAME")
+    jobs.add_argument("--disable", metavar="NAME")
+    jobs.set_defaults(func=cmd_jobs)
+
+    scheduler = commands.add_parser("scheduler", help="Run background jobs without serving requests (sidecar)")
+    scheduler.set_defaults(func=cmd_scheduler)
+
+    audit = commands.add_parser("audit", help="Show recent entries from the audit log")
+    audit.add_argument("--table")
+    audit.add_argument("--row-id")
+    audit.add_argument("--actor", help="e.g. ip:10.0.0.5, key:<hash>, job:at_risk or cli:regrade")
+    audit.add_argument("--op", choices=["insert", "update", "delete"])
+    audit.add_argument("--since", help="ISO date or time, UTC")
+    audit.add_argument("--tenant")
+    audit.add_argument("--limit", type=int, default=50)
+    audit.set_defaults(func=cmd_audit)
+
+    archive = commands.add_parser("archive", help="Move finished terms into the archive tables")
+    archive.add_argument("--semester", help="Archive only this semester (with --year)")
+    archive.add_argument("--year", type=int, help="Archive only this year (with --semester)")
+    archive.set_defaults(func=cmd_archive)
+
+    transcripts = commands.add_parser("transcripts", help="Write a transcript file for every student")
+    transcripts.add_argument("--format", choices=["csv", "pdf"], default="csv")
+    transcripts.add_argument("--out", default="transcripts", help="Output directory")
+    transcripts.add_argument("--workers", type=int, help="Rendering processes (default: CPU count)")
+    transcripts.add_argument("--batch-size", type=int, default=500)
+    transcripts.set_defaults(func=cmd_transcripts)
+
+    export = commands.add_parser("export", help="Stream a whole resource to a file")
+    export.add_argument("resource", choices=["students", "courses", "enrollments", "assignments", "grades"])
+    export.add_argument("--format", choices=["csv", "ndjson", "parquet"], default="csv")
+    export.add_argument("--out", default="-", help="Output file (default: stdout)")
+    export.add_argument("--semester")
+    export.add_argument("--year", type=int)
+    export.add_argument("--course-code")
+    export.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Writes from this command are attributed to it in the audit log
+    os.environ.setdefault("COLLEGEBUDDY_AUDIT_ACTOR", f"cli:{args.command}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
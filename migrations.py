@@ -0,0 +1,227 @@
+"""
+Schema Migrations for CollegeBuddy Application
+
+Versioned, forward-only migrations. migrate() first runs create_all, which
+only ever adds missing tables, then applies every migration newer than the
+schema_version marker, recording the marker after each one. Migrations must
+be idempotent so a fresh database (whose tables create_all already built in
+their latest shape) can run them all cheaply.
+
+Helpers keep long operations from blocking the app: indexes are built with
+CREATE INDEX CONCURRENTLY on PostgreSQL (SQLite in WAL mode keeps serving
+reads while an index builds), and data changes run in small id-range
+batches, each in its own short transaction.
+
+    python manage.py migrate [--status]
+"""
+import time
+from collections import namedtuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from models import Base
+
+Migration = namedtuple("Migration", "version description upgrade")
+
+# Versions 1 (initial tables) and 2 (archive tables) predate this module
+# and are covered by create_all.
+MIGRATIONS = []
+
+BACKFILL_BATCH_SIZE = 1000
+BACKFILL_PAUSE_SECONDS = 0.01
+
+
+def migration(version, description):
+    """Register an upgrade(engine) function as a numbered migration"""
+    def register(upgrade):
+        MIGRATIONS.append(Migration(version, description, upgrade))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return upgrade
+    return register
+
+
+def head_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 2
+
+
+# Schema version marker
+def get_schema_version(engine):
+    """Read the schema version marker, or None if it was never written"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version FROM schema_version")).scalar()
+    except DBAPIError:
+        return None
+
+
+def set_schema_version(engine, version):
+    """Record the schema version marker"""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+        conn.execute(text("DELETE FROM schema_version"))
+        conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+
+
+# Online operation helpers
+def create_index_online(engine, name, table, columns, unique=False):
+    """Build an index without blocking reads (or writes, on PostgreSQL)"""
+    unique_sql = "UNIQUE " if unique else ""
+    column_sql = ", ".join(columns)
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # A failed concurrent build leaves an invalid index behind; rebuild it
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": name}).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_sql})"
+            ))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql})"))
+
+
+def add_column(engine, table, column, ddl):
+    """Add a column if it is missing, e.g. add_column(engine, "courses", "capacity", "INTEGER")"""
+    existing = {c["name"] for c in inspect(engine).get_columns(table)}
+    if column in existing:
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def backfill(engine, table, set_sql, where_sql="1 = 1", params=None,
+             batch_size=BACKFILL_BATCH_SIZE, pause=BACKFILL_PAUSE_SECONDS):
+    """Run UPDATE table SET set_sql in id-range batches, committing each.
+
+    Returns the number of rows updated.
+    """
+    with engine.connect() as conn:
+        low, high = conn.execute(text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+    if low is None:
+        return 0
+
+    updated = 0
+    for start in range(low, high + 1, batch_size):
+        with engine.begin() as conn:
+            updated += conn.execute(
+                text(f"UPDATE {table} SET {set_sql} WHERE id >= :batch_start AND id < :batch_end AND ({where_sql})"),
+                dict(params or {}, batch_start=start, batch_end=start + batch_size)
+            ).rowcount
+        if pause:
+            time.sleep(pause)
+    return updated
+
+
+# Runner
+def pending_migrations(engine):
+    current = get_schema_version(engine) or 0
+    return [m for m in MIGRATIONS if m.version > current]
+
+
+def migrate(engine, log=None):
+    """Bring a database up to head_version(); returns migrations applied"""
+    Base.metadata.create_all(bind=engine)
+    applied = []
+    for m in pending_migrations(engine):
+        started = time.perf_counter()
+        m.upgrade(engine)
+        set_schema_version(engine, m.version)
+        applied.append(m)
+        if log:
+            log(f"  {m.version}: {m.description} ({time.perf_counter() - started:.2f}s)")
+    if (get_schema_version(engine) or 0) < head_version():
+        set_schema_version(engine, head_version())
+    return applied
+
+
+# Migrations
+@migration(3, "Indexes for per-student, per-course and date-range lookups")
+def add_lookup_indexes(engine):
+    create_index_online(engine, "ix_enrollments_student_status", "enrollments", ["student_id", "status"])
+    create_index_online(engine, "ix_enrollments_course_status", "enrollments", ["course_id", "status"])
+    create_index_online(engine, "ix_grades_student_id", "grades", ["student_id"])
+    create_index_online(engine, "ix_grades_assignment_id", "grades", ["assignment_id"])
+    create_index_online(engine, "ix_assignments_course_due", "assignments", ["course_id", "due_date"])
+    create_index_online(engine, "ix_assignments_due_date", "assignments", ["due_date"])
+    create_index_online(engine, "ix_events_start_time", "events", ["start_time"])
+    create_index_online(engine, "ix_notes_student_id", "notes", ["student_id"])
+    create_index_online(engine, "ix_courses_term", "courses", ["semester", "year"])
+
+
+@migration(4, "Per-course grading scales and grades.updated_at")
+def add_grading_scales(engine):
+    # grading_scales itself is created by create_all
+    add_column(engine, "grades", "updated_at", "TIMESTAMP")
+
+
+@migration(5, "Course capacity, enrolled_count and one enrollment per student and course")
+def add_course_capacity(engine):
+    add_column(engine, "courses", "capacity", "INTEGER")
+    add_column(engine, "courses", "enrolled_count", "INTEGER NOT NULL DEFAULT 0")
+    backfill(
+        engine, "courses",
+        "enrolled_count = (SELECT COUNT(*) FROM enrollments e "
+        "WHERE e.course_id = courses.id AND e.status = 'Active')"
+    )
+
+    with engine.connect() as conn:
+        duplicates = conn.execute(text(
+            "SELECT COUNT(*) FROM (SELECT student_id, course_id FROM enrollments "
+            "GROUP BY student_id, course_id HAVING COUNT(*) > 1) d"
+        )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} student/course pairs have more than one enrollment row; "
+            "merge them before running this migration"
+        )
+    create_index_online(engine, "ux_enrollments_student_course", "enrollments",
+                        ["student_id", "course_id"], unique=True)
+
+
+@migration(6, "Rooms for timetabling")
+def add_rooms(engine):
+    # rooms is created by create_all; nothing to change in existing tables
+    pass
+
+
+@migration(7, "Course neighbours for recommendations")
+def add_course_neighbors(engine):
+    # course_neighbors is created by create_all and filled by `manage.py recommend`
+    pass
+
+
+@migration(8, "At-risk scoring tables and grade change indexes")
+def add_student_risk(engine):
+    # student_risk and job_state are created by create_all
+    create_index_online(engine, "ix_grades_graded_at", "grades", ["graded_at"])
+    create_index_online(engine, "ix_grades_updated_at", "grades", ["updated_at"])
+
+
+@migration(9, "Background job schedule")
+def add_scheduled_jobs(engine):
+    # scheduled_jobs is created by create_all; rows appear when a scheduler starts
+    pass
+
+
+@migration(10, "Deadline reminder log")
+def add_reminders_sent(engine):
+    # reminders_sent is created by create_all
+    pass
+
+
+@migration(11, "Note attachments")
+def add_attachments(engine):
+    # attachments is created by create_all; the files live in COLLEGEBUDDY_ATTACHMENT_DIR
+    pass
+
+
+@migration(12, "Note revision history")
+def add_note_revisions(engine):
+    # note_revisions is created by create_all
+    add_column(engine, "notes", "revision", "INTEGER NOT NULL DEFAULT 0")
@@ -1,7 +1,7 @@
 """
 Database Models for CollegeBuddy Application
 """
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, LargeBinary, ForeignKey, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -28,6 +28,9 @@ class Student(Base):
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        Index("ix_courses_term", "semester", "year"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     course_code = Column(String, unique=True, index=True)
@@ -39,6 +42,8 @@ class Course(Base):
     year = Column(Integer)
     schedule = Column(String)  # e.g., "MWF 10:00-11:00"
     location = Column(String)
+    capacity = Column(Integer)  # None means unlimited
+    enrolled_count = Column(Integer, default=0, nullable=False)  # Active enrollments
     
     # Relationships
     enrollments = relationship("Enrollment", back_populates="course")
@@ -47,12 +52,17 @@ class Course(Base):
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    __table_args__ = (
+        Index("ix_enrollments_student_status", "student_id", "status"),
+        Index("ix_enrollments_course_status", "course_id", "status"),
+        Index("ux_enrollments_student_course", "student_id", "course_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
     course_id = Column(Integer, ForeignKey("courses.id"))
     enrolled_at = Column(DateTime, default=datetime.utcnow)
-    status = Column(String, default="Active")  # Active, Dropped, Completed
+    status = Column(String, default="Active")  # Active, Waitlisted, Dropped, Completed
     
     # Relationships
     student = relationship("Student", back_populates="enrollments")
@@ -61,6 +71,10 @@ class Enrollment(Base):
 
 class Assignment(Base):
     __tablename__ = "assignments"
+    __table_args__ = (
+        Index("ix_assignments_course_due", "course_id", "due_date"),
+        Index("ix_assignments_due_date", "due_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"))
@@ -78,6 +92,12 @@ class Assignment(Base):
 
 class Grade(Base):
     __tablename__ = "grades"
+    __table_args__ = (
+        Index("ix_grades_student_id", "student_id"),
+        Index("ix_grades_assignment_id", "assignment_id"),
+        Index("ix_grades_graded_at", "graded_at"),
+        Index("ix_grades_updated_at", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
@@ -88,14 +108,123 @@ class Grade(Base):
     letter_grade = Column(String)
     submitted_at = Column(DateTime)
     graded_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime)  # Set when a regrade changes the row
     
     # Relationships
     student = relationship("Student", back_populates="grades")
     assignment = relationship("Assignment", back_populates="grades")
 
 
+class GradingScale(Base):
+    """Letter cutoffs and curve for one course; others use grading.DEFAULT_SCALE"""
+    __tablename__ = "grading_scales"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), unique=True)
+    cutoffs = Column(String)  # e.g., "93:A,90:A-,...,0:F"
+    curve = Column(Float, default=0.0)  # Percentage points added to every grade
+    max_percentage = Column(Float, default=100.0)  # Curved grades are capped here
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Room(Base):
+    __tablename__ = "rooms"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True)  # Written to Course.location
+    building = Column(String)
+    capacity = Column(Integer)
+
+
+class CourseNeighbor(Base):
+    """Precomputed similar course; rebuilt wholesale by recommend.build_neighbors"""
+    __tablename__ = "course_neighbors"
+    __table_args__ = (
+        Index("ix_course_neighbors_course_rank", "course_id", "rank"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id"))
+    neighbor_id = Column(Integer, ForeignKey("courses.id"))
+    rank = Column(Integer)  # 1 is the most similar
+    score = Column(Float)
+    shared_students = Column(Integer)
+    built_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StudentRisk(Base):
+    """Early-warning features and score for one student; see risk.py"""
+    __tablename__ = "student_risk"
+    __table_args__ = (
+        Index("ix_student_risk_score", "score"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id"), unique=True)
+    graded_count = Column(Integer)
+    average = Column(Float)  # All graded work, hot and archived
+    recent_average = Column(Float)  # Work graded in the last RECENT_DAYS
+    earlier_average = Column(Float)  # Work graded before that
+    recent_low_grades = Column(Integer)
+    upcoming_deadlines = Column(Integer)  # Ungraded work due in the next DEADLINE_DAYS
+    score = Column(Float)  # 0 (fine) to 100
+    reasons = Column(String)  # Comma-separated, e.g. "declining,low average"
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class JobState(Base):
+    """High-water mark of an incremental job"""
+    __tablename__ = "job_state"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+    watermark = Column(DateTime)  # Rows changed after this are still to process
+    last_run_at = Column(DateTime)
+    last_rows = Column(Integer)
+
+
+class ScheduledJob(Base):
+    """Schedule, lease and last outcome of a background job; see scheduler.py"""
+    __tablename__ = "scheduled_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+    interval_seconds = Column(Float)
+    enabled = Column(Integer, default=1)
+    next_run_at = Column(DateTime)
+    lease_owner = Column(String)  # host:pid of the worker running it
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, default=0)  # Consecutive failures
+    runs = Column(Integer, default=0)
+    failures = Column(Integer, default=0)
+    last_started_at = Column(DateTime)
+    last_finished_at = Column(DateTime)
+    last_duration = Column(Float)
+    last_status = Column(String)  # ok, failed
+    last_error = Column(Text)
+
+
+class ReminderSent(Base):
+    """One delivered deadline reminder; a changed due time is reminded again"""
+    __tablename__ = "reminders_sent"
+    __table_args__ = (
+        Index("ux_reminders_sent_item", "student_id", "kind", "item_id", "due_at", unique=True),
+        Index("ix_reminders_sent_sent_at", "sent_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id"))
+    kind = Column(String)  # assignment, event
+    item_id = Column(Integer)
+    due_at = Column(DateTime)
+    sent_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        Index("ix_notes_student_id", "student_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"))
@@ -103,12 +232,53 @@ class Note(Base):
     content = Column(Text)
     course_code = Column(String)
     tags = Column(String)  # Comma-separated tags
+    revision = Column(Integer, default=0, nullable=False, server_default=text("0"))  # Latest note_revisions entry; 0 before the first
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow)
 
 
+class NoteRevision(Base):
+    """One version of a note, as a compressed snapshot or delta; see revisions.py"""
+    __tablename__ = "note_revisions"
+    __table_args__ = (
+        Index("ux_note_revisions_note_revision", "note_id", "revision", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    note_id = Column(Integer, ForeignKey("notes.id"))
+    revision = Column(Integer)
+    kind = Column(String)  # snapshot, delta
+    data = Column(LargeBinary)  # zlib-compressed text or delta against revision - 1
+    title = Column(String)
+    tags = Column(String)
+    size = Column(Integer)  # Length of the full content
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Attachment(Base):
+    """A file attached to a note; the bytes live in the attachment store"""
+    __tablename__ = "attachments"
+    __table_args__ = (
+        Index("ix_attachments_note_id", "note_id"),
+        Index("ix_attachments_student_id", "student_id"),
+        Index("ix_attachments_sha256", "sha256"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    note_id = Column(Integer, ForeignKey("notes.id"))
+    student_id = Column(Integer, ForeignKey("students.id"))  # Owner, for quotas
+    filename = Column(String)
+    content_type = Column(String)
+    size = Column(Integer)
+    sha256 = Column(String)  # Content address; identical files share one blob
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_start_time", "start_time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -119,3 +289,52 @@ class Event(Base):
     location = Column(String)
     course_code = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Archive tables: rows moved out of the hot tables once their term is over.
+# source_id keeps the row's original id; archived grades point at the
+# archived_assignments row, since hot ids may be reused after archiving.
+class ArchivedEnrollment(Base):
+    __tablename__ = "archived_enrollments"
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer)
+    student_id = Column(Integer, ForeignKey("students.id"), index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
+    enrolled_at = Column(DateTime)
+    status = Column(String)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ArchivedAssignment(Base):
+    __tablename__ = "archived_assignments"
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
+    title = Column(String)
+    description = Column(Text)
+    type = Column(String)
+    due_date = Column(DateTime)
+    max_points = Column(Float)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ArchivedGrade(Base):
+    __tablename__ = "archived_grades"
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer)
+    student_id = Column(Integer, ForeignKey("students.id"), index=True)
+    assignment_id = Column(Integer, ForeignKey("archived_assignments.id"), index=True)
+    points_earned = Column(Float)
+    points_possible = Column(Float)
+    percentage = Column(Float)
+    letter_grade = Column(String)
+    submitted_at = Column(DateTime)
+    graded_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,142 @@
+"""
+Change Notifications for CollegeBuddy Application
+
+In-process publish/subscribe used by the SSE and WebSocket endpoints.
+Handlers publish a small diff after each committed write; every message is
+encoded once and handed to each subscriber's bounded queue without
+blocking, so a slow client only ever loses its own oldest messages.
+
+Each worker process has its own broker and only sees writes made through
+that worker, so until fan-out crosses processes (e.g. through a shared
+broker) live updates need a single worker: `python serve.py --workers 1`. In multi-tenant mode topics are namespaced per tenant, so
+subscribers only hear about their own college.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Topic for dashboard-wide counters
+STATS_TOPIC = "stats"
+
+
+def student_topic(student_id):
+    return f"student:{student_id}"
+
+
+def course_topic(course_code):
+    return f"course:{course_code}"
+
+
+def scoped(tenant, topic):
+    """Broker-internal name of a topic within a tenant"""
+    return f"{tenant}/{topic}" if tenant else topic
+
+
+class Subscription:
+    """One client's view of the broker: a set of topics and a bounded queue"""
+
+    def __init__(self, broker, queue_size):
+        self.broker = broker
+        self.topics = set()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Topic-based fan-out running on the worker's event loop"""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._loop = None
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, topics=()):
+        """Create a subscription; must be called from the event loop"""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self, self.queue_size)
+        self.add_topics(subscription, topics)
+        return subscription
+
+    def add_topics(self, subscription, topics):
+        with self._lock:
+            for topic in topics:
+                self._subscribers[topic].add(subscription)
+                subscription.topics.add(topic)
+
+    def remove_topics(self, subscription, topics):
+        with self._lock:
+            for topic in topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+                subscription.topics.discard(topic)
+
+    def unsubscribe(self, subscription):
+        self.remove_topics(subscription, list(subscription.topics))
+
+    def connection_count(self):
+        with self._lock:
+            return len({s for subs in self._subscribers.values() for s in subs})
+
+    def publish(self, topic, op, resource, data, tenant=None):
+        """Send a change to a topic's subscribers.
+
+        Safe to call from request threads; delivery happens on the loop.
+        """
+        key = scoped(tenant, topic)
+        with self._lock:
+            if key not in self._subscribers or self._loop is None:
+                return
+        message = json.dumps(jsonable_encoder({
+            "topic": topic,
+            "op": op,
+            "resource": resource,
+            "data": data,
+            "at": datetime.utcnow()
+        }))
+        self.published += 1
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, key, message)
+        except RuntimeError:
+            # Event loop already closed during shutdown
+            pass
+
+    def _deliver(self, topic, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            subscription.offer(message)
+
+
+broker = Broker()
+
+
+def publish(topic, op, resource, data, tenant=None):
+    broker.publish(topic, op, resource, data, tenant)
+
+
+def publish_stats(tenant=None, **deltas):
+    """Publish counter changes such as total_courses=+1"""
+    broker.publish(STATS_TOPIC, "delta", "stats", deltas, tenant)
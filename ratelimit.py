@@ -0,0 +1,214 @@
+"""
+Rate Limiting and Admission Control for CollegeBuddy Application
+
+Every client (known API key, else IP address) gets a token bucket; each request
+spends tokens according to its route's cost, so full-table listings and
+exports drain a bucket much faster than point lookups. Separately, at most
+MAX_CONCURRENT requests run at once per worker; the rest wait briefly and
+are then turned away with 503.
+
+Buckets live in memory by default. Set COLLEGEBUDDY_RATE_LIMIT_STORE to a
+SQLite file path to share them between all workers on a host.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Tokens added per second and bucket size, per client. A rate of 0 disables limiting.
+RATE_PER_SECOND = float(os.getenv("COLLEGEBUDDY_RATE_LIMIT", "20"))
+BURST = float(os.getenv("COLLEGEBUDDY_RATE_BURST", "100"))
+
+# Requests running at once per worker, and how long extra requests may queue
+MAX_CONCURRENT = int(os.getenv("COLLEGEBUDDY_MAX_CONCURRENT", "64"))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv("COLLEGEBUDDY_QUEUE_TIMEOUT", "2"))
+
+STORE_PATH = os.getenv("COLLEGEBUDDY_RATE_LIMIT_STORE", "")
+
+# Comma-separated API keys that get a bucket of their own. Any other
+# X-API-Key is ignored, so clients cannot mint fresh buckets by making up keys.
+API_KEYS = {key.strip() for key in os.getenv("COLLEGEBUDDY_API_KEYS", "").split(",") if key.strip()}
+
+# (method, path pattern, cost); first match wins, anything else costs 1
+ROUTE_COSTS = [
+    ("GET", re.compile(r"^/api/export/"), 50),
+    ("GET", re.compile(r"^/api/(students|courses|assignments|events)/?$"), 10),
+    ("GET", re.compile(r"^/api/transcripts/"), 5),
+    ("POST", re.compile(r"^/api/batch/?$"), 5),
+    ("GET", re.compile(r"^/(stats)?$"), 4)
+]
+
+# Long-lived connections are rate limited but never hold an admission slot
+STREAMING_PATHS = re.compile(r"^/api/(stream|ws)/?$")
+
+
+def route_cost(method, path):
+    for rule_method, pattern, cost in ROUTE_COSTS:
+        if method == rule_method and pattern.match(path):
+            return cost
+    return 1
+
+
+class MemoryBucketStore:
+    """Token buckets for one process, pruned least-recently-used first.
+
+    Any object with a take() of the same signature can replace it; set
+    blocking = True if take() does I/O so it runs off the event loop.
+    """
+
+    blocking = False
+
+    def __init__(self, max_clients=100000):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, rate, burst, now=None):
+        """Spend cost tokens; returns (allowed, tokens_left, retry_after_seconds)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file shared by every worker on the host"""
+
+    blocking = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, cost, rate, burst, now=None):
+        # Wall clock, since monotonic clocks differ between processes
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+
+
+def make_store():
+    return SQLiteBucketStore(STORE_PATH) if STORE_PATH else MemoryBucketStore()
+
+
+def client_key(scope):
+    """API key if the client sent one in API_KEYS, otherwise its IP address"""
+    for name, value in scope.get("headers", []):
+        if name == b"x-api-key" and value:
+            key = value.decode("latin-1")
+            if key in API_KEYS:
+                return "key:" + key
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+async def _send_json(send, status, body, headers):
+    payload = json.dumps(body).encode("utf-8")
+    raw_headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(payload)).encode())
+    ] + [(k.encode(), str(v).encode()) for k, v in headers.items()]
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying per-client token buckets and admission control"""
+
+    def __init__(self, app, store=None, rate=RATE_PER_SECOND, burst=BURST,
+                 max_concurrent=MAX_CONCURRENT, queue_timeout=QUEUE_TIMEOUT_SECONDS):
+        self.app = app
+        self.store = store or make_store()
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._slots = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or self.rate <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        method = scope.get("method", "GET")
+        cost = route_cost(method, path)
+        key = client_key(scope)
+        if self.store.blocking:
+            taken = await asyncio.to_thread(self.store.take, key, cost, self.rate, self.burst)
+        else:
+            taken = self.store.take(key, cost, self.rate, self.burst)
+        allowed, remaining, retry_after = taken
+
+        if not allowed:
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1013})
+                return
+            await _send_json(send, 429, {"detail": "Rate limit exceeded"}, {
+                "Retry-After": max(1, math.ceil(retry_after)),
+                "X-RateLimit-Limit": int(self.burst),
+                "X-RateLimit-Remaining": int(remaining),
+                "X-RateLimit-Cost": cost
+            })
+            return
+
+        if scope["type"] == "websocket" or STREAMING_PATHS.match(path):
+            await self.app(scope, receive, send)
+            return
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            await _send_json(send, 503, {"detail": "Server busy, try again shortly"}, {"Retry-After": 1})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._slots.release()
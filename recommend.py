@@ -0,0 +1,168 @@
+"""
+Course Recommendations for CollegeBuddy Application
+
+"Students who took this course also took..." Every enrollment, hot or
+archived, that was not dropped is one cell of a sparse student x course
+matrix. Item-item similarity is the cosine between two course columns,
+
+    shared(a, b) / sqrt(students(a) * students(b))
+
+damped for pairs backed by only a few shared students. The products are
+computed by the database as a grouped self-join over a batch of courses at
+a time, so memory stays bounded by the batch, and the top K neighbours of
+every course are swapped into course_neighbors in one transaction.
+
+Serving a student's recommendations is then one indexed lookup: sum the
+neighbour scores of the courses they have taken and drop those they have.
+"""
+import heapq
+import math
+import os
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, union
+from sqlalchemy.orm import Session, aliased
+
+from models import ArchivedEnrollment, Course, CourseNeighbor, Enrollment
+
+# Neighbours kept per course
+TOP_K = int(os.getenv("COLLEGEBUDDY_RECOMMEND_TOP_K", "20"))
+
+# Pairs with fewer shared students than this are noise
+MIN_SHARED_STUDENTS = 2
+
+# Shared students at which a similarity keeps half its weight
+SHRINKAGE = 5.0
+
+# Courses whose neighbours are computed per query
+BATCH_SIZE = 200
+
+DROPPED = "Dropped"
+
+
+def taken_courses(student_pk=None):
+    """Subquery of distinct (student_id, course_id) pairs, hot and archived"""
+    parts = []
+    for table in (Enrollment, ArchivedEnrollment):
+        query = select(table.student_id, table.course_id).where(table.status != DROPPED)
+        if student_pk is not None:
+            # Filtered per branch so each one can use its student index
+            query = query.where(table.student_id == student_pk)
+        parts.append(query)
+    return union(*parts).subquery("taken")
+
+
+def similarity(shared, students_a, students_b):
+    cosine = shared / math.sqrt(students_a * students_b)
+    return cosine * shared / (shared + SHRINKAGE)
+
+
+def build_neighbors(db: Session, top_k=TOP_K, batch_size=BATCH_SIZE, progress=None):
+    """Recompute course_neighbors from all enrollments.
+
+    The old index stays readable until the new one is committed. Returns
+    counts for reporting.
+    """
+    taken = taken_courses()
+    sizes = dict(db.execute(
+        select(taken.c.course_id, func.count()).group_by(taken.c.course_id)
+    ).all())
+    course_ids = sorted(sizes)
+
+    a, b = aliased(taken), aliased(taken)
+    shared = func.count().label("shared")
+    rows = []
+    for start in range(0, len(course_ids), batch_size):
+        batch = course_ids[start:start + batch_size]
+        candidates = defaultdict(list)
+        for course_id, neighbor_id, count in db.execute(
+            select(a.c.course_id, b.c.course_id, shared)
+            .join(b, (b.c.student_id == a.c.student_id) & (b.c.course_id != a.c.course_id))
+            .where(a.c.course_id.in_(batch))
+            .group_by(a.c.course_id, b.c.course_id)
+            .having(shared >= MIN_SHARED_STUDENTS)
+        ):
+            score = similarity(count, sizes[course_id], sizes[neighbor_id])
+            candidates[course_id].append((score, count, neighbor_id))
+
+        for course_id, scored in candidates.items():
+            best = heapq.nlargest(top_k, scored)
+            rows.extend(
+                {"course_id": course_id, "neighbor_id": neighbor_id, "rank": rank,
+                 "score": round(score, 6), "shared_students": count}
+                for rank, (score, count, neighbor_id) in enumerate(best, 1)
+            )
+        if progress:
+            progress(min(start + batch_size, len(course_ids)), len(course_ids))
+
+    try:
+        db.execute(delete(CourseNeighbor))
+        if rows:
+            built_at = datetime.utcnow()
+            for row in rows:
+                row["built_at"] = built_at
+            db.bulk_insert_mappings(CourseNeighbor, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {
+        "courses": len(course_ids),
+        "with_neighbors": len({row["course_id"] for row in rows}),
+        "neighbors": len(rows)
+    }
+
+
+def recommend(db: Session, student_pk, limit=10, semester=None, year=None):
+    """Courses most similar to those a student has taken.
+
+    semester and year restrict results to one term's offerings. Each result
+    names the taken courses that contributed most to its score.
+    """
+    taken = taken_courses(student_pk)
+    history = [row[0] for row in db.execute(select(taken.c.course_id))]
+    if not history:
+        return []
+
+    score = func.sum(CourseNeighbor.score).label("score")
+    query = (
+        select(Course, score)
+        .join(CourseNeighbor, CourseNeighbor.neighbor_id == Course.id)
+        .where(CourseNeighbor.course_id.in_(history), CourseNeighbor.neighbor_id.notin_(history))
+        .group_by(Course.id)
+        .order_by(score.desc(), Course.id)
+        .limit(limit)
+    )
+    if semester:
+        query = query.where(Course.semester == semester)
+    if year:
+        query = query.where(Course.year == year)
+    results = db.execute(query).all()
+    if not results:
+        return []
+
+    because = defaultdict(list)
+    for neighbor_id, course_code, course_score in db.execute(
+        select(CourseNeighbor.neighbor_id, Course.course_code, CourseNeighbor.score)
+        .join(Course, Course.id == CourseNeighbor.course_id)
+        .where(CourseNeighbor.course_id.in_(history),
+               CourseNeighbor.neighbor_id.in_([course.id for course, _ in results]))
+        .order_by(CourseNeighbor.score.desc())
+    ):
+        if len(because[neighbor_id]) < 3:
+            because[neighbor_id].append(course_code)
+
+    return [
+        {
+            "course_code": course.course_code,
+            "name": course.name,
+            "semester": course.semester,
+            "year": course.year,
+            "professor": course.professor,
+            "credits": course.credits,
+            "score": round(total, 4),
+            "because_you_took": because[course.id]
+        }
+        for course, total in results
+    ]
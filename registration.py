@@ -0,0 +1,224 @@
+"""
+Course Registration for CollegeBuddy Application
+
+Enrolling, dropping and waitlisting without a global lock. A seat is
+claimed with a conditional UPDATE on the course's enrolled_count:
+
+    UPDATE courses SET enrolled_count = enrolled_count + 1
+    WHERE id = :course AND (capacity IS NULL OR enrolled_count < capacity)
+
+The database applies it atomically, so concurrent requests can never take
+more seats than the course has; a request that gets no row back locks the
+course row, checks once more and joins the waitlist instead. Dropping an
+active enrollment gives its seat back and promotes the longest-waiting
+student in the same transaction. The unique (student_id, course_id) index
+stops a student being registered twice.
+
+Every write statement comes first in its transaction, so on SQLite the
+write lock is taken up front and waits on busy_timeout instead of failing.
+"""
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Course, Enrollment
+
+ACTIVE = "Active"
+WAITLISTED = "Waitlisted"
+DROPPED = "Dropped"
+COMPLETED = "Completed"
+
+# Attempts to promote from the waitlist before giving up on a busy course
+MAX_PROMOTION_ATTEMPTS = 20
+
+# Attempts to enroll when concurrent registrations for the same student and course keep winning
+MAX_ENROLL_ATTEMPTS = 5
+
+
+def _claim_seat(db: Session, course_id):
+    result = db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .where((Course.capacity.is_(None)) | (Course.enrolled_count < Course.capacity))
+        .values(enrolled_count=Course.enrolled_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _release_seat(db: Session, course_id):
+    db.execute(
+        update(Course)
+        .where(Course.id == course_id, Course.enrolled_count > 0)
+        .values(enrolled_count=Course.enrolled_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _set_status(db: Session, enrollment_id, from_status, to_status):
+    """Move one enrollment between statuses; False if someone else moved it first"""
+    values = {"status": to_status}
+    if to_status in (ACTIVE, WAITLISTED):
+        values["enrolled_at"] = datetime.utcnow()
+    result = db.execute(
+        update(Enrollment)
+        .where(Enrollment.id == enrollment_id, Enrollment.status == from_status)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def waitlist_position(db: Session, enrollment):
+    """1-based place in the course's waitlist, or None if not waitlisted"""
+    if enrollment.status != WAITLISTED:
+        return None
+    ahead = (
+        db.query(Enrollment)
+        .filter(
+            Enrollment.course_id == enrollment.course_id,
+            Enrollment.status == WAITLISTED,
+            (Enrollment.enrolled_at < enrollment.enrolled_at)
+            | ((Enrollment.enrolled_at == enrollment.enrolled_at) & (Enrollment.id < enrollment.id))
+        )
+        .count()
+    )
+    return ahead + 1
+
+
+def _first_waitlisted(db: Session, course_id):
+    return db.execute(
+        select(Enrollment.id)
+        .where(Enrollment.course_id == course_id, Enrollment.status == WAITLISTED)
+        .order_by(Enrollment.enrolled_at, Enrollment.id)
+        .limit(1)
+    ).scalar()
+
+
+def promote_waitlist(db: Session, course_id):
+    """Fill free seats from the waitlist; returns promoted enrollment ids. Does not commit."""
+    promoted = []
+    for _ in range(MAX_PROMOTION_ATTEMPTS):
+        if not _claim_seat(db, course_id):
+            break
+        enrollment_id = _first_waitlisted(db, course_id)
+        if enrollment_id is None:
+            _release_seat(db, course_id)
+            break
+        if _set_status(db, enrollment_id, WAITLISTED, ACTIVE):
+            promoted.append(enrollment_id)
+        else:
+            _release_seat(db, course_id)
+    return promoted
+
+
+def _lock_course(db: Session, course_id):
+    """Touch the course row so it stays locked until this transaction ends"""
+    db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(enrolled_count=Course.enrolled_count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _try_enroll(db: Session, student_id, course_id):
+    """One enroll attempt; None if a concurrent registration changed the row first"""
+    seat = _claim_seat(db, course_id)
+    if not seat:
+        # A full course is locked before the student joins its waitlist: a
+        # drop that committed meanwhile has freed a seat for the re-check,
+        # and one still running waits for this commit, then promotes them
+        _lock_course(db, course_id)
+        seat = _claim_seat(db, course_id)
+    status = ACTIVE if seat else WAITLISTED
+    existing = (
+        db.query(Enrollment)
+        .filter(Enrollment.student_id == student_id, Enrollment.course_id == course_id)
+        .first()
+    )
+    if existing is not None and existing.status in (ACTIVE, WAITLISTED):
+        db.rollback()
+        db.refresh(existing)
+        return existing
+
+    if existing is None:
+        db.add(Enrollment(student_id=student_id, course_id=course_id,
+                          status=status, enrolled_at=datetime.utcnow()))
+        db.flush()
+    elif not _set_status(db, existing.id, existing.status, status):
+        db.rollback()
+        return None
+    db.commit()
+
+    return (
+        db.query(Enrollment)
+        .filter(Enrollment.student_id == student_id, Enrollment.course_id == course_id)
+        .one()
+    )
+
+
+def enroll(db: Session, student_id, course_id):
+    """Enroll a student, or waitlist them when the course is full.
+
+    Idempotent: a student already active or waitlisted keeps their place.
+    Returns the Enrollment row after committing.
+    """
+    for _ in range(MAX_ENROLL_ATTEMPTS):
+        try:
+            enrollment = _try_enroll(db, student_id, course_id)
+        except IntegrityError:
+            # Lost a race with another enroll for the same student and course
+            db.rollback()
+            continue
+        if enrollment is not None:
+            return enrollment
+    raise RuntimeError(f"Enrollment of student {student_id} in course {course_id} kept conflicting")
+
+
+def drop(db: Session, enrollment):
+    """Drop an active or waitlisted enrollment, promoting from the waitlist.
+
+    Returns the ids of promoted enrollments, or None if it was neither
+    active nor waitlisted.
+    """
+    try:
+        if _set_status(db, enrollment.id, ACTIVE, DROPPED):
+            _release_seat(db, enrollment.course_id)
+            promoted = promote_waitlist(db, enrollment.course_id)
+        elif _set_status(db, enrollment.id, WAITLISTED, DROPPED):
+            promoted = []
+        else:
+            db.rollback()
+            return None
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return promoted
+
+
+def set_capacity(db: Session, course: Course, capacity):
+    """Change a course's capacity and promote into any new seats.
+
+    Lowering it never removes students; the course just stays over
+    capacity until enough of them drop.
+    """
+    if capacity is not None and capacity < 0:
+        raise ValueError("Capacity must be zero or more")
+    try:
+        db.execute(
+            update(Course)
+            .where(Course.id == course.id)
+            .values(capacity=capacity)
+            .execution_options(synchronize_session=False)
+        )
+        promoted = promote_waitlist(db, course.id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(course)
+    return promoted
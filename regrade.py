@@ -0,0 +1,151 @@
+"""
+Regrading for CollegeBuddy Application
+
+Recomputes percentage and letter grade for every hot grade in a course
+from its points and the course's grading scale. The whole course is
+handled by one UPDATE whose CASE expressions encode the curve and the
+letter cutoffs, run in the same transaction as the scale change, so a
+regrade is all-or-nothing however many rows it touches. A dry run reports
+the same diff without writing anything.
+
+Archived grades belong to finished terms and are never regraded.
+"""
+from datetime import datetime
+
+from sqlalchemy import Float, Numeric, case, cast, func, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from grading import DEFAULT_SCALE, format_scale, parse_scale, validate_scale
+from models import Assignment, Course, Grade, GradingScale, Student
+
+# Changed rows listed in a regrade report
+DIFF_SAMPLE_SIZE = 50
+
+
+def scale_for(db: Session, course_id):
+    """(scale, curve, max_percentage) for a course, defaults if it has none"""
+    return scales_for(db, [course_id])[course_id]
+
+
+def scales_for(db: Session, course_ids):
+    """scale_for for many courses with one query"""
+    stored = {
+        s.course_id: (parse_scale(s.cutoffs), s.curve or 0.0, s.max_percentage or 100.0)
+        for s in db.query(GradingScale).filter(GradingScale.course_id.in_(course_ids))
+    }
+    return {cid: stored.get(cid, (DEFAULT_SCALE, 0.0, 100.0)) for cid in course_ids}
+
+
+def scale_to_dict(course, scale, curve, max_percentage):
+    return {
+        "course_code": course.course_code,
+        "cutoffs": [[minimum, letter] for minimum, letter in scale],
+        "curve": curve,
+        "max_percentage": max_percentage
+    }
+
+
+def percentage_expr(curve, max_percentage):
+    """SQL for grading.curved() applied to a grade's raw percentage"""
+    raw = case(
+        (Grade.points_possible > 0, Grade.points_earned * 100.0 / Grade.points_possible),
+        else_=None
+    )
+    if curve:
+        ceiling = case((raw > literal(max_percentage, Float), raw), else_=literal(max_percentage, Float))
+        raw = case((raw + literal(curve, Float) < ceiling, raw + literal(curve, Float)), else_=ceiling)
+    return cast(func.round(cast(raw, Numeric(12, 4)), 2), Float)
+
+
+def letter_expr(percentage, scale):
+    """SQL for grading.letter_for() over a percentage expression"""
+    whens = [(percentage.is_(None), None)]
+    whens += [(percentage >= literal(minimum, Float), letter) for minimum, letter in scale[:-1]]
+    return case(*whens, else_=scale[-1][1])
+
+
+def regrade_course(db: Session, course: Course, scale=None, curve=None, max_percentage=None,
+                   dry_run=False, sample_size=DIFF_SAMPLE_SIZE):
+    """Recompute a course's grades, optionally under a new scale or curve.
+
+    Arguments left as None keep the course's stored values. Unless dry_run
+    is set, the scale is saved and the grades rewritten in one transaction.
+    Raises ValueError for an invalid scale.
+    """
+    current_scale, current_curve, current_max = scale_for(db, course.id)
+    scale = validate_scale(scale) if scale is not None else current_scale
+    curve = float(curve) if curve is not None else current_curve
+    max_percentage = float(max_percentage) if max_percentage is not None else current_max
+
+    new_percentage = percentage_expr(curve, max_percentage)
+    new_letter = letter_expr(new_percentage, scale)
+    in_course = Grade.assignment_id.in_(select(Assignment.id).where(Assignment.course_id == course.id))
+    changed = or_(
+        Grade.percentage.is_distinct_from(new_percentage),
+        Grade.letter_grade.is_distinct_from(new_letter)
+    )
+
+    def letter_counts(letter_column, where):
+        letters = select(letter_column.label("letter")).where(*where).subquery()
+        rows = db.execute(select(letters.c.letter, func.count()).group_by(letters.c.letter)).all()
+        return {letter or "none": count for letter, count in rows}
+
+    diff = db.execute(
+        select(
+            Grade.id,
+            Student.student_id,
+            Assignment.title,
+            Grade.percentage,
+            new_percentage.label("new_percentage"),
+            Grade.letter_grade,
+            new_letter.label("new_letter_grade")
+        )
+        .join(Student, Student.id == Grade.student_id)
+        .join(Assignment, Assignment.id == Grade.assignment_id)
+        .where(in_course, changed)
+        .order_by(Grade.id)
+        .limit(sample_size)
+    ).all()
+    report = {
+        **scale_to_dict(course, scale, curve, max_percentage),
+        "dry_run": dry_run,
+        "changed": db.execute(select(func.count()).select_from(Grade).where(in_course, changed)).scalar(),
+        "letters_before": letter_counts(Grade.letter_grade, [in_course]),
+        "letters_after": letter_counts(new_letter, [in_course]),
+        "changes": [
+            {
+                "grade_id": r.id,
+                "student_id": r.student_id,
+                "assignment_title": r.title,
+                "percentage": [r.percentage, r.new_percentage],
+                "letter_grade": [r.letter_grade, r.new_letter_grade]
+            }
+            for r in diff
+        ]
+    }
+    if dry_run:
+        db.rollback()
+        return report
+
+    try:
+        stored = db.query(GradingScale).filter(GradingScale.course_id == course.id).first()
+        if stored is None:
+            stored = GradingScale(course_id=course.id)
+            db.add(stored)
+        stored.cutoffs = format_scale(scale)
+        stored.curve = curve
+        stored.max_percentage = max_percentage
+        stored.updated_at = datetime.utcnow()
+
+        result = db.execute(
+            update(Grade)
+            .where(in_course, changed)
+            .values(percentage=new_percentage, letter_grade=new_letter, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    report["changed"] = result.rowcount
+    return report
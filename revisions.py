@@ -0,0 +1,193 @@
+"""
+Note Revisions for CollegeBuddy Application
+
+Every edit of a note is kept. A revision is stored as a zlib-compressed
+delta against the one before it: the runs of tokens (lines, or words for
+short notes) it shares with the previous text are referenced by position
+and only new text is written out. Every SNAPSHOT_EVERY revisions, or
+whenever a delta would not be smaller, the full text is stored instead,
+so reading any revision decodes one snapshot and at most
+SNAPSHOT_EVERY - 1 deltas fetched with a single query.
+
+The note row always holds the latest text, so normal reads never touch
+note_revisions. Edits are optimistic: an edit based on an older revision
+is refused rather than silently overwriting someone else's.
+
+Notes created before revisions were kept get their original text saved as
+revision 1 on their first edit.
+"""
+import difflib
+import json
+import re
+import zlib
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Note, NoteRevision
+
+SNAPSHOT_EVERY = 16
+
+# Notes with fewer lines than this are diffed word by word
+MIN_LINES_FOR_LINE_DIFF = 20
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+_WORDS_RE = re.compile(r"\S+\s*|\s+")
+
+
+class StaleRevision(Exception):
+    """The note changed since the revision an edit was based on"""
+
+
+def _tokens(text, mode):
+    return text.splitlines(keepends=True) if mode == "l" else _WORDS_RE.findall(text)
+
+
+def make_delta(old, new):
+    """Delta turning old into new: copied (start, end) token runs and inserted text"""
+    mode = "l" if new.count("\n") >= MIN_LINES_FOR_LINE_DIFF else "w"
+    a, b = _tokens(old, mode), _tokens(new, mode)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(b[j1:j2]))
+    return {"t": mode, "ops": ops}
+
+
+def apply_delta(old, delta):
+    a = _tokens(old, delta["t"])
+    return "".join("".join(a[op[0]:op[1]]) if isinstance(op, list) else op for op in delta["ops"])
+
+
+def _encode(kind, payload):
+    raw = payload.encode() if kind == SNAPSHOT else json.dumps(payload, separators=(",", ":")).encode()
+    return zlib.compress(raw, 6)
+
+
+def _decode(row):
+    raw = zlib.decompress(row.data).decode()
+    return raw if row.kind == SNAPSHOT else json.loads(raw)
+
+
+def _revision_row(note_id, revision, previous_text, text, title, tags, now):
+    """NoteRevision for text, as a delta unless a snapshot is due or smaller"""
+    snapshot = _encode(SNAPSHOT, text)
+    kind, data = SNAPSHOT, snapshot
+    if previous_text is not None and revision % SNAPSHOT_EVERY != 1:
+        delta = _encode(DELTA, make_delta(previous_text, text))
+        if len(delta) < len(snapshot):
+            kind, data = DELTA, delta
+    return NoteRevision(note_id=note_id, revision=revision, kind=kind, data=data,
+                        title=title, tags=tags, size=len(text), created_at=now)
+
+
+def record_initial(db: Session, note):
+    """Save a new note's text as revision 1. Does not commit."""
+    now = note.created_at or datetime.utcnow()
+    db.add(_revision_row(note.id, 1, None, note.content or "", note.title, note.tags, now))
+    note.revision = 1
+
+
+def edit_note(db: Session, note, changes, base_revision=None):
+    """Apply changes (title, content, course_code, tags) and record a revision.
+
+    With base_revision, raises StaleRevision if the note has moved on since.
+    Returns the new revision number after committing.
+    """
+    current = note.revision or 0
+    if base_revision is not None and base_revision != current:
+        raise StaleRevision(current)
+
+    now = datetime.utcnow()
+    previous_text = note.content or ""
+    values = {key: changes[key] for key in ("title", "content", "course_code", "tags") if key in changes}
+    text = values.get("content", previous_text) or ""
+    try:
+        revision = current + 1
+        if current == 0:
+            # History starts here for notes older than revisions
+            db.add(_revision_row(note.id, 1, None, previous_text, note.title, note.tags, note.updated_at or now))
+            revision = 2
+        # Conditional on the revision read above, like a compare-and-swap
+        result = db.execute(
+            update(Note)
+            .where(Note.id == note.id, func.coalesce(Note.revision, 0) == current)
+            .values(revision=revision, updated_at=now, **values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise StaleRevision(current)
+        db.add(_revision_row(note.id, revision, previous_text, text,
+                             values.get("title", note.title), values.get("tags", note.tags), now))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise StaleRevision(current)
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(note)
+    return revision
+
+
+def list_revisions(db: Session, note_id):
+    """Metadata of every revision of a note, newest first"""
+    rows = db.execute(
+        select(NoteRevision.revision, NoteRevision.kind, NoteRevision.title, NoteRevision.tags,
+               NoteRevision.size, func.length(NoteRevision.data), NoteRevision.created_at)
+        .where(NoteRevision.note_id == note_id)
+        .order_by(NoteRevision.revision.desc())
+    )
+    return [
+        {
+            "revision": revision,
+            "title": title,
+            "tags": tags.split(",") if tags else [],
+            "size": size,
+            "stored_bytes": stored,
+            "stored_as": kind,
+            "created_at": created_at
+        }
+        for revision, kind, title, tags, size, stored, created_at in rows
+    ]
+
+
+def get_revision(db: Session, note_id, revision):
+    """(NoteRevision, content) for one revision, or None if it does not exist"""
+    base = (
+        select(func.max(NoteRevision.revision))
+        .where(NoteRevision.note_id == note_id, NoteRevision.kind == SNAPSHOT,
+               NoteRevision.revision <= revision)
+        .scalar_subquery()
+    )
+    rows = (
+        db.query(NoteRevision)
+        .filter(NoteRevision.note_id == note_id, NoteRevision.revision.between(base, revision))
+        .order_by(NoteRevision.revision)
+        .all()
+    )
+    if not rows or rows[-1].revision != revision:
+        return None
+    text = _decode(rows[0])
+    for row in rows[1:]:
+        text = apply_delta(text, _decode(row))
+    return rows[-1], text
+
+
+def revision_diff(db: Session, note_id, revision):
+    """Unified diff from the previous revision, or None if it does not exist"""
+    current = get_revision(db, note_id, revision)
+    if current is None:
+        return None
+    previous = get_revision(db, note_id, revision - 1) if revision > 1 else None
+    before = previous[1] if previous else ""
+    return "".join(difflib.unified_diff(
+        before.splitlines(keepends=True), current[1].splitlines(keepends=True),
+        fromfile=f"revision {revision - 1}", tofile=f"revision {revision}"
+    ))
@@ -0,0 +1,222 @@
+"""
+At-Risk Scoring for CollegeBuddy Application
+
+Early-warning scores for advisors. Each student's row in student_risk holds
+a few features from their grades and deadlines and a 0-100 score:
+
+- a low recent average (or overall average, before any recent work)
+- a recent average well below their earlier work
+- several recent grades under LOW_GRADE
+- many ungraded assignments due in the next DEADLINE_DAYS
+
+A run only rescores students whose inputs moved since the last one: grades
+written or regraded after the job's watermark, grades that slid out of the
+recent window, and students whose upcoming deadline count changed. Their
+features are recomputed with one grouped query per batch, so a daily run
+costs in proportion to the day's activity rather than to the whole school.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from archive import grade_history
+from models import ArchivedGrade, Assignment, Enrollment, Grade, JobState, Student, StudentRisk
+
+JOB_NAME = "at_risk"
+
+# Grades this recent count as the student's current performance
+RECENT_DAYS = 28
+
+# Ungraded work due this soon counts as an upcoming deadline
+DEADLINE_DAYS = 14
+
+LOW_GRADE = 70.0
+
+# Re-read grades stamped this long before the watermark, in case their
+# transaction committed after the previous run read the table
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+BATCH_SIZE = 500
+
+
+def score_features(average, recent_average, earlier_average, recent_low_grades, upcoming_deadlines):
+    """(score, reasons) for one student's features"""
+    score, reasons = 0.0, []
+
+    current = recent_average if recent_average is not None else average
+    if current is not None and current < 80:
+        score += min(50.0, (80 - current) * 2)
+        reasons.append("low average")
+
+    if recent_average is not None and earlier_average is not None:
+        decline = earlier_average - recent_average
+        if decline >= 5:
+            score += min(25.0, decline * 1.5)
+            reasons.append("declining")
+
+    if recent_low_grades >= 2:
+        score += min(15.0, recent_low_grades * 3)
+        reasons.append("low recent grades")
+
+    if upcoming_deadlines >= 4:
+        score += min(20.0, (upcoming_deadlines - 3) * 4)
+        reasons.append("many deadlines")
+
+    return round(min(score, 100.0), 1), reasons
+
+
+def upcoming_deadlines(db: Session, now):
+    """{student pk: ungraded active-course assignments due in DEADLINE_DAYS}
+
+    now is local time, like the due dates it is compared with.
+    """
+    return dict(db.execute(
+        select(Enrollment.student_id, func.count())
+        .join(Assignment, Assignment.course_id == Enrollment.course_id)
+        .outerjoin(Grade, (Grade.assignment_id == Assignment.id) & (Grade.student_id == Enrollment.student_id))
+        .where(
+            Assignment.due_date >= now,
+            Assignment.due_date < now + timedelta(days=DEADLINE_DAYS),
+            Enrollment.status == "Active",
+            Grade.id.is_(None)
+        )
+        .group_by(Enrollment.student_id)
+    ).all())
+
+
+def changed_students(db: Session, since, previous_run, now):
+    """Students with grades written after since, or leaving the recent window"""
+    window_moved = Grade.graded_at.between(
+        previous_run - timedelta(days=RECENT_DAYS), now - timedelta(days=RECENT_DAYS)
+    )
+    return {
+        row[0] for row in db.execute(
+            select(Grade.student_id).distinct()
+            .where(or_(Grade.graded_at > since, Grade.updated_at > since, window_moved))
+        )
+    }
+
+
+def grade_features(db: Session, student_ids, now):
+    """{student pk: feature dict} from hot and archived grades"""
+    history = grade_history(student_ids)
+    recent = history.c.graded_at >= now - timedelta(days=RECENT_DAYS)
+    rows = db.execute(
+        select(
+            history.c.student_id,
+            func.count(history.c.percentage),
+            func.avg(history.c.percentage),
+            func.avg(case((recent, history.c.percentage))),
+            func.avg(case((~recent, history.c.percentage))),
+            func.count(case((recent & (history.c.percentage < LOW_GRADE), 1)))
+        )
+        .group_by(history.c.student_id)
+    )
+    return {
+        student_id: {
+            "graded_count": count,
+            "average": average,
+            "recent_average": recent_average,
+            "earlier_average": earlier_average,
+            "recent_low_grades": low
+        }
+        for student_id, count, average, recent_average, earlier_average, low in rows
+    }
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def score_students(db: Session, full=False, now=None, batch_size=BATCH_SIZE):
+    """Rescore students whose inputs changed since the last run.
+
+    full rescores everyone. Each batch commits on its own; the watermark
+    only moves once every batch is written, so a failed run is simply
+    repeated. Returns counts for reporting.
+    """
+    now = now or datetime.utcnow()
+    state = db.query(JobState).filter(JobState.name == JOB_NAME).first()
+    if state is None:
+        state = JobState(name=JOB_NAME)
+        db.add(state)
+    full = full or state.watermark is None
+
+    # Due dates are entered in local time; graded_at and the watermark are UTC
+    local_now = now.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    deadlines = upcoming_deadlines(db, local_now)
+    stored = dict(db.execute(select(StudentRisk.student_id, StudentRisk.upcoming_deadlines)).all())
+    if full:
+        targets = {row[0] for row in db.execute(select(Grade.student_id).distinct())}
+        targets |= {row[0] for row in db.execute(select(ArchivedGrade.student_id).distinct())}
+        targets |= set(stored) | set(deadlines)
+    else:
+        targets = changed_students(db, state.watermark - WATERMARK_OVERLAP, state.last_run_at, now)
+        targets |= {s for s in set(stored) | set(deadlines) if stored.get(s) != deadlines.get(s, 0)}
+
+    targets = sorted(targets)
+    flagged = 0
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        features = grade_features(db, batch, now)
+        rows = []
+        for student_id in batch:
+            f = features.get(student_id, {
+                "graded_count": 0, "average": None, "recent_average": None,
+                "earlier_average": None, "recent_low_grades": 0
+            })
+            f = {key: _round(value) if isinstance(value, float) else value for key, value in f.items()}
+            f["upcoming_deadlines"] = deadlines.get(student_id, 0)
+            score, reasons = score_features(
+                f["average"], f["recent_average"], f["earlier_average"],
+                f["recent_low_grades"], f["upcoming_deadlines"]
+            )
+            flagged += score > 0
+            rows.append(dict(f, student_id=student_id, score=score,
+                             reasons=",".join(reasons), computed_at=now))
+        try:
+            db.execute(delete(StudentRisk).where(StudentRisk.student_id.in_(batch)))
+            db.bulk_insert_mappings(StudentRisk, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    state.watermark = now
+    state.last_run_at = now
+    state.last_rows = len(targets)
+    db.commit()
+    return {"full": full, "rescored": len(targets), "with_risk": flagged}
+
+
+def at_risk(db: Session, limit=50, min_score=1.0, major=None):
+    """Highest-scoring students, for the advising list"""
+    query = (
+        select(StudentRisk, Student)
+        .join(Student, Student.id == StudentRisk.student_id)
+        .where(StudentRisk.score >= min_score)
+        .order_by(StudentRisk.score.desc(), Student.id)
+        .limit(limit)
+    )
+    if major:
+        query = query.where(Student.major == major)
+    return [
+        {
+            "student_id": student.student_id,
+            "name": student.name,
+            "email": student.email,
+            "major": student.major,
+            "year": student.year,
+            "score": risk.score,
+            "reasons": risk.reasons.split(",") if risk.reasons else [],
+            "graded_count": risk.graded_count,
+            "average": risk.average,
+            "recent_average": risk.recent_average,
+            "earlier_average": risk.earlier_average,
+            "recent_low_grades": risk.recent_low_grades,
+            "upcoming_deadlines": risk.upcoming_deadlines,
+            "computed_at": risk.computed_at
+        }
+        for risk, student in db.execute(query)
+    ]
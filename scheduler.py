@@ -0,0 +1,396 @@
+"""
+Background Jobs for CollegeBuddy Application
+
+Recurring maintenance and precomputation run on a small thread pool next to
+the request handlers instead of inside them. Jobs are plain functions of a
+session, registered with @job in jobs.py.
+
+Shared jobs run in one process at a time, however many workers or hosts are
+up. Their schedule lives in the scheduled_jobs table and a worker claims a
+due job with a conditional UPDATE that takes a lease:
+
+    UPDATE scheduled_jobs SET lease_owner = :me, lease_expires_at = :until
+    WHERE name = :job AND next_run_at <= :now
+      AND (lease_expires_at IS NULL OR lease_expires_at < :now)
+
+The lease is renewed while the job runs, so if the worker dies another one
+takes over once it expires. Failures are retried with exponential backoff
+before falling back to the normal interval. Per-process jobs, such as cache
+warming, run in every worker on an in-memory timer.
+
+Schedules and leases live in the primary database. Each run of a job visits
+every database given by the scheduler's targets; in multi-tenant mode that
+is every known tenant in turn, so reminders, risk scores and garbage
+collection reach each college.
+"""
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import ScheduledJob
+
+SCHEDULER_ENABLED = os.getenv("COLLEGEBUDDY_SCHEDULER", "1") == "1"
+
+# Jobs running at once in one process
+SCHEDULER_WORKERS = int(os.getenv("COLLEGEBUDDY_SCHEDULER_WORKERS", "2"))
+
+# How often due jobs are looked for and running leases renewed
+POLL_SECONDS = float(os.getenv("COLLEGEBUDDY_SCHEDULER_POLL", "5"))
+
+# A shared job whose worker stops renewing its lease this long is run elsewhere
+LEASE_SECONDS = float(os.getenv("COLLEGEBUDDY_SCHEDULER_LEASE", "120"))
+
+# First retry delay after a failure, doubled per consecutive failure
+RETRY_BASE_SECONDS = 30
+MAX_RETRY_SECONDS = 3600
+
+# Recent durations kept per job for percentiles
+DURATION_SAMPLES = 100
+
+Job = namedtuple("Job", "name func interval per_process max_attempts first_delay")
+
+JOBS = {}
+
+
+def job(name, every, per_process=False, max_attempts=3, first_delay=0):
+    """Register func(db) to run every `every` seconds, first after first_delay"""
+    def register(func):
+        JOBS[name] = Job(name, func, float(every), per_process, max_attempts, float(first_delay))
+        return func
+    return register
+
+
+def retry_delay(attempts, interval):
+    """Seconds before retrying after the given number of consecutive failures"""
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_RETRY_SECONDS, interval)
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 4)
+
+
+class Scheduler:
+    """Runs registered jobs on a bounded thread pool until stopped"""
+
+    def __init__(self, session_factory, jobs=None, workers=SCHEDULER_WORKERS,
+                 poll_seconds=POLL_SECONDS, lease_seconds=LEASE_SECONDS, owner=None, targets=None):
+        self.session_factory = session_factory
+        # Callable returning the session factories each job run visits
+        self.targets = targets or (lambda: [session_factory])
+        self.jobs = dict(jobs if jobs is not None else JOBS)
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._pool = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running = {}
+        # Per-process jobs: monotonic time of next run and consecutive failures
+        self._local_due = {
+            name: time.monotonic() + j.first_delay for name, j in self.jobs.items() if j.per_process
+        }
+        self._local_attempts = defaultdict(int)
+        self.metrics = defaultdict(lambda: {
+            "runs": 0, "failures": 0, "last_duration": None, "max_duration": 0.0,
+            "durations": deque(maxlen=DURATION_SAMPLES)
+        })
+
+    # Lifecycle
+    def start(self):
+        self._sync_jobs()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="collegebuddy-job")
+        self._thread = threading.Thread(target=self._loop, name="collegebuddy-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop claiming jobs; running ones finish unless wait is False"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Scheduler poll failed: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def _sync_jobs(self):
+        """Create schedule rows for new shared jobs and apply interval changes"""
+        db = self.session_factory()
+        try:
+            stored = {row.name: row for row in db.query(ScheduledJob)}
+            for name, j in self.jobs.items():
+                if j.per_process:
+                    continue
+                if name not in stored:
+                    db.add(ScheduledJob(name=name, interval_seconds=j.interval, enabled=1,
+                                        next_run_at=datetime.utcnow() + timedelta(seconds=j.first_delay),
+                                        attempts=0, runs=0, failures=0))
+                elif stored[name].interval_seconds != j.interval:
+                    stored[name].interval_seconds = j.interval
+            db.commit()
+        except IntegrityError:
+            # Another worker registered them first
+            db.rollback()
+        finally:
+            db.close()
+
+    # Claiming
+    def tick(self):
+        """Renew running leases and start whatever is due, up to free slots"""
+        now = datetime.utcnow()
+        with self._lock:
+            running = set(self._running)
+        free = self.workers - len(running)
+
+        for name in [n for n, due in self._local_due.items() if due <= time.monotonic()]:
+            if free <= 0:
+                break
+            if name not in running:
+                self._submit(self.jobs[name])
+                free -= 1
+
+        shared = [n for n, j in self.jobs.items() if not j.per_process]
+        db = self.session_factory()
+        try:
+            renew = [n for n in running if n in shared]
+            if renew:
+                db.execute(
+                    update(ScheduledJob)
+                    .where(ScheduledJob.name.in_(renew), ScheduledJob.lease_owner == self.owner)
+                    .values(lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+            if free <= 0 or not shared:
+                return
+            due = [
+                row[0] for row in db.query(ScheduledJob.name)
+                .filter(
+                    ScheduledJob.name.in_(shared),
+                    ScheduledJob.enabled == 1,
+                    ScheduledJob.next_run_at <= now,
+                    or_(ScheduledJob.lease_expires_at.is_(None), ScheduledJob.lease_expires_at < now)
+                )
+                .order_by(ScheduledJob.next_run_at)
+                .limit(free)
+            ]
+            for name in due:
+                if name not in running and self._claim(db, name, now):
+                    self._submit(self.jobs[name])
+        finally:
+            db.close()
+
+    def _claim(self, db: Session, name, now):
+        result = db.execute(
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.name == name,
+                ScheduledJob.enabled == 1,
+                ScheduledJob.next_run_at <= now,
+                or_(ScheduledJob.lease_expires_at.is_(None), ScheduledJob.lease_expires_at < now)
+            )
+            .values(lease_owner=self.owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    last_started_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    def _submit(self, j):
+        with self._lock:
+            self._running[j.name] = time.monotonic()
+        if j.per_process:
+            self._local_due[j.name] = float("inf")
+        self._pool.submit(self._run, j)
+
+    # Running
+    def _run(self, j):
+        started = time.perf_counter()
+        error = None
+        try:
+            factories = self.targets()
+        except Exception:
+            error = traceback.format_exc(limit=5)
+            print(f"⚠️ Job {j.name} found no databases: {error.strip().splitlines()[-1]}")
+            factories = []
+        for factory in factories:
+            # A failure is recorded once for the run; the other databases still run
+            db = None
+            try:
+                db = factory()
+                db.info["actor"] = f"job:{j.name}"
+                j.func(db)
+            except Exception:
+                error = traceback.format_exc(limit=5)
+                tenant = db.info.get("tenant") if db is not None else None
+                where = f" for tenant {tenant}" if tenant else ""
+                print(f"⚠️ Job {j.name} failed{where}: {error.strip().splitlines()[-1]}")
+            finally:
+                if db is not None:
+                    db.close()
+        duration = time.perf_counter() - started
+
+        with self._lock:
+            self._running.pop(j.name, None)
+            m = self.metrics[j.name]
+            m["runs"] += 1
+            m["failures"] += error is not None
+            m["last_duration"] = round(duration, 4)
+            m["max_duration"] = round(max(m["max_duration"], duration), 4)
+            m["durations"].append(duration)
+
+        if j.per_process:
+            attempts = self._local_attempts[j.name] = (self._local_attempts[j.name] + 1) if error else 0
+            delay = retry_delay(attempts, j.interval) if 0 < attempts < j.max_attempts else j.interval
+            self._local_due[j.name] = time.monotonic() + delay
+        else:
+            try:
+                self._finish(j, error, duration)
+            except Exception as e:
+                # The lease expires and the job runs again
+                print(f"⚠️ Could not record job {j.name}: {e}")
+
+    def _finish(self, j, error, duration):
+        db = self.session_factory()
+        try:
+            row = db.query(ScheduledJob).filter(ScheduledJob.name == j.name).one()
+            now = datetime.utcnow()
+            row.runs = (row.runs or 0) + 1
+            row.last_finished_at = now
+            row.last_duration = round(duration, 4)
+            if error is None:
+                row.attempts = 0
+                row.last_status = "ok"
+                row.last_error = None
+                row.next_run_at = now + timedelta(seconds=j.interval)
+            else:
+                row.attempts = (row.attempts or 0) + 1
+                row.failures = (row.failures or 0) + 1
+                row.last_status = "failed"
+                row.last_error = error[-4000:]
+                if row.attempts < j.max_attempts:
+                    row.next_run_at = now + timedelta(seconds=retry_delay(row.attempts, j.interval))
+                else:
+                    row.attempts = 0
+                    row.next_run_at = now + timedelta(seconds=j.interval)
+            if row.lease_owner == self.owner:
+                row.lease_owner = None
+                row.lease_expires_at = None
+            db.commit()
+        finally:
+            db.close()
+
+    def run_soon(self, name):
+        """Make a per-process job due at the next poll"""
+        if name in self._local_due and name not in self._running:
+            self._local_due[name] = 0.0
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            running = {name: round(now - started, 1) for name, started in self._running.items()}
+            jobs = {
+                name: {
+                    "runs": m["runs"],
+                    "failures": m["failures"],
+                    "last_duration": m["last_duration"],
+                    "max_duration": m["max_duration"],
+                    "p50_duration": _percentile(m["durations"], 0.5) if m["durations"] else None,
+                    "p95_duration": _percentile(m["durations"], 0.95) if m["durations"] else None,
+                    "running_seconds": running.get(name)
+                }
+                for name, m in self.metrics.items()
+            }
+        return {"owner": self.owner, "workers": self.workers, "running": len(running), "jobs": jobs}
+
+
+def job_status(db: Session):
+    """Stored schedule and last outcome of every shared job"""
+    return [
+        {
+            "name": row.name,
+            "enabled": bool(row.enabled),
+            "interval_seconds": row.interval_seconds,
+            "next_run_at": row.next_run_at,
+            "running_on": row.lease_owner,
+            "runs": row.runs,
+            "failures": row.failures,
+            "consecutive_failures": row.attempts,
+            "last_started_at": row.last_started_at,
+            "last_finished_at": row.last_finished_at,
+            "last_duration": row.last_duration,
+            "last_status": row.last_status,
+            "last_error": row.last_error
+        }
+        for row in db.query(ScheduledJob).order_by(ScheduledJob.name)
+    ]
+
+
+def trigger(db: Session, name):
+    """Make a job due now. Raises KeyError for an unknown job."""
+    _load_jobs()
+    if name not in JOBS:
+        raise KeyError(name)
+    if JOBS[name].per_process:
+        if _scheduler is not None:
+            _scheduler.run_soon(name)
+        return
+    db.execute(
+        update(ScheduledJob)
+        .where(ScheduledJob.name == name)
+        .values(next_run_at=datetime.utcnow(), attempts=0)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def run_job(db: Session, name):
+    """Run a job inline, outside the schedule (for manage.py)"""
+    _load_jobs()
+    return JOBS[name].func(db)
+
+
+# Process-wide scheduler, started from the app's startup event
+_scheduler = None
+
+
+def _load_jobs():
+    import jobs  # noqa: F401  (registers the @job functions)
+
+
+def start_scheduler(session_factory, targets=None):
+    global _scheduler
+    if _scheduler is None:
+        _load_jobs()
+        _scheduler = Scheduler(session_factory, targets=targets)
+        _scheduler.start()
+    return _scheduler
+
+
+def stop_scheduler(wait=True):
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop(wait=wait)
+        _scheduler = None
+
+
+def scheduler_stats():
+    """Per-process job metrics, or None when no scheduler runs here"""
+    return _scheduler.stats() if _scheduler is not None else None
@@ -0,0 +1,94 @@
+"""
+Production Server for CollegeBuddy Application
+
+Runs several worker processes behind one listening socket. The parent
+process initializes the database, and in multi-tenant mode every known
+tenant's, once; every worker then starts with its own engine, connection
+pool and read caches, sharing nothing mutable.
+
+    python serve.py --workers 4
+
+Live updates (/api/stream, /api/ws) are fanned out within one process, so
+a client only hears about writes handled by its own worker; run with
+--workers 1 where they matter.
+"""
+import argparse
+import os
+import time
+
+DB_INITIALIZED_ENV = "COLLEGEBUDDY_DB_INITIALIZED"
+PREWARM_ENV = "COLLEGEBUDDY_PREWARM"
+
+
+def worker_startup(app=None, import_seconds=None):
+    """Per-process startup hook, called from the app's startup event.
+
+    When given the app, the measured import and startup times are stored
+    on app.state.startup_timing and reported by /health.
+    """
+    started = time.perf_counter()
+    from database import init_db, init_tenants, dispose_engines, session_factories
+
+    if os.getenv(DB_INITIALIZED_ENV) != "1":
+        if init_db():
+            print("🎓 CollegeBuddy database initialized!")
+        init_tenants()
+
+    # Never reuse pooled connections inherited from a parent process
+    dispose_engines()
+
+    if os.getenv(PREWARM_ENV) == "1":
+        from cache import prewarm
+
+        for factory in session_factories():
+            db = factory()
+            try:
+                prewarm(db)
+            finally:
+                db.close()
+        print(f"🔥 Worker {os.getpid()} read caches prewarmed")
+
+    timing = {
+        "import_seconds": round(import_seconds, 4) if import_seconds is not None else None,
+        "startup_seconds": round(time.perf_counter() - started, 4)
+    }
+    if app is not None:
+        app.state.startup_timing = timing
+    print(f"⏱️ Worker {os.getpid()} imports {timing['import_seconds']}s, startup {timing['startup_seconds']}s")
+    return timing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CollegeBuddy with multiple workers")
+    parser.add_argument("--app", default="app:app", help="ASGI app import string")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-prewarm", action="store_true", help="Skip cache prewarming")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    from database import init_db, init_tenants, dispose_engines
+
+    # Run schema setup exactly once, before any worker exists
+    init_db()
+    init_tenants()
+    dispose_engines()
+
+    os.environ[DB_INITIALIZED_ENV] = "1"
+    os.environ[PREWARM_ENV] = "0" if args.no_prewarm else "1"
+
+    import uvicorn
+
+    print(f"🎓 Starting CollegeBuddy with {args.workers} workers on {args.host}:{args.port}")
+    uvicorn.run(
+        args.app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level
+    )
+
+
+if __name__ == "__main__":
+    main()
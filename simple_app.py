@@ -2,13 +2,20 @@
 CollegeBuddy - Your Ultimate College Assistant
 A simple and clean college management application
 """
-import uvicorn
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from database import init_db, get_db
+from database import get_db, tenant_stats
+from serve import worker_startup
+from ratelimit import RateLimitMiddleware
+from compression import CompressionMiddleware
 from models import Student, Course, Assignment, Event
 
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
 # Initialize FastAPI app
 app = FastAPI(
     title="CollegeBuddy - College Assistant",
@@ -18,11 +25,14 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Compression and ETags, wrapped by per-client rate limits and bounded concurrency
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    init_db()
-    print("🎓 CollegeBuddy database initialized!")
+    worker_startup(app, IMPORT_SECONDS)
 
 # Main dashboard route
 @app.get("/", response_class=HTMLResponse)
@@ -368,7 +378,9 @@ async def health_check():
             "Notes & Resources",
             "Progress Analytics",
             "Campus Integration"
-        ]
+        ],
+        "startup": getattr(app.state, "startup_timing", None),
+        "tenants": tenant_stats()
     }
 
 # Quick stats endpoint
@@ -397,6 +409,7 @@ if __name__ == "__main__":
     print("✅ Ready for college management!")
     print("=" * 60)
     
+    import uvicorn
     uvicorn.run(
         "simple_app:app",
         host="0.0.0.0",
@@ -0,0 +1,313 @@
+"""
+Synthetic Data for CollegeBuddy Application
+
+Generates production-sized datasets for local performance work. The demo
+rows from add_sample_data are loaded first (on an empty database), then
+everything else is written with bulk inserts using explicit ids, so a run
+with the same seed and as_of date always produces the same rows.
+
+Distributions aim to look like a real campus: course popularity follows a
+long tail, each student has a stable ability that their scores scatter
+around, only assignments already due are graded, and past terms are
+Completed while the current term is mostly Active with a few drops.
+
+    python manage.py generate --students 20000 --courses 400 --seed 7 --as-of 2026-10-01
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from bulk import bulk_insert
+from calendar_feed import term_dates
+from grading import GRADE_POINTS, letter_for
+from models import Student, Course, Enrollment, Assignment, Grade, Note, Event
+
+FIRST_NAMES = [
+    "Aiden", "Amara", "Ben", "Chloe", "Daniel", "Elena", "Farah", "Gabriel", "Hana", "Ivan",
+    "Jasmine", "Kenji", "Laila", "Mateo", "Nadia", "Omar", "Priya", "Quinn", "Rosa", "Samuel",
+    "Tara", "Uma", "Victor", "Wei", "Ximena", "Yusuf", "Zoe"
+]
+LAST_NAMES = [
+    "Anderson", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Johnson",
+    "Kim", "Lopez", "Martin", "Nguyen", "Okafor", "Patel", "Rossi", "Silva", "Taylor", "Walker"
+]
+
+# (major, department prefix, weight)
+MAJORS = [
+    ("Computer Science", "CS", 18),
+    ("Biology", "BIO", 14),
+    ("Business", "BUS", 14),
+    ("Psychology", "PSY", 10),
+    ("Mathematics", "MATH", 7),
+    ("Economics", "ECON", 7),
+    ("English", "ENG", 6),
+    ("Physics", "PHYS", 4),
+    ("History", "HIST", 4),
+    ("Chemistry", "CHEM", 4)
+]
+CLASS_YEARS = [("Freshman", 30), ("Sophomore", 26), ("Junior", 23), ("Senior", 21)]
+
+TOPICS = ["Foundations", "Methods", "Theory", "Systems", "Analysis", "Design", "Seminar", "Lab"]
+SCHEDULE_SLOTS = [
+    "MWF 8:00-8:50", "MWF 9:00-9:50", "MWF 10:00-10:50", "MWF 11:00-11:50",
+    "MWF 1:00-1:50", "MWF 2:00-2:50", "TTh 8:00-9:15", "TTh 9:30-10:45",
+    "TTh 11:00-12:15", "TTh 2:00-3:15", "TTh 3:30-4:45", "MW 4:00-5:15"
+]
+BUILDINGS = ["Science Hall", "Humanities Building", "Engineering Center", "Library Annex", "Main Hall"]
+
+# (type, max points, weight, difficulty offset)
+ASSIGNMENT_TYPES = [
+    ("Homework", 50.0, 50, 0.03),
+    ("Quiz", 20.0, 25, 0.0),
+    ("Project", 200.0, 15, -0.02),
+    ("Exam", 100.0, 10, -0.06)
+]
+NOTE_TAGS = ["lecture", "review", "exam", "lab", "reading", "todo", "important"]
+
+# Course popularity falls off as 1 / rank ** POPULARITY_SKEW
+POPULARITY_SKEW = 1.1
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def _weighted(rng, options):
+    return rng.choices([o[0] for o in options], weights=[o[-1] for o in options])[0]
+
+
+def recent_terms(as_of, count):
+    """The count most recent Spring/Fall terms up to as_of, oldest first"""
+    semester, year = ("Spring", as_of.year) if as_of.month < 7 else ("Fall", as_of.year)
+    terms = []
+    for _ in range(count):
+        terms.append((semester, year))
+        semester, year = ("Spring", year) if semester == "Fall" else ("Fall", year - 1)
+    return terms[::-1]
+
+
+def next_ids(db: Session):
+    """First free id per generated table, so new rows never collide"""
+    return {
+        model: (db.query(func.max(model.id)).scalar() or 0) + 1
+        for model in (Student, Course, Assignment, Enrollment, Grade, Note, Event)
+    }
+
+
+def build_dataset(students, courses, courses_per_student=5, assignments_per_course=8,
+                  graded_fraction=0.9, notes_per_student=3, terms=2, seed=42,
+                  as_of=None, start_ids=None):
+    """Build plain row dicts for a reproducible dataset.
+
+    as_of defaults to today, so pass it to get the same rows on another day.
+    Returns [(Model, rows)] in foreign-key order, ready for bulk_insert.
+    """
+    rng = random.Random(seed)
+    as_of = as_of or datetime.combine(date.today(), datetime.min.time())
+    start_ids = start_ids or {}
+    term_list = recent_terms(as_of, max(1, terms))
+    current_term = term_list[-1]
+
+    def first_id(model):
+        return start_ids.get(model, 1)
+
+    # Students
+    student_rows = []
+    ability = {}
+    for n in range(students):
+        pk = first_id(Student) + n
+        major = _weighted(rng, MAJORS)
+        ability[pk] = _clamp(rng.gauss(0.82, 0.08), 0.45, 0.99)
+        gpa = GRADE_POINTS[letter_for(ability[pk] * 100)] + rng.uniform(-0.2, 0.2)
+        student_rows.append({
+            "id": pk,
+            "student_id": f"STU{pk:06d}",
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "email": f"student{pk}@college.edu",
+            "major": major,
+            "year": _weighted(rng, CLASS_YEARS),
+            "gpa": round(_clamp(gpa, 0.0, 4.0), 2),
+            "created_at": as_of - timedelta(days=rng.randint(30, 1400))
+        })
+
+    # Courses, spread over the terms and ranked by popularity; each
+    # professor teaches about three sections
+    name_pairs = [(first, last) for last in LAST_NAMES for first in FIRST_NAMES]
+    professors = [
+        f"Dr. {name_pairs[i % len(name_pairs)][0]} {name_pairs[i % len(name_pairs)][1]}"
+        + (f" {i // len(name_pairs) + 1}" if i >= len(name_pairs) else "")
+        for i in range(max(1, courses // 3))
+    ]
+    rng.shuffle(professors)
+    course_rows = []
+    for n in range(courses):
+        pk = first_id(Course) + n
+        major, prefix, _ = rng.choices(MAJORS, weights=[m[2] for m in MAJORS])[0]
+        level = rng.choice([100, 100, 200, 200, 300, 400])
+        semester, year = term_list[n % len(term_list)]
+        course_rows.append({
+            "id": pk,
+            "course_code": f"{prefix}{level + pk % 100}-{pk}",
+            "name": f"{major} {rng.choice(TOPICS)} {level // 100}",
+            "description": f"Level {level} course in {major.lower()}",
+            "credits": _weighted(rng, [(3, 70), (4, 25), (1, 5)]),
+            "professor": rng.choice(professors),
+            "semester": semester,
+            "year": year,
+            "schedule": rng.choice(SCHEDULE_SLOTS),
+            "location": f"{rng.choice(BUILDINGS)} Room {rng.randint(100, 450)}"
+        })
+    course_ids = [c["id"] for c in course_rows]
+    popularity = [1 / (rank + 1) ** POPULARITY_SKEW for rank in range(len(course_ids))]
+    rng.shuffle(popularity)
+
+    # Assignments, due dates spread through each course's term
+    assignment_rows = []
+    assignments_by_course = {}
+    for course in course_rows:
+        dates = term_dates(course["semester"], course["year"])
+        start, end = (datetime.combine(d, datetime.min.time()) for d in dates)
+        span = (end - start) / (assignments_per_course + 1)
+        for n in range(assignments_per_course):
+            kind, max_points, _, difficulty = rng.choices(
+                ASSIGNMENT_TYPES, weights=[t[2] for t in ASSIGNMENT_TYPES]
+            )[0]
+            due = start + span * (n + 1) + timedelta(hours=23, minutes=59)
+            assignment_rows.append({
+                "id": first_id(Assignment) + len(assignment_rows),
+                "course_id": course["id"],
+                "title": f"{kind} {n + 1}",
+                "description": None,
+                "type": kind,
+                "due_date": due,
+                "max_points": max_points,
+                "created_at": start
+            })
+            assignments_by_course.setdefault(course["id"], []).append(
+                (assignment_rows[-1]["id"], due, max_points, difficulty)
+            )
+    course_term = {c["id"]: (c["semester"], c["year"]) for c in course_rows}
+    course_code = {c["id"]: c["course_code"] for c in course_rows}
+
+    # Enrollments and grades
+    enrollment_rows = []
+    grade_rows = []
+    courses_of = {}
+    for student in student_rows:
+        pk = student["id"]
+        wanted = _clamp(round(rng.gauss(courses_per_student, 1.0)), 1, len(course_ids))
+        chosen = set()
+        while len(chosen) < wanted:
+            chosen.update(rng.choices(course_ids, weights=popularity, k=wanted - len(chosen)))
+        courses_of[pk] = sorted(chosen)
+        for course_id in courses_of[pk]:
+            current = course_term[course_id] == current_term
+            status = ("Dropped" if rng.random() < 0.04 else "Active") if current else "Completed"
+            enrollment_rows.append({
+                "id": first_id(Enrollment) + len(enrollment_rows),
+                "student_id": pk,
+                "course_id": course_id,
+                "enrolled_at": student["created_at"],
+                "status": status
+            })
+            if status == "Dropped":
+                continue
+            for assignment_id, due, max_points, difficulty in assignments_by_course.get(course_id, []):
+                graded_at = due + timedelta(days=rng.randint(1, 7))
+                if graded_at > as_of or rng.random() > graded_fraction:
+                    continue
+                score = _clamp(rng.gauss(ability[pk] + difficulty, 0.07), 0.0, 1.0)
+                earned = round(score * max_points, 1)
+                percentage = round(earned / max_points * 100, 2)
+                grade_rows.append({
+                    "id": first_id(Grade) + len(grade_rows),
+                    "student_id": pk,
+                    "assignment_id": assignment_id,
+                    "points_earned": earned,
+                    "points_possible": max_points,
+                    "percentage": percentage,
+                    "letter_grade": letter_for(percentage),
+                    "submitted_at": due - timedelta(minutes=rng.randint(5, 4 * 24 * 60)),
+                    "graded_at": graded_at
+                })
+
+    # Capacities leave room in most sections; a few are exactly full
+    active = {}
+    for enrollment in enrollment_rows:
+        if enrollment["status"] == "Active":
+            active[enrollment["course_id"]] = active.get(enrollment["course_id"], 0) + 1
+    for course in course_rows:
+        course["enrolled_count"] = active.get(course["id"], 0)
+        course["capacity"] = max(course["enrolled_count"], rng.choice([25, 30, 40, 60, 120, 200]))
+
+    # Notes, mostly about the student's own courses
+    note_rows = []
+    for student in student_rows:
+        pk = student["id"]
+        for n in range(rng.randint(0, 2 * notes_per_student)):
+            code = course_code[rng.choice(courses_of[pk])] if rng.random() < 0.8 else None
+            written = as_of - timedelta(minutes=rng.randint(0, 180 * 24 * 60))
+            note_rows.append({
+                "id": first_id(Note) + len(note_rows),
+                "student_id": pk,
+                "title": f"{code or 'General'} notes {n + 1}",
+                "content": " ".join(rng.choices(TOPICS + NOTE_TAGS, k=rng.randint(8, 60))),
+                "course_code": code,
+                "tags": ",".join(rng.sample(NOTE_TAGS, rng.randint(0, 3))),
+                "created_at": written,
+                "updated_at": written + timedelta(minutes=rng.choice([0, 0, 0, 30, 600]))
+            })
+
+    # Events: a midterm and final per course
+    event_rows = []
+    for course in course_rows:
+        dates = term_dates(course["semester"], course["year"])
+        for title, day in (("Midterm", dates[0] + (dates[1] - dates[0]) / 2), ("Final", dates[1])):
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.choice([9, 13, 16]))
+            event_rows.append({
+                "id": first_id(Event) + len(event_rows),
+                "title": f"{course['course_code']} {title} Exam",
+                "description": None,
+                "event_type": "Exam",
+                "start_time": start,
+                "end_time": start + timedelta(hours=2),
+                "location": course["location"],
+                "course_code": course["course_code"],
+                "created_at": as_of
+            })
+
+    return [
+        (Student, student_rows),
+        (Course, course_rows),
+        (Assignment, assignment_rows),
+        (Enrollment, enrollment_rows),
+        (Grade, grade_rows),
+        (Note, note_rows),
+        (Event, event_rows)
+    ]
+
+
+def generate(db: Session, students, courses, progress=None, **options):
+    """Add a synthetic dataset to the database; returns {table: rows}.
+
+    Sample data goes in first when the database is empty and is committed
+    by add_sample_data itself. The generated rows are committed together at
+    the end, so a failed run leaves none of them behind.
+    """
+    from database import add_sample_data
+
+    if db.query(Student).first() is None:
+        add_sample_data(db)
+
+    dataset = build_dataset(students, courses, start_ids=next_ids(db), **options)
+    counts = {}
+    for model, rows in dataset:
+        started = time.perf_counter()
+        counts[model.__tablename__] = bulk_insert(db, model, rows)
+        if progress:
+            progress(model.__tablename__, len(rows), time.perf_counter() - started)
+    db.commit()
+    return counts
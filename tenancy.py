@@ -0,0 +1,210 @@
+"""
+Multi-Tenancy for CollegeBuddy Application
+
+One deployment can serve many colleges. Each request names its tenant with
+an X-Tenant header or a subdomain of COLLEGEBUDDY_TENANT_DOMAIN, and gets a
+session on that tenant's own database:
+
+- if COLLEGEBUDDY_TENANT_URL contains "{tenant}", every tenant has its own
+  database, e.g. sqlite:///./tenants/{tenant}.db
+- otherwise it must be a PostgreSQL URL, and every tenant is a schema in
+  that database, selected per connection with search_path
+
+Tenant engines are opened lazily, migrated on first use and kept in a
+bounded LRU; engines idle for longer than TENANT_IDLE_SECONDS, or beyond
+TENANT_MAX_ENGINES, are disposed. Sessions carry info["tenant"] so caches
+and change notifications can be scoped per tenant.
+"""
+import glob
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from migrations import get_schema_version, head_version, migrate
+
+TENANT_URL_TEMPLATE = os.getenv("COLLEGEBUDDY_TENANT_URL", "")
+
+# Host suffix for subdomain routing, e.g. "collegebuddy.app"
+TENANT_DOMAIN = os.getenv("COLLEGEBUDDY_TENANT_DOMAIN", "").lower().lstrip(".")
+
+# Comma-separated tenants allowed to connect. When empty, a tenant is
+# known if its SQLite file exists; other backends need the list.
+TENANT_ALLOWLIST = {
+    t.strip().lower() for t in os.getenv("COLLEGEBUDDY_TENANTS", "").split(",") if t.strip()
+}
+
+TENANT_MAX_ENGINES = int(os.getenv("COLLEGEBUDDY_TENANT_ENGINES", "32"))
+TENANT_IDLE_SECONDS = float(os.getenv("COLLEGEBUDDY_TENANT_IDLE_SECONDS", "300"))
+
+# Small pools per tenant, since many tenant engines can be open at once
+TENANT_POOL_SIZE = int(os.getenv("COLLEGEBUDDY_TENANT_POOL_SIZE", "2"))
+TENANT_MAX_OVERFLOW = int(os.getenv("COLLEGEBUDDY_TENANT_MAX_OVERFLOW", "3"))
+
+TENANT_HEADER = b"x-tenant"
+_TENANT_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+class UnknownTenant(LookupError):
+    pass
+
+
+def tenant_from_scope(scope):
+    """Tenant named by an ASGI request's header or host, or None"""
+    host = None
+    for name, value in scope.get("headers", []):
+        if name == TENANT_HEADER and value:
+            return value.decode("latin-1").strip().lower()
+        if name == b"host":
+            host = value.decode("latin-1").split(":")[0].lower()
+    if TENANT_DOMAIN and host and host.endswith("." + TENANT_DOMAIN):
+        return host[:-len(TENANT_DOMAIN) - 1]
+    return None
+
+
+class _TenantEngine:
+    def __init__(self, engine, factory):
+        self.engine = engine
+        self.factory = factory
+        self.last_used = time.monotonic()
+        self.ready = False
+        self.lock = threading.Lock()
+
+
+class TenantRegistry:
+    """Bounded LRU of per-tenant engines and session factories"""
+
+    def __init__(self, url_template, engine_options, max_engines=TENANT_MAX_ENGINES,
+                 idle_seconds=TENANT_IDLE_SECONDS, allowlist=TENANT_ALLOWLIST):
+        self.url_template = url_template
+        self.per_database = "{tenant}" in url_template
+        self.engine_options = engine_options
+        self.max_engines = max_engines
+        self.idle_seconds = idle_seconds
+        self.allowlist = allowlist
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = defaultdict(lambda: {"sessions": 0, "queries": 0, "engine_opens": 0, "evictions": 0})
+
+    def url_for(self, tenant):
+        return self.url_template.format(tenant=tenant) if self.per_database else self.url_template
+
+    def known(self, tenant):
+        if not tenant or not _TENANT_RE.match(tenant):
+            return False
+        if self.allowlist:
+            return tenant in self.allowlist
+        url = make_url(self.url_for(tenant))
+        if self.per_database and url.get_backend_name() == "sqlite" and url.database:
+            return os.path.exists(url.database)
+        return False
+
+    def all_known(self):
+        """Every known tenant: the allowlist, or the SQLite tenant files on disk"""
+        if self.allowlist:
+            return sorted(self.allowlist)
+        if not self.per_database or make_url(self.url_for("x")).get_backend_name() != "sqlite":
+            return []
+        pattern = make_url(self.url_for("*")).database
+        if not pattern:
+            return []
+        prefix, suffix = pattern.split("*", 1)
+        names = (path[len(prefix):len(path) - len(suffix)] for path in glob.glob(pattern))
+        return sorted(name for name in names if self.known(name))
+
+    def _create_engine(self, tenant):
+        url = self.url_for(tenant)
+        options = self.engine_options(url)
+        if "pool_size" in options:
+            options = dict(options, pool_size=TENANT_POOL_SIZE, max_overflow=TENANT_MAX_OVERFLOW)
+        engine = create_engine(url, **options)
+        counters = self.metrics[tenant]
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            counters["queries"] += 1
+
+        if not self.per_database:
+            @event.listens_for(engine, "connect")
+            def set_search_path(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute(f'SET search_path TO "{tenant}"')
+                cursor.close()
+                dbapi_connection.commit()
+
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, info={"tenant": tenant})
+        counters["engine_opens"] += 1
+        return _TenantEngine(engine, factory)
+
+    def _evict(self, now):
+        """Pop idle and surplus engines; caller holds the lock"""
+        evicted = []
+        for tenant, entry in list(self._engines.items()):
+            if now - entry.last_used > self.idle_seconds:
+                evicted.append((tenant, self._engines.pop(tenant)))
+        while len(self._engines) > self.max_engines:
+            evicted.append(self._engines.popitem(last=False))
+        return evicted
+
+    def get(self, tenant, create=False):
+        """Engine entry for a tenant, opening and migrating it on first use.
+
+        Raises UnknownTenant unless the tenant is known or create is set.
+        """
+        if not (create and tenant and _TENANT_RE.match(tenant)) and not self.known(tenant):
+            raise UnknownTenant(tenant)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._engines.pop(tenant, None) or self._create_engine(tenant)
+            entry.last_used = now
+            self._engines[tenant] = entry
+            evicted = self._evict(now)
+        for name, old in evicted:
+            self.metrics[name]["evictions"] += 1
+            # Checked-out connections stay usable and close when returned
+            old.engine.dispose()
+
+        if not entry.ready:
+            with entry.lock:
+                if not entry.ready:
+                    self._provision(tenant, entry.engine)
+                    entry.ready = True
+        return entry
+
+    def _provision(self, tenant, engine):
+        if not self.per_database:
+            with engine.begin() as conn:
+                conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{tenant}"'))
+        if get_schema_version(engine) != head_version():
+            migrate(engine)
+
+    def session(self, tenant):
+        entry = self.get(tenant)
+        self.metrics[tenant]["sessions"] += 1
+        return entry.factory()
+
+    def dispose_all(self):
+        with self._lock:
+            entries = list(self._engines.values())
+            self._engines.clear()
+        for entry in entries:
+            entry.engine.dispose()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = {t: round(now - e.last_used, 1) for t, e in self._engines.items()}
+        return {
+            "open_engines": len(idle),
+            "max_engines": self.max_engines,
+            "tenants": {
+                tenant: dict(counters, open=tenant in idle, idle_seconds=idle.get(tenant))
+                for tenant, counters in self.metrics.items()
+            }
+        }
@@ -0,0 +1,77 @@
+"""
+Test Fixtures for CollegeBuddy Application
+
+The app's modules read their configuration when imported, so the
+environment is set up here first: a throwaway SQLite database (unless
+DATABASE_URL already points at PostgreSQL), no background scheduler, and
+audit logs, attachments and reminders under a temporary directory.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+TMP_DIR = tempfile.mkdtemp(prefix="collegebuddy-tests-")
+
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/collegebuddy.db"
+os.environ["COLLEGEBUDDY_SCHEDULER"] = "0"
+os.environ["COLLEGEBUDDY_RATE_LIMIT"] = "100000"
+os.environ["COLLEGEBUDDY_RATE_BURST"] = "100000"
+os.environ["COLLEGEBUDDY_AUDIT_DIR"] = os.path.join(TMP_DIR, "audit")
+os.environ["COLLEGEBUDDY_ATTACHMENT_DIR"] = os.path.join(TMP_DIR, "attachments")
+os.environ["COLLEGEBUDDY_REMINDER_SENDER"] = "file:" + os.path.join(TMP_DIR, "reminders.ndjson")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, init_db  # noqa: E402
+from models import Student, Course  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    init_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def unique():
+    """Short random prefix so rows made by one test never collide with another's"""
+    return uuid.uuid4().hex[:8].upper()
+
+
+@pytest.fixture
+def make_course(db, unique):
+    def make(capacity=None, **fields):
+        course = Course(course_code=f"T{unique}{make.count}", name="Test Course",
+                        capacity=capacity, enrolled_count=0, **fields)
+        make.count += 1
+        db.add(course)
+        db.commit()
+        return course
+    make.count = 0
+    return make
+
+
+@pytest.fixture
+def make_students(db, unique):
+    def make(n):
+        students = [
+            Student(student_id=f"S{unique}{i:05d}", name=f"Test Student {i}",
+                    email=f"s{unique.lower()}{i}@example.edu")
+            for i in range(n)
+        ]
+        db.add_all(students)
+        db.commit()
+        return students
+    return make
@@ -0,0 +1,54 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from archive import TermNotFinished, archive_term, grade_history
+from models import ArchivedEnrollment, Assignment, Course, Enrollment, Grade
+from registration import ACTIVE, COMPLETED, DROPPED, WAITLISTED, enroll
+
+
+@pytest.fixture
+def make_term(db, make_course, make_students):
+    """A one-seat Spring course in a year, with one active, graded student and one waitlisted"""
+    def make(year):
+        course = make_course(capacity=1, semester="Spring", year=year)
+        active, waiting = make_students(2)
+        enroll(db, active.id, course.id)
+        enroll(db, waiting.id, course.id)
+        assignment = Assignment(course_id=course.id, title="Final", max_points=100)
+        db.add(assignment)
+        db.flush()
+        db.add(Grade(student_id=active.id, assignment_id=assignment.id, points_earned=88,
+                     points_possible=100, percentage=88, letter_grade="B+"))
+        db.commit()
+        return course, active, waiting
+    return make
+
+
+def test_term_that_has_not_ended_is_refused(db, make_term):
+    course, _, _ = make_term(2001)
+    with pytest.raises(TermNotFinished):
+        archive_term(db, "Spring", 2001, today=date(2001, 4, 1))
+    assert db.query(Enrollment).filter(Enrollment.course_id == course.id).count() == 2
+
+
+def test_ended_term_is_closed_and_archived(db, make_term):
+    course, active, waiting = make_term(2002)
+
+    moved = archive_term(db, "Spring", 2002, today=date(2002, 6, 1))
+
+    assert moved == {"grades": 1, "enrollments": 2, "assignments": 1}
+    assert db.query(Enrollment).filter(Enrollment.course_id == course.id).count() == 0
+    statuses = dict(
+        db.query(ArchivedEnrollment.student_id, ArchivedEnrollment.status)
+        .filter(ArchivedEnrollment.course_id == course.id)
+    )
+    assert statuses == {active.id: COMPLETED, waiting.id: DROPPED}
+    assert ACTIVE not in statuses.values() and WAITLISTED not in statuses.values()
+    db.expire_all()
+    assert db.get(Course, course.id).enrolled_count == 0
+
+    history = grade_history([active.id])
+    rows = db.execute(select(history.c.course_code, history.c.letter_grade, history.c.archived)).all()
+    assert [tuple(r) for r in rows] == [(course.course_code, "B+", True)]
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from attachments import parse_range
+from models import Note
+
+CONTENT = os.urandom(3000)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def attachment(client, db, make_students):
+    student, = make_students(1)
+    note = Note(student_id=student.id, title="Slides", content="")
+    db.add(note)
+    db.commit()
+    response = client.post(f"/api/notes/{note.id}/attachments",
+                           files={"file": ("slides.bin", CONTENT, "application/octet-stream")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+
+def test_full_download(client, attachment):
+    response = client.get(attachment["url"])
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == f'"{attachment["sha256"]}"'
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_range_requests(client, attachment):
+    response = client.get(attachment["url"], headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+    assert response.content == CONTENT[100:200]
+
+    response = client.get(attachment["url"], headers={"Range": "bytes=-50"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-50:]
+
+    response = client.get(attachment["url"], headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range_with_old_etag_sends_everything(client, attachment):
+    response = client.get(attachment["url"], headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_none_match_gives_304(client, attachment):
+    etag = client.get(attachment["url"]).headers["etag"]
+    response = client.get(attachment["url"], headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert client.get(attachment["url"], headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_same_file_is_stored_once(client, attachment):
+    note_id = attachment["note_id"]
+    again = client.post(f"/api/notes/{note_id}/attachments",
+                        files={"file": ("copy.bin", CONTENT, "application/octet-stream")}).json()
+    assert again["id"] != attachment["id"]
+    assert again["sha256"] == attachment["sha256"]
+    assert client.get(again["url"]).content == CONTENT
@@ -0,0 +1,29 @@
+import hashlib
+
+import pytest
+from starlette.requests import Request
+
+import ratelimit
+from audit import request_actor
+
+
+def request(api_key=None):
+    headers = [(b"x-api-key", api_key.encode())] if api_key else []
+    return Request({"type": "http", "method": "POST", "path": "/api/notes", "query_string": b"",
+                    "headers": headers, "client": ("203.0.113.7", 50000)})
+
+
+@pytest.fixture
+def api_keys(monkeypatch):
+    monkeypatch.setattr(ratelimit, "API_KEYS", {"registrar-key"})
+
+
+def test_configured_key_is_recorded_as_its_hash(api_keys):
+    actor, where = request_actor(request("registrar-key"))
+    assert actor == "key:" + hashlib.sha256(b"registrar-key").hexdigest()[:12]
+    assert where == "POST /api/notes"
+
+
+@pytest.mark.parametrize("api_key", [None, "made-up-key"])
+def test_other_callers_are_recorded_by_address(api_keys, api_key):
+    assert request_actor(request(api_key))[0] == "ip:203.0.113.7"
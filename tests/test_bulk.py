@@ -0,0 +1,59 @@
+import pytest
+
+from bulk import bulk_insert, can_copy, stream_query, streaming_session
+from database import engine, is_postgres
+from models import Room
+
+postgres = pytest.mark.skipif(not is_postgres(engine), reason="needs DATABASE_URL pointing at PostgreSQL")
+
+
+def rooms(unique, n, start_id=None):
+    rows = [{"name": f"R{unique}{i}", "building": None if i % 2 else "Main", "capacity": i} for i in range(n)]
+    if start_id is not None:
+        for i, row in enumerate(rows):
+            row["id"] = start_id + i
+    return rows
+
+
+def test_bulk_insert_and_stream(db, unique):
+    assert bulk_insert(db, Room, rooms(unique, 250), chunk_size=100) == 250
+    db.commit()
+
+    query = db.query(Room).filter(Room.name.like(f"R{unique}%"))
+    streamed = list(stream_query(query, chunk_size=50))
+    assert len(streamed) == 250
+    assert sum(r.building is None for r in streamed) == 125
+
+
+def test_streaming_session_outlives_request_session(db, unique):
+    bulk_insert(db, Room, rooms(unique, 3))
+    db.commit()
+    query = stream_query(db.query(Room).filter(Room.name.like(f"R{unique}%")))
+    session = streaming_session(db)
+    db.close()
+    try:
+        assert len(list(query.with_session(session))) == 3
+    finally:
+        session.close()
+
+
+@postgres
+def test_copy_keeps_nulls_and_advances_the_id_sequence(db, unique):
+    assert can_copy(db.get_bind()), "COPY needs the psycopg2 driver"
+    top = db.query(Room.id).order_by(Room.id.desc()).limit(1).scalar() or 0
+    bulk_insert(db, Room, rooms(unique, 100, start_id=top + 1))
+    db.commit()
+
+    assert db.query(Room).filter(Room.name.like(f"R{unique}%"), Room.building.is_(None)).count() == 50
+    later = Room(name=f"R{unique}later")
+    db.add(later)
+    db.commit()
+    assert later.id > top + 100
+
+
+@postgres
+def test_server_side_cursor_streams_in_chunks(db, unique):
+    bulk_insert(db, Room, rooms(unique, 1200))
+    db.commit()
+    query = stream_query(db.query(Room).filter(Room.name.like(f"R{unique}%")), chunk_size=100)
+    assert sum(1 for _ in query) == 1200
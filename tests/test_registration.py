@@ -0,0 +1,71 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+
+from database import SessionLocal
+from models import Course, Enrollment
+from registration import enroll, drop, ACTIVE, WAITLISTED, DROPPED
+
+
+def statuses(db, course_id):
+    return dict(
+        db.query(Enrollment.status, func.count(Enrollment.id))
+        .filter(Enrollment.course_id == course_id)
+        .group_by(Enrollment.status)
+    )
+
+
+def test_full_course_waitlists_and_drop_promotes(db, make_course, make_students):
+    course = make_course(capacity=1)
+    first, second, third = make_students(3)
+
+    assert enroll(db, first.id, course.id).status == ACTIVE
+    waiting = enroll(db, second.id, course.id)
+    assert waiting.status == WAITLISTED
+    assert enroll(db, third.id, course.id).status == WAITLISTED
+
+    promoted = drop(db, enroll(db, first.id, course.id))
+    assert promoted == [waiting.id]
+    assert statuses(db, course.id) == {ACTIVE: 1, WAITLISTED: 1, DROPPED: 1}
+
+
+def test_enroll_is_idempotent(db, make_course, make_students):
+    course = make_course(capacity=5)
+    student, = make_students(1)
+
+    once = enroll(db, student.id, course.id)
+    twice = enroll(db, student.id, course.id)
+    assert once.id == twice.id
+    db.refresh(course)
+    assert course.enrolled_count == 1
+
+
+def test_concurrent_enroll_and_drop_never_over_enrolls(db, make_course, make_students):
+    capacity = 10
+    course = make_course(capacity=capacity)
+    course_id = course.id
+    student_ids = [s.id for s in make_students(120)]
+
+    def register(student_id):
+        rng = random.Random(student_id)
+        session = SessionLocal()
+        try:
+            enrollment = enroll(session, student_id, course_id)
+            if rng.random() < 0.3:
+                drop(session, enrollment)
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(register, student_ids))
+
+    db.expire_all()
+    counts = statuses(db, course_id)
+    active, waitlisted = counts.get(ACTIVE, 0), counts.get(WAITLISTED, 0)
+    enrolled_count = db.query(Course.enrolled_count).filter(Course.id == course_id).scalar()
+
+    assert sum(counts.values()) == len(student_ids)
+    assert active <= capacity
+    assert enrolled_count == active
+    assert not (waitlisted and active < capacity), f"{waitlisted} waiting beside {capacity - active} free seats"
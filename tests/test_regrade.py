@@ -0,0 +1,54 @@
+import pytest
+
+from grading import letter_for
+from models import Assignment, Grade, GradingScale
+from regrade import regrade_course
+
+
+@pytest.fixture
+def graded_course(db, make_course, make_students):
+    course = make_course()
+    assignment = Assignment(course_id=course.id, title="Midterm", type="Exam", max_points=100)
+    db.add(assignment)
+    db.flush()
+    for student, points in zip(make_students(4), [95, 85, 79, 58.5]):
+        db.add(Grade(student_id=student.id, assignment_id=assignment.id, points_earned=points,
+                     points_possible=100, percentage=points, letter_grade=letter_for(points)))
+    db.commit()
+    return course
+
+
+def stored_grades(db, course):
+    db.expire_all()
+    return sorted(
+        (g.percentage, g.letter_grade)
+        for g in db.query(Grade).join(Assignment).filter(Assignment.course_id == course.id)
+    )
+
+
+def test_dry_run_reports_without_writing(db, graded_course):
+    before = stored_grades(db, graded_course)
+
+    report = regrade_course(db, graded_course, curve=3, dry_run=True)
+
+    assert report["dry_run"] is True
+    assert report["changed"] == 4
+    assert report["letters_before"] == {"A": 1, "B": 1, "C+": 1, "F": 1}
+    assert report["letters_after"] == {"A": 1, "B+": 1, "B-": 1, "D": 1}
+    assert len(report["changes"]) == 4
+    assert stored_grades(db, graded_course) == before
+    assert db.query(GradingScale).filter(GradingScale.course_id == graded_course.id).count() == 0
+
+
+def test_commit_writes_what_the_dry_run_reported(db, graded_course):
+    preview = regrade_course(db, graded_course, curve=3, dry_run=True)
+    report = regrade_course(db, graded_course, curve=3)
+
+    assert report["changed"] == preview["changed"]
+    assert report["letters_after"] == preview["letters_after"]
+    assert stored_grades(db, graded_course) == [(61.5, "D"), (82.0, "B-"), (88.0, "B+"), (98.0, "A")]
+    scale = db.query(GradingScale).filter(GradingScale.course_id == graded_course.id).one()
+    assert scale.curve == 3
+
+    # Running it again finds nothing left to change
+    assert regrade_course(db, graded_course, curve=3, dry_run=True)["changed"] == 0
@@ -0,0 +1,56 @@
+import json
+from datetime import datetime, timedelta
+
+from models import Assignment, Enrollment, Event, Grade, ReminderSent
+from registration import ACTIVE, DROPPED
+from reminders import FileSender, send_reminders
+
+# Far from any other test's rows, so the reminder window only sees this test's data
+NOW = datetime(2040, 3, 2, 9, 0)
+
+
+def test_reminders_are_sent_once_to_active_ungraded_students(db, tmp_path, make_course, make_students):
+    course = make_course()
+    waiting, graded, dropped = make_students(3)
+    db.add_all([
+        Enrollment(student_id=waiting.id, course_id=course.id, status=ACTIVE),
+        Enrollment(student_id=graded.id, course_id=course.id, status=ACTIVE),
+        Enrollment(student_id=dropped.id, course_id=course.id, status=DROPPED)
+    ])
+    soon = Assignment(course_id=course.id, title="Problem set", due_date=NOW + timedelta(hours=2), max_points=10)
+    later = Assignment(course_id=course.id, title="Essay", due_date=NOW + timedelta(hours=30), max_points=10)
+    exam = Event(title="Exam", course_code=course.course_code, event_type="Exam",
+                 start_time=NOW + timedelta(hours=5), end_time=NOW + timedelta(hours=7))
+    db.add_all([soon, later, exam])
+    db.flush()
+    db.add(Grade(student_id=graded.id, assignment_id=soon.id, points_earned=9, points_possible=10))
+    db.commit()
+
+    outbox = tmp_path / "reminders.ndjson"
+    counts = send_reminders(db, sender=FileSender(str(outbox)), now=NOW, hours=24)
+    assert counts == {"due": 3, "sent": 3, "failed": 0, "skipped": 0}
+
+    messages = [json.loads(line) for line in outbox.read_text().splitlines()]
+    assert sorted((m["to"], m["kind"]) for m in messages) == sorted([
+        (waiting.email, "assignment"), (waiting.email, "event"), (graded.email, "event")
+    ])
+
+    # Recorded, with sent_at in UTC like the other bookkeeping columns
+    sent = db.query(ReminderSent).filter(ReminderSent.student_id.in_([waiting.id, graded.id])).all()
+    assert len(sent) == 3
+    assert all(abs(r.sent_at - datetime.utcnow()) < timedelta(minutes=1) for r in sent)
+
+    assert send_reminders(db, sender=FileSender(str(outbox)), now=NOW, hours=24)["due"] == 0
+
+
+def test_dry_run_sends_nothing(db, tmp_path, make_course, make_students):
+    course = make_course()
+    student, = make_students(1)
+    db.add(Enrollment(student_id=student.id, course_id=course.id, status=ACTIVE))
+    db.add(Assignment(course_id=course.id, title="Quiz", due_date=NOW + timedelta(days=400, hours=1), max_points=5))
+    db.commit()
+
+    outbox = tmp_path / "reminders.ndjson"
+    counts = send_reminders(db, sender=FileSender(str(outbox)), now=NOW + timedelta(days=400), dry_run=True)
+    assert counts["due"] == 1 and counts["sent"] == 0
+    assert not outbox.exists()
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from models import Note, NoteRevision
+from revisions import (
+    SNAPSHOT, SNAPSHOT_EVERY, StaleRevision, edit_note, get_revision, list_revisions, record_initial,
+    revision_diff
+)
+
+
+@pytest.fixture
+def student(make_students):
+    return make_students(1)[0]
+
+
+def new_note(db, student, content):
+    note = Note(student_id=student.id, title="Lecture notes", content=content)
+    db.add(note)
+    db.flush()
+    record_initial(db, note)
+    db.commit()
+    return note
+
+
+def edits(text, count, seed):
+    """count successive small edits of text: a changed line, an insert or a delete"""
+    rng = random.Random(seed)
+    lines = text.split("\n")
+    for i in range(count):
+        at = rng.randrange(len(lines))
+        choice = rng.random()
+        if choice < 0.5:
+            lines[at] = f"{lines[at]} (edit {i})"
+        elif choice < 0.8 or len(lines) < 5:
+            lines.insert(at, f"inserted line {i}")
+        else:
+            del lines[at]
+        yield "\n".join(lines)
+
+
+@pytest.mark.parametrize("lines", [40, 3], ids=["line-diffs", "word-diffs"])
+def test_every_revision_reconstructs_across_snapshots(db, student, lines):
+    original = "\n".join(f"line {i}: some words about the topic" for i in range(lines))
+    note = new_note(db, student, original)
+    expected = {1: original}
+    for text in edits(original, SNAPSHOT_EVERY * 2 + 5, seed=lines):
+        expected[edit_note(db, note, {"content": text})] = text
+
+    assert note.revision == max(expected)
+    for revision, text in expected.items():
+        row, content = get_revision(db, note.id, revision)
+        assert content == text, f"revision {revision}"
+        assert row.size == len(text)
+
+    kinds = dict(db.query(NoteRevision.revision, NoteRevision.kind).filter(NoteRevision.note_id == note.id))
+    snapshots = {r for r, kind in kinds.items() if kind == SNAPSHOT}
+    assert {1, SNAPSHOT_EVERY + 1, 2 * SNAPSHOT_EVERY + 1} <= snapshots
+    assert len(snapshots) < len(kinds)
+    assert get_revision(db, note.id, max(expected) + 1) is None
+
+
+def test_note_older_than_revisions_keeps_its_original_text(db, student):
+    note = Note(student_id=student.id, title="Old note", content="written before history")
+    db.add(note)
+    db.commit()
+
+    assert edit_note(db, note, {"content": "written before history, then edited"}) == 2
+    assert get_revision(db, note.id, 1)[1] == "written before history"
+    assert "+written before history, then edited" in revision_diff(db, note.id, 2)
+    assert [r["revision"] for r in list_revisions(db, note.id)] == [2, 1]
+
+
+def test_edit_based_on_old_revision_is_refused(db, student):
+    note = new_note(db, student, "first")
+    edit_note(db, note, {"content": "second"}, base_revision=1)
+
+    with pytest.raises(StaleRevision):
+        edit_note(db, note, {"content": "conflicting"}, base_revision=1)
+    db.refresh(note)
+    assert note.content == "second" and note.revision == 2
@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import SessionLocal
+from models import ScheduledJob
+from scheduler import Job, Scheduler, retry_delay
+
+
+def make_scheduler(owner, jobs):
+    scheduler = Scheduler(SessionLocal, jobs=jobs, workers=2, lease_seconds=60, owner=owner)
+    scheduler._sync_jobs()
+    scheduler._pool = ThreadPoolExecutor(max_workers=scheduler.workers)
+    return scheduler
+
+
+def job_row(db, name):
+    db.expire_all()
+    return db.query(ScheduledJob).filter(ScheduledJob.name == name).one()
+
+
+@pytest.fixture
+def blocking_job(unique):
+    release = threading.Event()
+    runs = []
+
+    def run(db):
+        runs.append(db.info["actor"])
+        release.wait(10)
+
+    name = f"test_{unique}"
+    yield {name: Job(name, run, 300.0, False, 3, 0.0)}, release, runs
+    release.set()
+
+
+def test_lease_keeps_a_shared_job_on_one_worker(db, blocking_job):
+    jobs, release, runs = blocking_job
+    name, = jobs
+    first, second = make_scheduler("worker-a", jobs), make_scheduler("worker-b", jobs)
+
+    first.tick()
+    second.tick()
+    row = job_row(db, name)
+    assert row.lease_owner == "worker-a"
+    assert row.lease_expires_at > datetime.utcnow()
+
+    release.set()
+    first._pool.shutdown(wait=True)
+    second._pool.shutdown(wait=True)
+    assert runs == [f"job:{name}"]
+
+    row = job_row(db, name)
+    assert (row.lease_owner, row.runs, row.last_status) == (None, 1, "ok")
+    assert row.next_run_at > datetime.utcnow() + timedelta(seconds=250)
+
+
+def test_expired_lease_is_taken_over(db, blocking_job):
+    jobs, release, runs = blocking_job
+    name, = jobs
+    scheduler = make_scheduler("worker-b", jobs)
+    row = job_row(db, name)
+    row.lease_owner = "crashed-worker"
+    row.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    release.set()
+    scheduler.tick()
+    scheduler._pool.shutdown(wait=True)
+    assert runs == [f"job:{name}"]
+    assert job_row(db, name).runs == 1
+
+
+def test_live_lease_of_another_worker_is_respected(db, blocking_job):
+    jobs, release, runs = blocking_job
+    name, = jobs
+    scheduler = make_scheduler("worker-b", jobs)
+    row = job_row(db, name)
+    row.lease_owner = "busy-worker"
+    row.lease_expires_at = datetime.utcnow() + timedelta(seconds=30)
+    db.commit()
+
+    scheduler.tick()
+    scheduler._pool.shutdown(wait=True)
+    assert runs == []
+    assert job_row(db, name).lease_owner == "busy-worker"
+
+
+def test_failed_job_is_retried_with_backoff(db, unique):
+    def fail(db):
+        raise RuntimeError("boom")
+
+    name = f"test_{unique}"
+    scheduler = make_scheduler("worker-a", {name: Job(name, fail, 3600.0, False, 3, 0.0)})
+    started = datetime.utcnow()
+    scheduler.tick()
+    scheduler._pool.shutdown(wait=True)
+
+    row = job_row(db, name)
+    assert (row.last_status, row.attempts, row.failures, row.lease_owner) == ("failed", 1, 1, None)
+    assert "RuntimeError: boom" in row.last_error
+    delay = timedelta(seconds=retry_delay(1, 3600.0))
+    assert started + delay <= row.next_run_at <= datetime.utcnow() + delay
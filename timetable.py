@@ -0,0 +1,341 @@
+"""
+Timetabling for CollegeBuddy Application
+
+Assigns every course of a term a time slot (Course.schedule) and a room
+(Course.location). Hard constraints are that a room holds one section at a
+time and fits the section's demand (the larger of its capacity and its
+enrollment), and that a professor teaches one section at a time. Softly,
+students enrolled in two sections should not find them clashing, rooms
+should not be much bigger than needed, and existing assignments should
+only move when that helps.
+
+A randomized greedy pass builds a first timetable, then simulated
+annealing moves single sections around using incremental cost updates.
+Independent restarts run in a process pool and the cheapest timetable
+wins. Slots are written in the format calendar_feed.parse_schedule reads.
+
+    python manage.py timetable --semester Fall --year 2026 --workers 8
+"""
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from calendar_feed import parse_schedule
+from models import Course, Enrollment, Room
+
+TIME_SLOTS = [
+    "MWF 8:00-8:50", "MWF 9:00-9:50", "MWF 10:00-10:50", "MWF 11:00-11:50",
+    "MWF 12:00-12:50", "MWF 1:00-1:50", "MWF 2:00-2:50", "MWF 3:00-3:50",
+    "TTh 8:00-9:15", "TTh 9:30-10:45", "TTh 11:00-12:15", "TTh 12:30-1:45",
+    "TTh 2:00-3:15", "TTh 3:30-4:45", "MW 4:00-5:15", "MW 5:30-6:45",
+    "TTh 5:00-6:15", "TTh 6:30-7:45 PM"
+]
+
+# Cost weights
+HARD_PENALTY = 100000.0    # room double-booked, professor clash, or room too small
+STUDENT_CLASH_COST = 10.0  # per student with two clashing sections
+EMPTY_SEAT_COST = 0.02     # per unused seat in the chosen room
+MOVE_COST = 1.0            # per section moved away from its current slot or room
+
+# Random room moves favour small rooms: index = fitting * random() ** ROOM_BIAS
+ROOM_BIAS = 3
+
+# Share of local search moves that try every slot for one section
+BEST_SLOT_MOVES = 0.2
+
+
+def slot_conflicts(slots):
+    """conflicts[p][q] is True when slots p and q meet at the same time"""
+    parsed = [parse_schedule(s) for s in slots]
+    for slot, meeting in zip(slots, parsed):
+        if meeting is None or meeting[1] >= meeting[2]:
+            raise ValueError(f"Unreadable time slot: {slot}")
+
+    def overlap(a, b):
+        return bool(set(a[0]) & set(b[0])) and a[1] < b[2] and b[1] < a[2]
+
+    return [[overlap(a, b) for b in parsed] for a in parsed]
+
+
+def load_problem(db: Session, semester, year, slots=TIME_SLOTS):
+    """Collect a term's sections, rooms and shared enrollments as plain data"""
+    courses = (
+        db.query(Course)
+        .filter(Course.semester == semester, Course.year == year)
+        .order_by(Course.id)
+        .all()
+    )
+    rooms = db.query(Room).order_by(Room.capacity, Room.name).all()
+    if not rooms:
+        raise ValueError("No rooms defined; add rooms or run with --derive-rooms")
+
+    index = {c.id: i for i, c in enumerate(courses)}
+    room_index = {r.name: i for i, r in enumerate(rooms)}
+    slot_index = {s: i for i, s in enumerate(slots)}
+    professors = {}
+
+    # Students shared by each pair of sections, counted in the database
+    a, b = aliased(Enrollment), aliased(Enrollment)
+    term_ids = select(Course.id).where(Course.semester == semester, Course.year == year)
+    pairs = db.execute(
+        select(a.course_id, b.course_id, func.count())
+        .join(b, (b.student_id == a.student_id) & (b.course_id > a.course_id))
+        .where(a.course_id.in_(term_ids), b.course_id.in_(term_ids),
+               a.status == "Active", b.status == "Active")
+        .group_by(a.course_id, b.course_id)
+    ).all()
+    shared = [{} for _ in courses]
+    for first, second, count in pairs:
+        shared[index[first]][index[second]] = count
+        shared[index[second]][index[first]] = count
+
+    return {
+        "course_ids": [c.id for c in courses],
+        "demand": [max(c.capacity or 0, c.enrolled_count or 0) for c in courses],
+        "professor": [professors.setdefault(c.professor, len(professors)) if c.professor else -1
+                      for c in courses],
+        "current": [(slot_index.get(c.schedule), room_index.get(c.location)) for c in courses],
+        "rooms": [(r.name, r.capacity or 0) for r in rooms],
+        "slots": list(slots),
+        "conflicts": slot_conflicts(slots),
+        "shared": shared
+    }
+
+
+class _Timetable:
+    """Mutable assignment with the indexes needed for cheap cost deltas"""
+
+    def __init__(self, problem):
+        self.p = problem
+        n = len(problem["demand"])
+        self.slot = [None] * n
+        self.room = [None] * n
+        self.occupancy = defaultdict(int)  # (room, slot) -> sections
+        self.by_professor = defaultdict(list)
+        for s, prof in enumerate(problem["professor"]):
+            if prof >= 0:
+                self.by_professor[prof].append(s)
+        self.clashing = [[q for q, clash in enumerate(row) if clash] for row in problem["conflicts"]]
+        capacities = [cap for _, cap in problem["rooms"]]
+        # Rooms are sorted by capacity, so earlier fitting rooms waste fewer seats.
+        # Sections with equal demand share one list.
+        fitting = {}
+        self.candidates = []
+        for demand in problem["demand"]:
+            if demand not in fitting:
+                fitting[demand] = [r for r, cap in enumerate(capacities) if cap >= demand] or [len(capacities) - 1]
+            self.candidates.append(fitting[demand])
+
+    def free_room(self, s, slot):
+        """Smallest fitting room not in use at any time clashing with slot"""
+        for room in self.candidates[s]:
+            if not any(self.occupancy.get((room, q)) for q in self.clashing[slot]):
+                return room
+        return self.candidates[s][0]
+
+    def random_room(self, s, rng):
+        rooms = self.candidates[s]
+        return rooms[int(len(rooms) * rng.random() ** ROOM_BIAS)]
+
+    def place(self, s, slot, room):
+        self.slot[s], self.room[s] = slot, room
+        self.occupancy[room, slot] += 1
+
+    def unplace(self, s):
+        self.occupancy[self.room[s], self.slot[s]] -= 1
+        self.slot[s] = self.room[s] = None
+
+    def cost(self, s, slot, room):
+        """Cost of section s at (slot, room) against everything else placed"""
+        p = self.p
+        clashes = p["conflicts"][slot]
+        demand, capacity = p["demand"][s], p["rooms"][room][1]
+
+        cost = 0.0
+        if capacity < demand:
+            cost += HARD_PENALTY + (demand - capacity)
+        else:
+            cost += EMPTY_SEAT_COST * (capacity - demand)
+        if p["current"][s] != (slot, room):
+            cost += MOVE_COST
+
+        for q in self.clashing[slot]:
+            cost += HARD_PENALTY * self.occupancy.get((room, q), 0)
+        prof = p["professor"][s]
+        if prof >= 0:
+            for t in self.by_professor[prof]:
+                if t != s and self.slot[t] is not None and clashes[self.slot[t]]:
+                    cost += HARD_PENALTY
+        for t, students in p["shared"][s].items():
+            if self.slot[t] is not None and clashes[self.slot[t]]:
+                cost += STUDENT_CLASH_COST * students
+        return cost
+
+    def total(self):
+        """Whole-timetable cost and its breakdown"""
+        p = self.p
+        summary = {"room_conflicts": 0, "professor_conflicts": 0, "oversized_sections": 0,
+                   "student_clashes": 0, "empty_seats": 0, "moved": 0}
+        for s in range(len(self.slot)):
+            slot, room = self.slot[s], self.room[s]
+            clashes = p["conflicts"][slot]
+            demand, capacity = p["demand"][s], p["rooms"][room][1]
+            summary["oversized_sections"] += capacity < demand
+            summary["empty_seats"] += max(0, capacity - demand)
+            summary["moved"] += p["current"][s] != (slot, room)
+            # Pairs are seen from both sides here and halved below; s clashes with itself once
+            summary["room_conflicts"] += sum(
+                self.occupancy.get((room, q), 0) for q, clash in enumerate(clashes) if clash
+            ) - 1
+            prof = p["professor"][s]
+            if prof >= 0:
+                summary["professor_conflicts"] += sum(
+                    1 for t in self.by_professor[prof] if t != s and clashes[self.slot[t]]
+                )
+            summary["student_clashes"] += sum(
+                n for t, n in p["shared"][s].items() if t > s and clashes[self.slot[t]]
+            )
+        summary["room_conflicts"] //= 2
+        summary["professor_conflicts"] //= 2
+        cost = (
+            HARD_PENALTY * (summary["room_conflicts"] + summary["professor_conflicts"]
+                            + summary["oversized_sections"])
+            + STUDENT_CLASH_COST * summary["student_clashes"]
+            + EMPTY_SEAT_COST * summary["empty_seats"]
+            + MOVE_COST * summary["moved"]
+        )
+        return cost, summary
+
+
+def _greedy(table, rng):
+    """Place hardest sections first: biggest demand, most shared students"""
+    p = table.p
+    order = sorted(
+        range(len(p["demand"])),
+        key=lambda s: (-p["demand"][s], -len(p["shared"][s]), rng.random())
+    )
+    slots = range(len(p["slots"]))
+    for s in order:
+        options = [(slot, table.free_room(s, slot)) for slot in slots]
+        current = p["current"][s]
+        if current[0] is not None and current[1] is not None:
+            options.append(current)
+        rng.shuffle(options)
+        slot, room = min(options, key=lambda o: table.cost(s, *o))
+        table.place(s, slot, room)
+
+
+def _anneal(table, rng, iterations, start_temperature=50.0, end_temperature=0.05):
+    n = len(table.slot)
+    slot_count = len(table.p["slots"])
+    if not n:
+        return
+    decay = (end_temperature / start_temperature) ** (1.0 / max(1, iterations))
+    temperature = start_temperature
+    for _ in range(iterations):
+        s = rng.randrange(n)
+        old = (table.slot[s], table.room[s])
+        temperature *= decay
+        table.unplace(s)
+        move = rng.random()
+        if move < BEST_SLOT_MOVES:
+            # Steepest descent for this section: its best time in a free room
+            new = min(((q, table.free_room(s, q)) for q in range(slot_count)),
+                      key=lambda o: table.cost(s, *o))
+        elif move < 0.6:
+            slot = rng.randrange(slot_count)
+            new = (slot, table.free_room(s, slot))
+        else:
+            new = (rng.randrange(slot_count), table.random_room(s, rng))
+        if new == old:
+            table.place(s, *old)
+            continue
+        delta = table.cost(s, *new) - table.cost(s, *old)
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            table.place(s, *new)
+        else:
+            table.place(s, *old)
+
+
+def solve(problem, seed=0, iterations=None):
+    """One greedy + annealing run; returns (cost, summary, [(slot, room)])"""
+    rng = random.Random(seed)
+    table = _Timetable(problem)
+    _greedy(table, rng)
+    _anneal(table, rng, iterations if iterations is not None else 100 * len(problem["demand"]))
+    cost, summary = table.total()
+    return cost, summary, list(zip(table.slot, table.room))
+
+
+def _solve_args(args):
+    return solve(*args)
+
+
+def optimize(problem, restarts=None, workers=None, iterations=None, seed=0):
+    """Best of several independent runs, spread over a process pool"""
+    workers = workers or os.cpu_count() or 1
+    restarts = restarts or workers
+    jobs = [(problem, seed + i, iterations) for i in range(restarts)]
+    if workers == 1 or restarts == 1:
+        results = [_solve_args(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, restarts)) as pool:
+            results = list(pool.map(_solve_args, jobs))
+    return min(results, key=lambda r: r[0])
+
+
+def derive_rooms(db: Session):
+    """Create Room rows from the distinct Course.location values.
+
+    Each room's capacity is the biggest demand of any course held there.
+    Returns the number of rooms added.
+    """
+    existing = {name for (name,) in db.query(Room.name)}
+    demand = defaultdict(int)
+    for location, capacity, enrolled in db.query(Course.location, Course.capacity, Course.enrolled_count):
+        if location:
+            demand[location] = max(demand[location], capacity or 0, enrolled or 0)
+    added = [Room(name=name, capacity=cap) for name, cap in demand.items() if name not in existing]
+    db.add_all(added)
+    db.commit()
+    return len(added)
+
+
+def timetable_term(db: Session, semester, year, restarts=None, workers=None,
+                   iterations=None, seed=0, dry_run=False):
+    """Optimize a term's timetable and write it to its Course rows.
+
+    Returns a report with the cost breakdown and how long solving took.
+    """
+    started = time.perf_counter()
+    problem = load_problem(db, semester, year)
+    if not problem["course_ids"]:
+        return {"sections": 0, "written": 0}
+    cost, summary, assignment = optimize(problem, restarts, workers, iterations, seed)
+
+    rows = [
+        {"b_id": course_id, "b_schedule": problem["slots"][slot], "b_location": problem["rooms"][room][0]}
+        for course_id, (slot, room) in zip(problem["course_ids"], assignment)
+    ]
+    if not dry_run:
+        db.execute(
+            update(Course.__table__)
+            .where(Course.__table__.c.id == bindparam("b_id"))
+            .values(schedule=bindparam("b_schedule"), location=bindparam("b_location")),
+            rows
+        )
+        db.commit()
+    return {
+        "sections": len(rows),
+        "rooms": len(problem["rooms"]),
+        "cost": round(cost, 2),
+        **summary,
+        "written": 0 if dry_run else len(rows),
+        "seconds": round(time.perf_counter() - started, 2)
+    }
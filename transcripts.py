@@ -0,0 +1,247 @@
+"""
+Transcript Generation for CollegeBuddy Application
+
+Final course grades are computed with one grouped query per batch of
+students over hot and archived grades. Rendering to CSV or PDF runs in a
+process pool, and each transcript is written straight to disk.
+"""
+import csv
+import io
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from archive import grade_history, term_key
+from grading import curved, letter_for, percentage_of, GRADE_POINTS
+from models import Student
+from regrade import scales_for
+
+TRANSCRIPT_BATCH_SIZE = 500
+FORMATS = ("csv", "pdf")
+
+
+def course_results(db: Session, student_ids):
+    """Final result per (student, course) for the given student primary keys"""
+    history = grade_history(student_ids)
+    rows = db.execute(
+        select(
+            history.c.student_id,
+            history.c.course_id,
+            history.c.course_code,
+            history.c.course_name,
+            history.c.semester,
+            history.c.year,
+            history.c.credits,
+            func.sum(history.c.points_earned).label("points_earned"),
+            func.sum(history.c.points_possible).label("points_possible")
+        ).group_by(
+            history.c.student_id,
+            history.c.course_id,
+            history.c.course_code,
+            history.c.course_name,
+            history.c.semester,
+            history.c.year,
+            history.c.credits
+        )
+    ).all()
+
+    scales = scales_for(db, {r.course_id for r in rows})
+    results = defaultdict(list)
+    for r in rows:
+        scale, curve, max_percentage = scales[r.course_id]
+        percentage = curved(percentage_of(r.points_earned, r.points_possible), curve, max_percentage)
+        results[r.student_id].append({
+            "course_code": r.course_code,
+            "course_name": r.course_name,
+            "semester": r.semester,
+            "year": r.year,
+            "credits": r.credits or 0,
+            "percentage": percentage,
+            "letter_grade": letter_for(percentage, scale)
+        })
+    return results
+
+
+def _gpa(courses):
+    graded = [c for c in courses if c["letter_grade"] in GRADE_POINTS and c["credits"]]
+    credits = sum(c["credits"] for c in graded)
+    if not credits:
+        return None
+    return round(sum(GRADE_POINTS[c["letter_grade"]] * c["credits"] for c in graded) / credits, 2)
+
+
+def build_transcript(student, courses):
+    """Assemble one transcript dict from a student and their course results"""
+    courses = sorted(courses, key=lambda c: (term_key(c["semester"], c["year"]), c["course_code"]))
+    return {
+        "student_id": student.student_id,
+        "name": student.name,
+        "major": student.major,
+        "year": student.year,
+        "courses": courses,
+        "credits_attempted": sum(c["credits"] for c in courses),
+        "gpa": _gpa(courses)
+    }
+
+
+def transcripts_for(db: Session, students):
+    """Transcripts for a list of Student rows, using one results query"""
+    results = course_results(db, [s.id for s in students])
+    return [build_transcript(s, results.get(s.id, [])) for s in students]
+
+
+def render_csv(transcript):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["student_id", "name", "major", "semester", "year",
+                     "course_code", "course_name", "credits", "percentage", "letter_grade"])
+    for c in transcript["courses"]:
+        writer.writerow([
+            transcript["student_id"], transcript["name"], transcript["major"],
+            c["semester"], c["year"], c["course_code"], c["course_name"],
+            c["credits"], c["percentage"], c["letter_grade"]
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+def _transcript_lines(transcript):
+    lines = [
+        "CollegeBuddy Official Transcript",
+        "",
+        f"Student: {transcript['name']} ({transcript['student_id']})",
+        f"Major: {transcript['major'] or '-'}    Year: {transcript['year'] or '-'}",
+        ""
+    ]
+    current_term = None
+    for c in transcript["courses"]:
+        term = f"{c['semester']} {c['year']}"
+        if term != current_term:
+            lines += ["", term]
+            current_term = term
+        percentage = "-" if c["percentage"] is None else f"{c['percentage']:.2f}%"
+        lines.append(
+            f"  {c['course_code']:<10} {c['course_name'][:40]:<40} "
+            f"{c['credits']:>3} cr  {percentage:>8}  {c['letter_grade'] or '-'}"
+        )
+    lines += [
+        "",
+        f"Credits attempted: {transcript['credits_attempted']}",
+        f"Cumulative GPA: {transcript['gpa'] if transcript['gpa'] is not None else '-'}"
+    ]
+    return lines
+
+
+def _pdf_escape(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(transcript, lines_per_page=60):
+    """Render a transcript as a plain single-font PDF"""
+    lines = _transcript_lines(transcript)
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = []
+    page_ids = []
+    font_id = 3
+    for page_lines in pages:
+        content = ["BT", "/F1 10 Tf", "12 TL", "50 750 Td"]
+        content += [f"({_pdf_escape(line)}) Tj T*" for line in page_lines]
+        content.append("ET")
+        stream = "\n".join(content).encode("latin-1")
+        content_id = 4 + len(objects)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(4 + len(objects))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id)
+        )
+
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ] + objects
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref_at = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at))
+    return output.getvalue()
+
+
+RENDERERS = {"csv": render_csv, "pdf": render_pdf}
+
+
+def _write_batch(transcripts, out_dir, fmt):
+    """Process-pool task: render a batch and write one file per student"""
+    render = RENDERERS[fmt]
+    for transcript in transcripts:
+        path = os.path.join(out_dir, f"{transcript['student_id']}.{fmt}")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(render(transcript))
+        os.replace(tmp_path, path)
+    return len(transcripts)
+
+
+def _student_batches(db: Session, batch_size):
+    last_id = 0
+    while True:
+        students = (
+            db.query(Student)
+            .filter(Student.id > last_id)
+            .order_by(Student.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not students:
+            return
+        last_id = students[-1].id
+        yield students
+
+
+def export_transcripts(db: Session, out_dir, fmt="csv", workers=None,
+                       batch_size=TRANSCRIPT_BATCH_SIZE, progress=None):
+    """Write a transcript file for every student into out_dir.
+
+    progress, if given, is called as progress(done, total, elapsed_seconds)
+    after each batch is written. Returns the number of transcripts written.
+    """
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unsupported transcript format: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    total = db.query(Student).count()
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    done = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for students in _student_batches(db, batch_size):
+            pending.add(pool.submit(_write_batch, transcripts_for(db, students), out_dir, fmt))
+            db.expunge_all()
+            # Keep a bounded number of batches in flight
+            while len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done += future.result()
+                    if progress:
+                        progress(done, total, time.perf_counter() - started)
+        for future in pending:
+            done += future.result()
+            if progress:
+                progress(done, total, time.perf_counter() - started)
+    return done